@@ -0,0 +1 @@
+"""Offline benchmarks for the rlgpy spiders and API."""
@@ -0,0 +1,166 @@
+"""Pages served by the benchmark server.
+
+The pages are generated with the markup the spiders select on, so that every selector and
+processor runs exactly as it would on the live site.  Recorded pages can be served instead by
+placing them in a directory, see `PageSource`.
+
+"""
+
+import random
+from pathlib import Path
+from typing import Optional
+
+
+CATEGORIES = ['bodies', 'wheels', 'decals', 'boosts', 'toppers', 'antennas', 'trails', 'explosions']
+CERTIFICATIONS = ['', 'Striker', 'Victor', 'Sniper', 'Playmaker', 'Scorer']
+PAINTS = ['', 'Titanium White', 'Black', 'Crimson', 'Cobalt', 'Sky Blue', 'Saffron']
+PLATFORMS = ['Steam', 'PS4', 'XboxOne', 'Switch']
+RARITIES = ['Common', 'Rare', 'Very Rare', 'Import', 'Exotic', 'Black Market']
+
+
+def _page(body: str) -> str:
+    return '<!DOCTYPE html><html><head><title>RLG</title></head><body>%s</body></html>' % body
+
+
+def _tradeable_item(rng: random.Random, items_per_category: int) -> str:
+    data_id = rng.randrange(len(CATEGORIES) * items_per_category)
+    count = rng.choice([0, 0, 0, 2, 5])
+    certification = rng.choice(CERTIFICATIONS)
+    paint = rng.choice(PAINTS)
+    return ''.join([
+        '<a href="/trading?filterItem=%d&amp;filterCertification=0&amp;filterPaint=0">' % data_id,
+        '<div class="rlg-trade-display-item">',
+        '<div class="rlg-trade-display-item__amount">%d</div>' % count if count else '',
+        '<div class="rlg-trade-display-item__info"><div class="rlg-trade-display-item__cert">',
+        '<span>%s</span>' % certification if certification else '',
+        '</div></div>',
+        '<div class="rlg-trade-display-item-paint" data-name="%s"></div>' % paint if paint else '',
+        '<img src="/content/media/items/avatar/220px/%d.png"></div></a>' % data_id
+    ])
+
+
+def trade_page(page: int, pages: int, trades_per_page: int, items_per_category: int) -> str:
+    """A page of trades with links to the following trade pages."""
+    rng = random.Random(page)
+    trades = []
+    for index in range(trades_per_page):
+        trade_id = 'p%dt%d' % (page, index)
+        trades.append(''.join([
+            '<div class="rlg-trade is--user">',
+            '<div class="rlg-trade__header"><a href="/trade/%s">Trade</a></div>' % trade_id,
+            '<div class="rlg-trade__avatar"><img alt="user%d" src="/avatar.png"></div>' % (
+                rng.randrange(1000)
+            ),
+            '<div class="rlg-trade-platform-name"><span>%s: user</span></div>' % (
+                rng.choice(PLATFORMS)
+            ),
+            '<button name="bookmark" data-alias="%s"></button>' % trade_id,
+            '<div id="rlg-youritems">%s</div>' % ''.join(
+                _tradeable_item(rng, items_per_category) for _ in range(rng.randint(1, 6))
+            ),
+            '<div id="rlg-theiritems">%s</div>' % ''.join(
+                _tradeable_item(rng, items_per_category) for _ in range(rng.randint(1, 6))
+            ),
+            '</div>'
+        ]))
+    links = ''.join(
+        '<a href="/trading?p=%d">%d</a>' % (number, number)
+        for number in range(max(1, page - 2), min(pages, page + 3) + 1)
+    )
+    return _page(''.join(trades) + '<div class="rlg-pagination">%s</div>' % links)
+
+
+def item_index_page() -> str:
+    """The item overview page linking to each category, in the menu and again in the page."""
+    links = ''.join('<a href="/items/%s">%s</a>' % (category, category) for category in CATEGORIES)
+    tiles = ''.join('<a href="/items/%s/">%s</a>' % (category, category) for category in CATEGORIES)
+    return _page('<nav>%s</nav><div class="rlg-categories">%s</div>' % (links, tiles))
+
+
+def _item(data_id: int, items_per_category: int) -> str:
+    category = CATEGORIES[data_id // items_per_category % len(CATEGORIES)]
+    rng = random.Random(data_id)
+    return (
+        '<div class="rlg-item__container --%s" data-name="Item %d" data-category="%s" '
+        'data-platform="All" data-rarity="%s" data-dlcpack="%s">'
+        '<div class="rlg-item" data-id="%d"><img src="/content/media/items/%d.png"></div>'
+        '</div>' % (
+            category, data_id, category.title(), rng.choice(RARITIES),
+            rng.choice(['', '', 'Supersonic Fury']), data_id, data_id
+        )
+    )
+
+
+def item_category_page(category: str, items_per_category: int) -> str:
+    """A category page listing its items, followed by some items of the next category."""
+    offset = CATEGORIES.index(category) * items_per_category
+    related = range(offset + items_per_category, offset + items_per_category * 5 // 4)
+    items = ''.join(
+        _item(data_id % (len(CATEGORIES) * items_per_category), items_per_category)
+        for data_id in list(range(offset, offset + items_per_category)) + list(related)
+    )
+    return _page('<div class="rlg-items">%s</div>' % items)
+
+
+def trophies_page(achievements: int) -> str:
+    """The page listing every achievement."""
+    trophies = ''.join(
+        '<div class="rlg-trophies-trophy"><img alt="Achievement %d" src="/trophies/%d.png">'
+        '<ul><li class="rlg-trophies-trophy-info-gamerscore"><span>%d</span></li>'
+        '<li class="rlg-trophies-trophy-info-trophy"><i class="trophy_%s_icon"></i></li></ul>'
+        '<p>Description of achievement %d</p></div>' % (
+            index, index, (index % 9 + 1) * 10, ['bronze', 'silver', 'gold'][index % 3], index
+        )
+        for index in range(achievements)
+    )
+    return _page(trophies)
+
+
+class PageSource:
+    """Generates the pages of the site, preferring recorded pages where available.
+
+    Recorded pages are looked up in `recorded_dir` by path, e.g. `items/bodies.html` or
+    `trading/3.html` for `/trading?p=3`.
+
+    """
+
+    def __init__(self, trade_pages: int = 20, trades_per_page: int = 20,
+                 items_per_category: int = 100, achievements: int = 90,
+                 recorded_dir: Optional[str] = None):
+        self.trade_pages = trade_pages
+        self.trades_per_page = trades_per_page
+        self.items_per_category = items_per_category
+        self.achievements = achievements
+        self.recorded_dir = Path(recorded_dir) if recorded_dir else None
+        self._cache = {}
+
+    def get(self, path: str, page: Optional[int]) -> Optional[str]:
+        """Return the page for a request path, `None` if there is no such page."""
+        key = (path, page)
+        if key not in self._cache:
+            self._cache[key] = self._recorded(path, page) or self._generate(path, page)
+        return self._cache[key]
+
+    def _recorded(self, path: str, page: Optional[int]) -> Optional[str]:
+        if self.recorded_dir is None:
+            return None
+        name = '%s/%d.html' % (path.strip('/'), page or 1) if path == '/trading' else (
+            '%s.html' % path.strip('/')
+        )
+        recorded = self.recorded_dir / name
+        return recorded.read_text() if recorded.is_file() else None
+
+    def _generate(self, path: str, page: Optional[int]) -> Optional[str]:
+        if path == '/trading':
+            page = page or 1
+            if page > self.trade_pages:
+                return _page('')
+            return trade_page(page, self.trade_pages, self.trades_per_page,
+                              self.items_per_category)
+        if path == '/items':
+            return item_index_page()
+        if path.startswith('/items/') and path[len('/items/'):] in CATEGORIES:
+            return item_category_page(path[len('/items/'):], self.items_per_category)
+        if path == '/trophies':
+            return trophies_page(self.achievements)
+        return None
@@ -0,0 +1,364 @@
+"""Run the benchmarks against the local stand-in and report the results as JSON.
+
+Every spider and `RocketLeagueGarage` entry point crawls a `BenchmarkServer` instead of the live
+site, so results are reproducible and can be compared between revisions.
+
+Usage:
+    python -m benchmarks.run --latency 0.05 --trade-pages 20 --output after.json
+    python -m benchmarks.run --compare before.json after.json
+
+Each crawl scenario runs in a process of its own, so that the peak RSS of the crawler processes
+it spawns can be attributed to it.  The spiders are pointed at the server by overriding their
+class attributes in that process, which relies on the `fork` start method.
+
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import multiprocessing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import scrapy
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+
+from benchmarks.pages import CATEGORIES, PageSource
+from benchmarks.server import BenchmarkServer
+from rlgpy.api import RocketLeagueGarage
+from rlgpy.catalog import ItemCatalog
+from rlgpy.scraper.channels import to_dict
+from rlgpy.scraper.runners import SafeSpiderRunner
+from rlgpy.scraper.workers import CrawlerWorkerPool
+from rlgpy.scraper.spiders import ItemSpider, TradeSpider, AchievementSpider
+
+
+START_PATHS = {
+    ItemSpider: '/items',
+    TradeSpider: '/trading?p=1',
+    AchievementSpider: '/trophies'
+}
+
+
+def _point_spiders_at(server_url: str):
+    """Make every spider crawl the benchmark server."""
+    for spider, path in START_PATHS.items():
+        spider.start_urls = [server_url + path]
+        spider.allowed_domains = ['127.0.0.1']
+
+
+def _trade_settings(pages: PageSource, fast: bool = False,
+                    pagination: str = 'links') -> Dict[str, Any]:
+    return {
+        'CLOSESPIDER_ITEMCOUNT': pages.trade_pages * pages.trades_per_page,
+        'RLG_FAST_PARSER': fast,
+        'RLG_TRADE_PAGINATION': pagination
+    }
+
+
+def _peak_rss() -> Dict[str, int]:
+    """Peak resident set size, in kilobytes, of this process and of its crawler processes."""
+    return {
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        'parent_peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def _timed(crawl: Callable[[], List[Any]]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    results = crawl()
+    timing = {'seconds': time.perf_counter() - start, 'items': len(results)}
+    if getattr(results, 'metrics', None) is not None:
+        timing['metrics'] = results.metrics.to_dict()
+    return timing
+
+
+def spawn_overhead(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    """Time a crawl without any requests in a newly spawned process."""
+    durations = [
+        _timed(lambda: SafeSpiderRunner.run(AchievementSpider, {}, spider_kwargs={
+            'start_urls': []
+        }))['seconds']
+        for _ in range(repeat)
+    ]
+    return {'seconds': statistics.median(durations), 'items': 0}
+
+
+def pool_overhead(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    """Time a crawl without any requests on a warm worker process."""
+    with CrawlerWorkerPool(size=1) as pool:
+        pool.run(AchievementSpider, {}, spider_kwargs={'start_urls': []})
+        durations = [
+            _timed(lambda: pool.run(AchievementSpider, {}, spider_kwargs={
+                'start_urls': []
+            }))['seconds']
+            for _ in range(repeat)
+        ]
+    return {'seconds': statistics.median(durations), 'items': 0}
+
+
+def _spider_scenario(spider: scrapy.Spider, fast: bool = False,
+                     pagination: str = 'links') -> Callable:
+    def scenario(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+        settings = _trade_settings(pages, fast, pagination) if spider is TradeSpider else {
+            'RLG_FAST_PARSER': fast
+        }
+        return _timed(lambda: SafeSpiderRunner.run(spider, settings))
+    return scenario
+
+
+def api_get_items(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    return _timed(lambda: RocketLeagueGarage.get_items(cache_enabled=False))
+
+
+def api_get_achievements(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    return _timed(lambda: RocketLeagueGarage.get_achievements(cache_enabled=False))
+
+
+def _with_catalog(crawl: Callable[[], List[Any]]) -> Dict[str, Any]:
+    """Time a trade crawl, with an item catalog which is already loaded."""
+    items = SafeSpiderRunner.run(ItemSpider, {})
+    RocketLeagueGarage.item_catalog = ItemCatalog(path=None, loader=lambda: items)
+    RocketLeagueGarage.item_catalog.refresh()
+    return _timed(crawl)
+
+
+def api_get_trades(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    max_trades = pages.trade_pages * pages.trades_per_page
+    return _with_catalog(lambda: RocketLeagueGarage.get_trades(max_trades=max_trades))
+
+
+def api_iter_trades(server_url: str, pages: PageSource, repeat: int) -> Dict[str, Any]:
+    max_trades = pages.trade_pages * pages.trades_per_page
+    return _with_catalog(lambda: list(RocketLeagueGarage.iter_trades(max_trades=max_trades)))
+
+
+SCENARIOS = {
+    'spawn/process': spawn_overhead,
+    'spawn/worker_pool': pool_overhead,
+    'spider/item': _spider_scenario(ItemSpider),
+    'spider/item_fast': _spider_scenario(ItemSpider, fast=True),
+    'spider/trade': _spider_scenario(TradeSpider),
+    'spider/trade_fast': _spider_scenario(TradeSpider, fast=True),
+    'spider/trade_direct': _spider_scenario(TradeSpider, fast=True, pagination='direct'),
+    'spider/achievement': _spider_scenario(AchievementSpider),
+    'api/get_items': api_get_items,
+    'api/get_trades': api_get_trades,
+    'api/iter_trades': api_iter_trades,
+    'api/get_achievements': api_get_achievements
+}
+
+
+def _run_scenario(name: str, server_url: str, pages: PageSource, repeat: int,
+                  queue: multiprocessing.Queue):
+    """Entry point of the process running a single crawl scenario."""
+    _point_spiders_at(server_url)
+    try:
+        result = SCENARIOS[name](server_url, pages, repeat)
+        result.update(_peak_rss())
+    except Exception as exc:  # pylint: disable=broad-except
+        result = {'error': repr(exc)}
+    queue.put(result)
+
+
+def run_crawl_scenario(name: str, server: BenchmarkServer, pages: PageSource,
+                       repeat: int) -> Dict[str, Any]:
+    """Run a crawl scenario in its own process and count the pages it requested."""
+    queue = multiprocessing.Queue()
+    server.reset()
+    process = multiprocessing.Process(
+        target=_run_scenario, args=(name, server.url(''), pages, repeat, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    if 'error' in result:
+        return result
+    result['pages'] = server.pages_served()
+    result['pages_per_sec'] = result['pages'] / result['seconds']
+    result['items_per_sec'] = result['items'] / result['seconds']
+    return result
+
+
+def _response(url: str, body: str) -> HtmlResponse:
+    return HtmlResponse(url, body=body.encode('utf-8'), encoding='utf-8', request=Request(url))
+
+
+def parse_benchmarks(pages: PageSource, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Time the spider callbacks on the pages of the stand-in, without any network access.
+
+    A new response is built for every parse, so the times include parsing the HTML.
+
+    """
+    item_pages = [('/items/%s' % category, None) for category in CATEGORIES]
+    trade_pages = [('/trading', page) for page in range(1, pages.trade_pages + 1)]
+    cases = [
+        ('item', ItemSpider, 'parse_items', item_pages),
+        ('trade', TradeSpider, 'parse_trades', trade_pages),
+        ('achievement', AchievementSpider, 'parse', [('/trophies', None)])
+    ]
+    results = {}
+    for name, spider_cls, callback, paths in cases:
+        bodies = [
+            ('http://127.0.0.1%s' % (path if page is None else '%s?p=%d' % (path, page)),
+             pages.get(path, page))
+            for path, page in paths
+        ]
+        modes = ['loader', 'fast'] if spider_cls is not AchievementSpider else ['loader']
+        for mode in modes:
+            spider = spider_cls()
+            spider.settings = Settings({'RLG_FAST_PARSER': mode == 'fast'})
+            parse = getattr(spider, callback)
+            items = 0
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for url, body in bodies:
+                    items += len([to_dict(item) for item in parse(_response(url, body))])
+            seconds = time.perf_counter() - start
+            parsed = repeat * len(bodies)
+            results['parse/%s/%s' % (name, mode)] = {
+                'seconds': seconds,
+                'pages': parsed,
+                'items': items,
+                'pages_per_sec': parsed / seconds,
+                'items_per_sec': items / seconds,
+                'parse_ms_per_page': seconds / parsed * 1000
+            }
+    return results
+
+
+IMPORTED_MODULES = ['rlgpy.api', 'rlgpy.cli', 'rlgpy.scraper.spiders', 'scrapy']
+IMPORT_SCRIPT = (
+    'import sys, time; modules = len(sys.modules); start = time.perf_counter(); import %s; '
+    'print(time.perf_counter() - start, len(sys.modules) - modules)'
+)
+
+
+def import_benchmarks(repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Time the import of the entry points in a new interpreter, with Scrapy as a reference.
+
+    Returns:
+        The best time of the repeats and the number of modules the import loaded.
+
+    """
+    results = {}
+    for module in IMPORTED_MODULES:
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT % module])
+            seconds, modules = output.decode().split()
+            runs.append(float(seconds))
+        results['import/%s' % module] = {'seconds': min(runs), 'modules': int(modules)}
+    return results
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the selected benchmarks.
+
+    Returns:
+        The report in JSON format.
+
+    """
+    pages = PageSource(
+        trade_pages=args.trade_pages,
+        trades_per_page=args.trades_per_page,
+        items_per_category=args.items_per_category,
+        achievements=args.achievements,
+        recorded_dir=args.recorded
+    )
+    selected = [name for name in SCENARIOS if name.startswith(tuple(args.only or ['']))]
+    report = {
+        'revision': _revision(),
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'scrapy': scrapy.__version__,
+        'platform': platform.platform(),
+        'config': {
+            'latency': args.latency,
+            'trade_pages': args.trade_pages,
+            'trades_per_page': args.trades_per_page,
+            'items_per_category': args.items_per_category,
+            'achievements': args.achievements,
+            'recorded': args.recorded,
+            'repeat': args.repeat
+        },
+        'results': {}
+    }
+    if not args.only or any(prefix.startswith('parse') for prefix in args.only):
+        report['results'].update(parse_benchmarks(pages, args.repeat))
+    if not args.only or any(prefix.startswith('import') for prefix in args.only):
+        report['results'].update(import_benchmarks(args.repeat))
+    with BenchmarkServer(pages, latency=args.latency) as server:
+        for name in selected:
+            print('Running %s' % name, file=sys.stderr)
+            report['results'][name] = run_crawl_scenario(name, server, pages, args.repeat)
+    return report
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Describe the change of every metric between two reports.
+
+    Returns:
+        One line per metric, with the relative change in percent.
+
+    """
+    lines = ['%-28s %-18s %14s %14s %9s' % ('benchmark', 'metric', 'before', 'after', 'change')]
+    for name, result in sorted(after['results'].items()):
+        previous = before['results'].get(name, {})
+        for metric, value in sorted(result.items()):
+            old = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            change = '%+.1f%%' % ((value - old) / old * 100) if old else 'n/a'
+            lines.append('%-28s %-18s %14.3f %14.3f %9s' % (name, metric, old, value, change))
+    return lines
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds every response of the server is delayed by')
+    parser.add_argument('--trade-pages', type=int, default=20)
+    parser.add_argument('--trades-per-page', type=int, default=20)
+    parser.add_argument('--items-per-category', type=int, default=100)
+    parser.add_argument('--achievements', type=int, default=90)
+    parser.add_argument('--recorded', help='directory of recorded pages served instead')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='repetitions of the parse and spawn benchmarks')
+    parser.add_argument('--only', action='append',
+                        help='run only the benchmarks starting with this prefix')
+    parser.add_argument('--output', help='file the JSON report is written to')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two reports instead of running the benchmarks')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        before, after = (json.loads(Path(path).read_text()) for path in args.compare)
+        print('\n'.join(compare(before, after)))
+        return
+
+    multiprocessing.set_start_method('fork')
+    report = json.dumps(run(args), indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
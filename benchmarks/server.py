@@ -0,0 +1,91 @@
+"""Local HTTP stand-in for Rocket League Garage."""
+
+import time
+import threading
+from collections import Counter
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.pages import PageSource
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class BenchmarkServer:
+    """Serves a `PageSource` on localhost with a fixed latency per request.
+
+    Attributes:
+        latency (float): Seconds each response is delayed by.
+        requests (Counter): Number of requests per path.
+
+    Example:
+        >>> with BenchmarkServer(PageSource(), latency=0.05) as server:
+        >>>     server.url('/trading?p=1')
+
+    """
+
+    def __init__(self, pages: PageSource, latency: float = 0.0):
+        self.pages = pages
+        self.latency = latency
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler())
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def url(self, path: str) -> str:
+        """Absolute URL of a path on the server."""
+        return 'http://127.0.0.1:%d%s' % (self.port, path)
+
+    def pages_served(self) -> int:
+        """Total number of requests served so far."""
+        with self._lock:
+            return sum(self.requests.values())
+
+    def reset(self):
+        """Clear the request counts."""
+        with self._lock:
+            self.requests.clear()
+
+    def __enter__(self) -> 'BenchmarkServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                url = urlparse(self.path)
+                page = parse_qs(url.query).get('p')
+                with server._lock:
+                    server.requests[url.path] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.pages.get(url.path, int(page[0]) if page else None)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,8 @@
+"""Entry point of `python -m rlgpy`, see `rlgpy.cli`."""
+
+import sys
+
+from rlgpy.cli import main
+
+
+sys.exit(main())
@@ -1,48 +1,180 @@
-"""RLG package API."""
+"""RLG package API.
 
-import uuid
-from typing import Dict, Any, List
+Importing the API is cheap, Scrapy and the spiders are only imported once a crawl starts.
 
-from scrapy.spiders import Spider
+"""
 
-from rlgpy.scraper.runners import SafeSpiderRunner
-from rlgpy.scraper.spiders import (
-    ItemSpider,
-    TradeSpider,
-    AchievementSpider
-)
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Iterator, Iterable, Union
+
+from rlgpy.lazy import lazy_import
+from rlgpy.table import TradeTable
+from rlgpy.catalog import ItemCatalog
+from rlgpy.scraper.runners import SafeSpiderRunner, AsyncSpiderRun
+from rlgpy.scraper.snapshots import CatalogSnapshot, DEFAULT_PATH as DEFAULT_SNAPSHOT_PATH
+
+if TYPE_CHECKING:  # pragma: no cover
+    from scrapy.spiders import Spider
+
+asyncio = lazy_import('asyncio')
+metrics = lazy_import('rlgpy.scraper.metrics')
+workers = lazy_import('rlgpy.scraper.workers')
+spiders = lazy_import('rlgpy.scraper.spiders')
+throttle = lazy_import('rlgpy.scraper.throttle')
+httpcache = lazy_import('rlgpy.scraper.httpcache')
+
+
+# Data retrieved by `RocketLeagueGarage.get_all`.
+ALL_DATA = ('items', 'trades', 'achievements')
 
 
 class RocketLeagueGarage:
-    """Rocket League Garage API functions."""
+    """Rocket League Garage API functions.
+
+    Attributes:
+        worker_pool (CrawlerWorkerPool): Pool of warm crawler processes used for every call while
+            started with `start_workers`.  Without a pool each call spawns its own process.
+        item_catalog (ItemCatalog): Item metadata used to enrich trades, crawled only when it is
+            missing or older than its TTL.
+
+    """
+
+    worker_pool = None
+    item_catalog = ItemCatalog.default()
+
+    @classmethod
+    def start_workers(cls, size: Optional[int] = None) -> 'workers.CrawlerWorkerPool':
+        """Run all subsequent calls on a pool of long-lived crawler processes.
+
+        Args:
+            size: Number of worker processes, defaults to the number of CPUs.
+
+        Returns:
+            The started worker pool, which also exposes `health()`.
+
+        """
+        if cls.worker_pool is None:
+            cls.worker_pool = workers.CrawlerWorkerPool(size=size)
+            cls.worker_pool.start()
+        return cls.worker_pool
+
+
+    @classmethod
+    def stop_workers(cls):
+        """Shut down the worker pool, subsequent calls spawn a process per call again."""
+        if cls.worker_pool is not None:
+            cls.worker_pool.shutdown()
+            cls.worker_pool = None
+
 
     @staticmethod
-    def _run_spider(spider: Spider, settings: Dict[str, Any],
-                    delete_file: bool = True) -> List[Dict[str, Any]]:
+    def _run_spider(spider: 'Spider', settings: Dict[str, Any], delete_file: bool = True,
+                    spider_kwargs: Optional[Dict[str, Any]] = None) -> 'metrics.CrawlResult':
         """Run the spider until done and return the data.
 
         Args:
             spider: The scrapy spider to run.
             settings: The settings to run the spider with.
             delete_file: Delete the data file created by the spider.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
+
+        Returns:
+            A list of the data in JSON format, with the metrics of the crawl as its `metrics`.
+
+        """
+        pool = RocketLeagueGarage.worker_pool
+        runner = pool if pool is not None else SafeSpiderRunner
+        return runner.run(
+            spider=spider,
+            settings=settings,
+            delete_file=delete_file,
+            spider_kwargs=spider_kwargs
+        )
+
+
+    @staticmethod
+    def _iter_spider(spider: 'Spider', settings: Dict[str, Any],
+                     spider_kwargs: Optional[Dict[str, Any]] = None) -> Iterable[Dict[str, Any]]:
+        """Run the spider, yielding the data while crawling unless a worker pool is used.
+
+        Args:
+            spider: The scrapy spider to run.
+            settings: The settings to run the spider with.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
 
         Returns:
-            A list of the data in JSON format.
+            An iterable of the data in JSON format.
 
         """
-        return SafeSpiderRunner.run(
+        pool = RocketLeagueGarage.worker_pool
+        if pool is not None:
+            return pool.run(spider=spider, settings=settings, spider_kwargs=spider_kwargs)
+        return SafeSpiderRunner.iterate(
             spider=spider,
             settings=settings,
-            delete_file=delete_file
+            spider_kwargs=spider_kwargs
+        )
+
+
+    @classmethod
+    def _collect_trades(cls, trades: Iterable[Dict[str, Any]],
+                        as_table: bool) -> Union[List[Dict[str, Any]], TradeTable]:
+        """Enrich the trades, or store them in a table which references the item catalog."""
+        if as_table:
+            cls.item_catalog.ensure_fresh()
+            return TradeTable.from_trades(trades, cls.item_catalog)
+        if not isinstance(trades, metrics.CrawlResult):
+            trades = metrics.CrawlResult.collect(trades)
+        for trade in trades:
+            cls.item_catalog.enrich(trade)
+        return trades
+
+
+    @staticmethod
+    def _catalog_settings(cache_enabled: bool, store_path: Optional[str] = None) -> Dict[str, Any]:
+        """Settings for the item and achievement catalog spiders."""
+        settings = httpcache.cache_settings(cache_enabled)
+        if store_path is not None:
+            settings['RLG_SQLITE_PATH'] = store_path
+        return settings
+
+
+    @staticmethod
+    def _trade_settings(max_trades: int, concurrent_c: int, cache_enabled: bool = False,
+                        adaptive: bool = False, target_rate: Optional[float] = None,
+                        store_path: Optional[str] = None) -> Dict[str, Any]:
+        """Settings for the trade spider."""
+        settings = RocketLeagueGarage._catalog_settings(cache_enabled, store_path)
+        settings.update({
+            'CONCURRENT_REQUESTS': concurrent_c,
+            'CLOSESPIDER_ITEMCOUNT': max_trades
+        })
+        if adaptive:
+            adaptive_settings = throttle.adaptive_settings(concurrent_c, target_rate)
+            adaptive_settings['DOWNLOADER_MIDDLEWARES'].update(settings['DOWNLOADER_MIDDLEWARES'])
+            settings.update(adaptive_settings)
+        return settings
+
+
+    @staticmethod
+    def _trade_kwargs(urls: Optional[List[str]], seen_ids: Optional[Iterable[str]],
+                      seen_path: Optional[str], **kwargs) -> Dict[str, Any]:
+        """Spider arguments for the trade spider, leaving out the unused ones."""
+        kwargs.update(
+            start_urls=list(urls) if urls else None,
+            seen_ids=list(seen_ids) if seen_ids is not None else None,
+            seen_path=seen_path
         )
+        return {key: value for key, value in kwargs.items() if value is not None}
 
 
     @classmethod
-    def get_items(cls, cache_enabled: bool = True) -> List[Dict[str, Any]]:
+    def get_items(cls, cache_enabled: bool = True,
+                  store_path: str = None) -> List[Dict[str, Any]]:
         """Retrieve item data from RLG or cache.
 
         If a request has already been made to the server and the `cache_enabled` is set to `True`,
-        subsequent function calls will use a cached version of the webpage.
+        subsequent function calls will use a cached version of the webpage.  A cached page older
+        than a day is revalidated with the server, which only sends it again if it has changed.
 
         It is recommended to use the default value to reduce overloading the server with requests
         and to improve program speed. The only time this would ever need to be changed is in the
@@ -50,74 +182,463 @@ class RocketLeagueGarage:
 
         Args:
             cache_enabled: Get item data from cached webpage.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
 
         Returns:
             A list of items in JSON format.
 
         """
         items = RocketLeagueGarage._run_spider(
-            spider=ItemSpider,
-            settings={
-                'FEED_URI': 'item_data_%s.jl' % str(uuid.uuid4()),
-                'HTTPCACHE_ENABLED': cache_enabled,
-                'HTTPCACHE_EXPIRATION_SECS': 0
-            }
+            spider=spiders.ItemSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled, store_path)
         )
         return items
 
 
     @classmethod
-    def get_trades(cls, url: str = None, max_trades: int = 100,
-                   concurrent_c: int = 5) -> List[Dict[str, Any]]:
+    def sync_items(cls, snapshot_path: str = str(DEFAULT_SNAPSHOT_PATH),
+                   cache_enabled: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+        """Retrieve the changes to the item data since the previous sync.
+
+        Only the item pages whose content changed since the previous sync are parsed.  The item
+        catalog used to enrich trades is replaced with the synced items.  The first sync reports
+        every item as added.
+
+        Args:
+            snapshot_path: File in which the item pages are remembered between syncs.
+            cache_enabled: Get item data from cached webpage.
+
+        Returns:
+            The items `added`, `removed` and `changed` since the previous sync, in JSON format.
+
+        """
+        RocketLeagueGarage._run_spider(
+            spider=spiders.ItemSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled),
+            spider_kwargs={'snapshot_path': snapshot_path}
+        )
+        snapshot = CatalogSnapshot.load(snapshot_path)
+        cls.item_catalog.replace(list(snapshot.items().values()))
+        return snapshot.delta
+
+
+    @classmethod
+    def iter_items(cls, cache_enabled: bool = True) -> Iterator[Dict[str, Any]]:
+        """Yield item data from RLG or cache while the crawl is running.
+
+        Always runs in its own process, even when a worker pool has been started.
+
+        Args:
+            cache_enabled: Get item data from cached webpage.
+
+        Yields:
+            Each item in JSON format.
+
+        """
+        yield from SafeSpiderRunner.iterate(
+            spider=spiders.ItemSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled)
+        )
+
+
+    @classmethod
+    def get_trades(cls, url: str = None, max_trades: int = 100, concurrent_c: int = 5,
+                   seen_ids: Iterable[str] = None, seen_path: str = None,
+                   as_table: bool = False,
+                   cache_enabled: bool = False, adaptive: bool = False,
+                   target_rate: float = None,
+                   store_path: str = None) -> Union[List[Dict[str, Any]], TradeTable]:
         """Retrieve trade data from RLG.
 
         Args:
             url: A custom starting URL. Defaults to first trade page.
             max_trades: Maximum number of trades that will be retrieved from RLG.
             concurrent_c: The total number of concurrent requests that can be made to the server.
+            seen_ids: IDs of trades which were already retrieved, they are skipped.
+            seen_path: File in which the IDs of retrieved trades are remembered between calls, so
+                that only new trades are returned and pagination stops once it reaches known trades.
+            cache_enabled: Reuse trade pages fetched less than a minute ago.
+            adaptive: Tune the concurrent requests to the latency and errors of the site, with
+                `concurrent_c` as the ceiling, and back off when the site asks to slow down.
+            target_rate: Trades per second at which the adaptive mode stops raising the
+                concurrent requests.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
+            as_table: Return a compact `TradeTable`, which takes a fraction of the memory of the
+                list of trades, instead.
 
         Returns:
-            A list of trades in JSON format.
+            A list of trades in JSON format, or a `TradeTable` of them.
 
         """
-        TradeSpider.start_urls = [url] if url else TradeSpider.start_urls
-        trades = RocketLeagueGarage._run_spider(
-            spider=TradeSpider,
-            settings={
-                'CONCURRENT_REQUESTS': concurrent_c,
-                'FEED_URI': 'trade_data_%s.jl' % str(uuid.uuid4()),
-                'CLOSESPIDER_ITEMCOUNT': max_trades
-            }
+        trades = RocketLeagueGarage._iter_spider(
+            spider=spiders.TradeSpider,
+            settings=RocketLeagueGarage._trade_settings(
+                max_trades, concurrent_c, cache_enabled, adaptive, target_rate, store_path
+            ),
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(url and [url], seen_ids, seen_path)
         )
+        return cls._collect_trades(trades, as_table)
 
-        #TODO: Move to own function.
-        # Add the missing metadata from the TradeSpider TradeableItems.
-        items = RocketLeagueGarage.get_items()
-        items = {item['data_id']: item for item in items}
-        for trade in trades:
-            for item in trade['have'] + trade['want']:
-                item_metadata = items.get(item['data_id']) or []
-                item.update(item_metadata)
-        return trades
+
+    @classmethod
+    def get_trades_many(cls, urls: List[str], max_trades_per_url: int = 100,
+                        concurrent_c: int = 5, seen_ids: Iterable[str] = None,
+                        seen_path: str = None, as_table: bool = False,
+                        cache_enabled: bool = False, adaptive: bool = False,
+                        target_rate: float = None,
+                        store_path: str = None) -> Union[List[Dict[str, Any]], TradeTable]:
+        """Retrieve trade data from several trade pages in a single crawl.
+
+        All URLs share one crawler and its concurrent requests, which are split evenly between
+        the URLs.  A trade matching several URLs is returned once for each of them.
+
+        Args:
+            urls: Trade pages to start crawling from, e.g. filtered trade pages or profiles.
+            max_trades_per_url: Maximum number of trades retrieved through each URL.
+            concurrent_c: The total number of concurrent requests that can be made to the server.
+            seen_ids: IDs of trades which were already retrieved, they are skipped.
+            seen_path: File in which the IDs of retrieved trades are remembered between calls, so
+                that only new trades are returned and pagination stops once it reaches known trades.
+            cache_enabled: Reuse trade pages fetched less than a minute ago.
+            adaptive: Tune the concurrent requests to the latency and errors of the site, with
+                `concurrent_c` as the ceiling, and back off when the site asks to slow down.
+            target_rate: Trades per second at which the adaptive mode stops raising the
+                concurrent requests.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
+            as_table: Return a compact `TradeTable` instead.
+
+        Returns:
+            A list of trades in JSON format, each with the `source_url` it was found through, or a
+            `TradeTable` of them.
+
+        """
+        settings = RocketLeagueGarage._trade_settings(
+            len(urls) * max_trades_per_url, concurrent_c, cache_enabled, adaptive,
+            target_rate, store_path
+        )
+        if not adaptive:
+            settings['CONCURRENT_REQUESTS_PER_DOMAIN'] = concurrent_c
+        trades = RocketLeagueGarage._iter_spider(
+            spider=spiders.TradeSpider,
+            settings=settings,
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(
+                urls, seen_ids, seen_path, max_trades_per_url=max_trades_per_url
+            )
+        )
+        return cls._collect_trades(trades, as_table)
 
 
     @classmethod
-    def get_achievements(cls, cache_enabled: bool = True) -> List[Dict[str, Any]]:
+    def iter_trades(cls, url: str = None, max_trades: int = 100, concurrent_c: int = 5,
+                    seen_ids: Iterable[str] = None, seen_path: str = None,
+                    cache_enabled: bool = False, adaptive: bool = False,
+                    target_rate: float = None, store_path: str = None) -> Iterator[Dict[str, Any]]:
+        """Yield trade data from RLG as each trade page is parsed.
+
+        Stopping the iteration early cancels the crawl.  Always runs in its own process, even
+        when a worker pool has been started.
+
+        Args:
+            url: A custom starting URL. Defaults to first trade page.
+            max_trades: Maximum number of trades that will be retrieved from RLG.
+            concurrent_c: The total number of concurrent requests that can be made to the server.
+            seen_ids: IDs of trades which were already retrieved, they are skipped.
+            seen_path: File in which the IDs of retrieved trades are remembered between calls, so
+                that only new trades are returned and pagination stops once it reaches known trades.
+            cache_enabled: Reuse trade pages fetched less than a minute ago.
+            adaptive: Tune the concurrent requests to the latency and errors of the site, with
+                `concurrent_c` as the ceiling, and back off when the site asks to slow down.
+            target_rate: Trades per second at which the adaptive mode stops raising the
+                concurrent requests.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
+
+        Yields:
+            Each trade in JSON format.
+
+        """
+        cls.item_catalog.ensure_fresh()
+        trades = SafeSpiderRunner.iterate(
+            spider=spiders.TradeSpider,
+            settings=RocketLeagueGarage._trade_settings(
+                max_trades, concurrent_c, cache_enabled, adaptive, target_rate, store_path
+            ),
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(url and [url], seen_ids, seen_path)
+        )
+        try:
+            for trade in trades:
+                cls.item_catalog.enrich(trade)
+                yield trade
+        finally:
+            trades.close()
+
+
+    @classmethod
+    def get_achievements(cls, cache_enabled: bool = True,
+                         store_path: str = None) -> List[Dict[str, Any]]:
         """Retrieve achievement data from RLG or cache.
 
         Args:
             cache_enabled: Get achievement data from cached webpage.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
 
         Returns:
             A list of achievements in JSON format.
 
         """
         achievements = RocketLeagueGarage._run_spider(
-            spider=AchievementSpider,
-            settings={
-                'FEED_URI': 'achievement_data_%s.jl' % str(uuid.uuid4()),
-                'HTTPCACHE_ENABLED': cache_enabled,
-                'HTTPCACHE_EXPIRATION_SECS': 0
-            }
+            spider=spiders.AchievementSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled, store_path)
         )
         return achievements
+
+
+    @classmethod
+    def iter_achievements(cls, cache_enabled: bool = True) -> Iterator[Dict[str, Any]]:
+        """Yield achievement data from RLG or cache while the crawl is running.
+
+        Always runs in its own process, even when a worker pool has been started.
+
+        Args:
+            cache_enabled: Get achievement data from cached webpage.
+
+        Yields:
+            Each achievement in JSON format.
+
+        """
+        yield from SafeSpiderRunner.iterate(
+            spider=spiders.AchievementSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled)
+        )
+
+
+    @classmethod
+    def get_all(cls, include: Iterable[str] = ALL_DATA, url: str = None, max_trades: int = 100,
+                concurrent_c: int = 5, cache_enabled: bool = True,
+                store_path: str = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Retrieve items, trades and achievements from RLG in a single crawling process.
+
+        The spiders run concurrently on one reactor and share its connection pool and the HTTP
+        cache, so the call takes about as long as the slowest spider.  When items are included,
+        the trades are enriched with the items of the same run, which also replace the item
+        catalog.  Always runs in its own process, even when a worker pool has been started.
+
+        Args:
+            include: The data to retrieve, any of `items`, `trades` and `achievements`.
+            url: A custom starting URL for the trades. Defaults to first trade page.
+            max_trades: Maximum number of trades that will be retrieved from RLG.
+            concurrent_c: The number of concurrent requests the trade spider can make.
+            cache_enabled: Get item and achievement data from cached webpages and reuse trade
+                pages fetched less than a minute ago.
+            store_path: SQLite database the results are also written to as they are scraped, see
+                `rlgpy.store`.
+
+        Returns:
+            The data of each included kind in JSON format, by kind.
+
+        Raises:
+            ValueError: `include` names unknown data.
+
+        """
+        include = list(include)
+        unknown = set(include) - set(ALL_DATA)
+        if unknown:
+            raise ValueError('Unknown data to retrieve: %s' % ', '.join(sorted(unknown)))
+        catalog_settings = RocketLeagueGarage._catalog_settings(cache_enabled, store_path)
+        crawls = {
+            'items': (spiders.ItemSpider, catalog_settings, None),
+            'trades': (
+                spiders.TradeSpider,
+                RocketLeagueGarage._trade_settings(
+                    max_trades, concurrent_c, cache_enabled, store_path=store_path
+                ),
+                RocketLeagueGarage._trade_kwargs(url and [url], None, None)
+            ),
+            'achievements': (spiders.AchievementSpider, catalog_settings, None)
+        }
+        results = SafeSpiderRunner.run_many(
+            {kind: crawl for kind, crawl in crawls.items() if kind in include}
+        )
+        if results.get('items'):
+            cls.item_catalog.replace(results['items'])
+        if 'trades' in results:
+            results['trades'] = cls._collect_trades(results['trades'], as_table=False)
+        return dict(results)
+
+
+class AsyncRocketLeagueGarage:
+    """Rocket League Garage API functions for asyncio applications.
+
+    Every call runs its spider in a new process which is awaited without blocking the event loop,
+    so many crawls can run at once.  Cancelling the awaiting task cancels the crawl.
+
+    Example:
+        >>> trades = await AsyncRocketLeagueGarage.get_trades(max_trades=50)
+        >>> async for trade in AsyncRocketLeagueGarage.iter_trades():
+        >>>     print(trade['data_id'])
+
+    """
+
+    _catalog_refresh = None
+
+    @classmethod
+    async def _ensure_catalog(cls):
+        """Load or crawl the item catalog if it is stale, sharing one crawl between callers."""
+        catalog = RocketLeagueGarage.item_catalog
+        if catalog.is_stale():
+            catalog.load()
+        if not catalog.is_stale():
+            return
+        if cls._catalog_refresh is None or cls._catalog_refresh.done():
+            cls._catalog_refresh = asyncio.ensure_future(cls.get_items())
+        catalog.replace(await asyncio.shield(cls._catalog_refresh))
+
+
+    @classmethod
+    def iter_items(cls, cache_enabled: bool = True) -> AsyncSpiderRun:
+        """Iterate over item data from RLG or cache with `async for`.
+
+        Args:
+            cache_enabled: Get item data from cached webpage.
+
+        Returns:
+            An asynchronous iterator of items in JSON format.
+
+        """
+        return AsyncSpiderRun(
+            spider=spiders.ItemSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled)
+        )
+
+
+    @classmethod
+    async def get_items(cls, cache_enabled: bool = True) -> List[Dict[str, Any]]:
+        """Retrieve item data from RLG or cache.
+
+        Args:
+            cache_enabled: Get item data from cached webpage.
+
+        Returns:
+            A list of items in JSON format.
+
+        """
+        return await cls.iter_items(cache_enabled).collect()
+
+
+    @classmethod
+    def iter_trades(cls, url: str = None, max_trades: int = 100, concurrent_c: int = 5,
+                    seen_ids: Iterable[str] = None, seen_path: str = None,
+                    cache_enabled: bool = False, adaptive: bool = False,
+                    target_rate: float = None) -> AsyncSpiderRun:
+        """Iterate over trade data from RLG with `async for` as each trade page is parsed.
+
+        Args:
+            url: A custom starting URL. Defaults to first trade page.
+            max_trades: Maximum number of trades that will be retrieved from RLG.
+            concurrent_c: The total number of concurrent requests that can be made to the server.
+            seen_ids: IDs of trades which were already retrieved, they are skipped.
+            seen_path: File in which the IDs of retrieved trades are remembered between calls, so
+                that only new trades are returned and pagination stops once it reaches known trades.
+            cache_enabled: Reuse trade pages fetched less than a minute ago.
+            adaptive: Tune the concurrent requests to the latency and errors of the site, with
+                `concurrent_c` as the ceiling, and back off when the site asks to slow down.
+            target_rate: Trades per second at which the adaptive mode stops raising the
+                concurrent requests.
+
+        Returns:
+            An asynchronous iterator of trades in JSON format.
+
+        """
+        def enrich(trade: Dict[str, Any]) -> Dict[str, Any]:
+            RocketLeagueGarage.item_catalog.enrich(trade)
+            return trade
+
+        return AsyncSpiderRun(
+            spider=spiders.TradeSpider,
+            settings=RocketLeagueGarage._trade_settings(
+                max_trades, concurrent_c, cache_enabled, adaptive, target_rate
+            ),
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(url and [url], seen_ids, seen_path),
+            transform=enrich,
+            prepare=cls._ensure_catalog
+        )
+
+
+    @classmethod
+    async def get_trades(cls, url: str = None, max_trades: int = 100, concurrent_c: int = 5,
+                         seen_ids: Iterable[str] = None, seen_path: str = None,
+                         as_table: bool = False,
+                         cache_enabled: bool = False, adaptive: bool = False,
+                         target_rate: float = None) -> Union[List[Dict[str, Any]], TradeTable]:
+        """Retrieve trade data from RLG.
+
+        Args:
+            url: A custom starting URL. Defaults to first trade page.
+            max_trades: Maximum number of trades that will be retrieved from RLG.
+            concurrent_c: The total number of concurrent requests that can be made to the server.
+            seen_ids: IDs of trades which were already retrieved, they are skipped.
+            seen_path: File in which the IDs of retrieved trades are remembered between calls, so
+                that only new trades are returned and pagination stops once it reaches known trades.
+            cache_enabled: Reuse trade pages fetched less than a minute ago.
+            adaptive: Tune the concurrent requests to the latency and errors of the site, with
+                `concurrent_c` as the ceiling, and back off when the site asks to slow down.
+            target_rate: Trades per second at which the adaptive mode stops raising the
+                concurrent requests.
+            as_table: Return a compact `TradeTable` instead.
+
+        Returns:
+            A list of trades in JSON format, or a `TradeTable` of them.
+
+        """
+        if not as_table:
+            return await cls.iter_trades(
+                url, max_trades, concurrent_c, seen_ids, seen_path, cache_enabled, adaptive,
+                target_rate
+            ).collect()
+        table = TradeTable(RocketLeagueGarage.item_catalog)
+        run = AsyncSpiderRun(
+            spider=spiders.TradeSpider,
+            settings=RocketLeagueGarage._trade_settings(
+                max_trades, concurrent_c, cache_enabled, adaptive, target_rate
+            ),
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(url and [url], seen_ids, seen_path),
+            prepare=cls._ensure_catalog
+        )
+        async for trade in run:
+            table.append(trade)
+        return table
+
+
+    @classmethod
+    def iter_achievements(cls, cache_enabled: bool = True) -> AsyncSpiderRun:
+        """Iterate over achievement data from RLG or cache with `async for`.
+
+        Args:
+            cache_enabled: Get achievement data from cached webpage.
+
+        Returns:
+            An asynchronous iterator of achievements in JSON format.
+
+        """
+        return AsyncSpiderRun(
+            spider=spiders.AchievementSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled)
+        )
+
+
+    @classmethod
+    async def get_achievements(cls, cache_enabled: bool = True) -> List[Dict[str, Any]]:
+        """Retrieve achievement data from RLG or cache.
+
+        Args:
+            cache_enabled: Get achievement data from cached webpage.
+
+        Returns:
+            A list of achievements in JSON format.
+
+        """
+        return await cls.iter_achievements(cache_enabled).collect()
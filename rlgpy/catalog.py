@@ -0,0 +1,304 @@
+"""In-memory item metadata catalog used to enrich trades.
+
+The catalog is crawled once, kept in memory for `ttl` seconds and persisted to disk so that a
+freshly started process can enrich trades without crawling the item pages again.
+
+Example:
+    >>> from rlgpy.catalog import ItemCatalog
+    >>> catalog = ItemCatalog.default()
+    >>> catalog.get(1709)['name']
+    'Octane'
+    >>> catalog.refresh()  # Force a new crawl, e.g. after a game update.
+
+    Enriching trades copies the item metadata into each tradeable item by default.  With
+    `reference=True` each tradeable item refers to a single shared `CatalogRecord` under
+    `metadata` instead, and `expand` converts a trade to plain JSON when needed.
+    >>> catalog.enrich(trade, reference=True)
+    >>> trade['have'][0]['metadata'].name
+    'Octane'
+    >>> expand(trade)['have'][0]['name']
+    'Octane'
+
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds after which the catalog is crawled again.
+DEFAULT_TTL = 24 * 60 * 60
+
+DEFAULT_PATH = Path.home() / '.rlgpy' / 'item_catalog.json'
+
+# Key of the `CatalogRecord` in a tradeable item enriched by reference.
+METADATA = 'metadata'
+
+
+class CatalogRecord:
+    """Immutable metadata of an item, shared by every tradeable item referring to it.
+
+    Attributes:
+        data_id (int): Associated ID on Rocket League Garage.
+        img_url (str): Relative URL on Rocket League Garage.
+        name (str): Name of the item.
+        category (str): Associated category of the item.
+        platform (str): Platform that the item is on (set to All if on all platforms).
+        rarity (str): Item rarity.
+        dlcpack (str): The DLC pack the item is from, if applicable.
+
+    """
+
+    __slots__ = ('data_id', 'img_url', 'name', 'category', 'platform', 'rarity', 'dlcpack')
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            object.__setattr__(self, field, fields.pop(field, None))
+        if fields:
+            raise TypeError('Unknown item fields: %s' % ', '.join(sorted(fields)))
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError('CatalogRecord is immutable.')
+
+    def __delattr__(self, name: str):
+        raise AttributeError('CatalogRecord is immutable.')
+
+    def __reduce__(self):
+        return _record_from_fields, (self.to_dict(),)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, CatalogRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, field) for field in self.__slots__))
+
+    def __repr__(self) -> str:
+        return 'CatalogRecord(data_id=%r, name=%r)' % (self.data_id, self.name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The metadata in JSON format, leaving out missing fields."""
+        return {
+            field: getattr(self, field) for field in self.__slots__
+            if getattr(self, field) is not None
+        }
+
+
+def _record_from_fields(fields: Dict[str, Any]) -> CatalogRecord:
+    return CatalogRecord(**fields)
+
+
+def expand(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a trade enriched by reference to JSON format.
+
+    The metadata of each tradeable item is merged into it, the fields scraped with the trade
+    taking precedence.
+
+    Args:
+        trade: A trade, enriched by reference or not.
+
+    Returns:
+        A new trade in JSON format, as enriched by copy.
+
+    """
+    expanded = dict(trade)
+    for side in ('have', 'want'):
+        if side not in trade:
+            continue
+        items = []
+        for item in trade[side]:
+            record = item.get(METADATA)
+            if isinstance(record, CatalogRecord):
+                item = dict(record.to_dict(), **item)
+                del item[METADATA]
+            items.append(item)
+        expanded[side] = items
+    return expanded
+
+
+def _crawl_items() -> List[Dict[str, Any]]:
+    """Crawl the item data from RLG."""
+    # Imported here, the API itself depends on the catalog.
+    from rlgpy.api import RocketLeagueGarage
+    return RocketLeagueGarage.get_items()
+
+
+class ItemCatalog:
+    """Item metadata indexed by `data_id`.
+
+    Attributes:
+        ttl (float): Seconds the catalog is considered fresh after it was crawled.
+        path (Path): File the catalog is persisted to, `None` to keep it in memory only.
+        reference (bool): Whether `enrich` refers to shared records by default instead of
+            copying the metadata.
+
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, ttl: float = DEFAULT_TTL, path: Optional[Path] = DEFAULT_PATH,
+                 loader: Callable[[], List[Dict[str, Any]]] = _crawl_items,
+                 reference: bool = False):
+        """Initialize an empty catalog, it is loaded on first use.
+
+        Args:
+            ttl: Seconds the catalog is considered fresh after it was crawled.
+            path: File the catalog is persisted to, `None` to keep it in memory only.
+            loader: Returns the item data in JSON format, crawls RLG by default.
+            reference: Whether `enrich` refers to shared records by default instead of copying
+                the metadata.
+
+        """
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        self.reference = reference
+        self._loader = loader
+        self._items = {}
+        self._records = {}
+        self._crawled_at = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def default(cls) -> 'ItemCatalog':
+        """Return the process wide catalog."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def crawled_at(self) -> Optional[float]:
+        """Unix timestamp of the crawl the catalog data comes from."""
+        return self._crawled_at
+
+    def is_stale(self) -> bool:
+        """Whether the catalog was never loaded or is older than its TTL."""
+        return self._crawled_at is None or time.time() - self._crawled_at >= self.ttl
+
+    def refresh(self):
+        """Crawl the items again, replacing the catalog and its persisted copy."""
+        with self._lock:
+            logger.info('Refreshing item catalog')
+            self.replace(self._loader())
+
+    def replace(self, items: List[Dict[str, Any]]):
+        """Replace the catalog and its persisted copy with freshly crawled items.
+
+        Args:
+            items: The item data in JSON format.
+
+        """
+        with self._lock:
+            self._set_items(items, time.time())
+            self.save()
+
+    def ensure_fresh(self):
+        """Load the catalog from disk, or crawl it, if it is missing or stale."""
+        with self._lock:
+            if self.is_stale():
+                self.load()
+            if self.is_stale():
+                self.refresh()
+
+    def load(self) -> bool:
+        """Load the persisted catalog.
+
+        Returns:
+            Whether a persisted catalog was found and loaded, regardless of its age.
+
+        """
+        if self.path is None or not self.path.is_file():
+            return False
+        try:
+            data = json.loads(self.path.read_text())
+            with self._lock:
+                self._set_items(data['items'], float(data['crawled_at']))
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning('Ignoring unreadable item catalog %s: %r' % (self.path, exc))
+            return False
+        logger.info('Loaded %d items from catalog %s' % (len(self._items), self.path))
+        return True
+
+    def save(self):
+        """Persist the catalog, replacing the previous file atomically."""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name('%s.%d.tmp' % (self.path.name, os.getpid()))
+        with self._lock:
+            data = {'crawled_at': self._crawled_at, 'items': list(self._items.values())}
+        tmp_path.write_text(json.dumps(data))
+        os.replace(str(tmp_path), str(self.path))
+
+    def get(self, data_id: int) -> Optional[Dict[str, Any]]:
+        """Return the metadata of an item, refreshing the catalog if it is stale.
+
+        Args:
+            data_id: The item ID on RLG.
+
+        Returns:
+            The item in JSON format or `None` if the item is unknown.
+
+        """
+        if self.is_stale():
+            self.ensure_fresh()
+        return self._items.get(data_id)
+
+    def record(self, data_id: int) -> Optional[CatalogRecord]:
+        """Return the shared metadata record of an item, `None` if the item is unknown."""
+        if self.is_stale():
+            self.ensure_fresh()
+        return self._records.get(data_id)
+
+    def enrich(self, trade: Dict[str, Any], reference: Optional[bool] = None):
+        """Add the item metadata to the tradeable items of a trade.
+
+        The fields scraped with a tradeable item are kept, the metadata only adds the fields it
+        is missing.
+
+        Args:
+            trade: A trade in JSON format, updated in place.
+            reference: Refer to the shared `CatalogRecord` of each item under `metadata` instead
+                of copying its fields, defaults to the `reference` attribute.
+
+        """
+        if self.is_stale():
+            self.ensure_fresh()
+        if reference is None:
+            reference = self.reference
+        items = self._records if reference else self._items
+        for item in trade.get('have', []) + trade.get('want', []):
+            item_metadata = items.get(item.get('data_id'))
+            if not item_metadata:
+                continue
+            if reference:
+                item[METADATA] = item_metadata
+                continue
+            for field, value in item_metadata.items():
+                item.setdefault(field, value)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, data_id: int) -> bool:
+        return data_id in self._items
+
+    def _set_items(self, items: List[Dict[str, Any]], crawled_at: float):
+        """Replace the indexed items."""
+        self._items = {item['data_id']: item for item in items}
+        self._records = {
+            data_id: CatalogRecord(**{
+                field: value for field, value in item.items() if field in CatalogRecord.__slots__
+            })
+            for data_id, item in self._items.items()
+        }
+        self._crawled_at = crawled_at
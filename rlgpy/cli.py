@@ -0,0 +1,122 @@
+"""Command line interface, streaming the scraped data to stdout as JSON lines.
+
+Usage:
+    python -m rlgpy items
+    python -m rlgpy trades --max-trades 500 --url 'https://rocket-league.com/trades/KizunaAi'
+    python -m rlgpy achievements --no-cache
+    python -m rlgpy schedule feeds.json --output feeds
+
+Each record is written as soon as its page has been parsed.  Closing the output early, e.g. by
+piping it into `head`, cancels the crawl.  `schedule` polls the feeds configured in a JSON file
+until interrupted, see `rlgpy.scheduler.Scheduler.from_config`, and writes them to rolling JSON
+lines files.
+
+"""
+
+import os
+import sys
+import json
+import argparse
+from typing import Any, Dict, Iterator, List, Optional
+
+from rlgpy.api import RocketLeagueGarage
+from rlgpy.scheduler import RollingJsonLinesSink, Scheduler
+
+
+def _items(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    return RocketLeagueGarage.iter_items(cache_enabled=not args.no_cache)
+
+
+def _trades(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    return RocketLeagueGarage.iter_trades(
+        url=args.url,
+        max_trades=args.max_trades,
+        concurrent_c=args.concurrent,
+        seen_path=args.seen_path,
+        cache_enabled=args.cache,
+        adaptive=args.adaptive,
+        store_path=args.store_path
+    )
+
+
+def _achievements(args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    return RocketLeagueGarage.iter_achievements(cache_enabled=not args.no_cache)
+
+
+COMMANDS = {
+    'items': _items,
+    'trades': _trades,
+    'achievements': _achievements
+}
+
+
+def _schedule(args: argparse.Namespace) -> int:
+    with open(args.config, encoding='utf-8') as config:
+        sink = RollingJsonLinesSink(args.output, args.max_bytes, args.max_age, args.keep)
+        scheduler = Scheduler.from_config(json.load(config), sink)
+    stats = scheduler.run(args.duration)
+    sys.stdout.write(json.dumps(stats) + '\n')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """The parser of the command line arguments."""
+    parser = argparse.ArgumentParser(prog='rlgpy', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(
+        dest='command', metavar='{%s}' % ','.join(list(COMMANDS) + ['schedule'])
+    )
+    commands.required = True
+
+    parsers = {name: commands.add_parser(name, help='stream the %s' % name) for name in COMMANDS}
+    for name in ('items', 'achievements'):
+        parsers[name].add_argument('--no-cache', action='store_true',
+                                   help='fetch every page instead of using the HTTP cache')
+
+    trades = parsers['trades']
+    trades.add_argument('--url', help='trade page to start from, defaults to the first one')
+    trades.add_argument('--max-trades', type=int, default=100)
+    trades.add_argument('--concurrent', type=int, default=5,
+                        help='concurrent requests, the ceiling with --adaptive')
+    trades.add_argument('--adaptive', action='store_true',
+                        help='tune the concurrent requests to the latency of the site')
+    trades.add_argument('--seen-path', help='only output trades not seen by previous runs')
+    trades.add_argument('--store-path', help='SQLite database the trades are also written to')
+    trades.add_argument('--cache', action='store_true',
+                        help='reuse trade pages fetched less than a minute ago')
+
+    schedule = commands.add_parser('schedule', help='poll feeds until interrupted')
+    schedule.add_argument('config', help='JSON file with the feeds to poll')
+    schedule.add_argument('--output', default='feeds', help='directory of the feed files')
+    schedule.add_argument('--max-bytes', type=int, default=64 * 2**20,
+                          help='size at which a feed file is rolled over')
+    schedule.add_argument('--max-age', type=float, default=3600.0,
+                          help='seconds after which a feed file is rolled over')
+    schedule.add_argument('--keep', type=int, help='number of files kept per feed')
+    schedule.add_argument('--duration', type=float, help='seconds after which to stop')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line interface.
+
+    Returns:
+        The exit status.
+
+    """
+    args = build_parser().parse_args(argv)
+    if args.command == 'schedule':
+        return _schedule(args)
+    records = COMMANDS[args.command](args)
+    try:
+        for record in records:
+            sys.stdout.write(json.dumps(record) + '\n')
+            sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. `head`.  Silence the error of the final flush at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        records.close()
+    return 0
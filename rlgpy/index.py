@@ -0,0 +1,194 @@
+"""Inverted index over scraped trades.
+
+A `TradeIndex` answers questions such as "all STEAM trades offering a Titanium White Octane" or
+"who wants item 1709" without scanning every trade.  Each tradeable item is posted under its
+`data_id`, paint, certification and side, and each trade under its platform.  A query intersects
+the posting lists of its conditions, starting with the shortest one.
+
+Item conditions are matched by a single tradeable item, so a query for a Titanium White Octane
+does not match a trade offering an unpainted Octane and some other Titanium White item.
+
+Example:
+    >>> index = TradeIndex.from_trades(RocketLeagueGarage.get_trades(max_trades=1000))
+    >>> index.query(platform='STEAM', data_id=1709, paint='Titanium White', side='have')
+    >>> index.query(data_id=1709, side='want')
+    >>> index.add(trade)  # Incrementally, e.g. from `iter_trades`.
+    >>> index.evict(max_age=3600)
+
+"""
+
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Fields of a tradeable item which are indexed.
+ITEM_FIELDS = ('data_id', 'paint', 'certification')
+
+SIDES = ('have', 'want')
+
+
+class TradeIndex:
+    """Trades indexed by their tradeable items and platform.
+
+    Trades are identified by their `data_id`, adding a trade which is already indexed replaces it.
+
+    Attributes:
+        max_age (float): Seconds after which `evict` removes a trade by default, `None` to keep
+            trades until they are removed.
+
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._docs = {}  # type: Dict[int, Dict[str, Any]]
+        self._doc_ids = {}  # type: Dict[str, int]
+        self._added_at = OrderedDict()  # type: OrderedDict
+        self._item_postings = defaultdict(set)  # type: Dict[tuple, Set[Tuple[int, str, int]]]
+        self._trade_postings = defaultdict(set)  # type: Dict[tuple, Set[int]]
+        self._next_doc = 0
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[Dict[str, Any]],
+                    max_age: Optional[float] = None) -> 'TradeIndex':
+        """Build an index of trades in JSON format."""
+        index = cls(max_age)
+        index.update(trades)
+        return index
+
+    def add(self, trade: Dict[str, Any], added_at: Optional[float] = None):
+        """Index a trade, replacing an indexed trade with the same `data_id`.
+
+        Args:
+            trade: The trade in JSON format.
+            added_at: Unix timestamp the age of the trade is measured from, defaults to now.
+
+        """
+        self.remove(trade['data_id'])
+        doc = self._next_doc
+        self._next_doc += 1
+        self._docs[doc] = trade
+        self._doc_ids[trade['data_id']] = doc
+        self._added_at[doc] = time.time() if added_at is None else added_at
+        for key, ref in self._postings_of(doc, trade):
+            if isinstance(ref, tuple):
+                self._item_postings[key].add(ref)
+            else:
+                self._trade_postings[key].add(ref)
+
+    def update(self, trades: Iterable[Dict[str, Any]]):
+        """Index several trades."""
+        for trade in trades:
+            self.add(trade)
+
+    def remove(self, trade_id: str) -> bool:
+        """Remove a trade from the index.
+
+        Returns:
+            Whether the trade was indexed.
+
+        """
+        doc = self._doc_ids.pop(trade_id, None)
+        if doc is None:
+            return False
+        trade = self._docs.pop(doc)
+        del self._added_at[doc]
+        for key, ref in self._postings_of(doc, trade):
+            postings = self._item_postings if isinstance(ref, tuple) else self._trade_postings
+            postings[key].discard(ref)
+            if not postings[key]:
+                del postings[key]
+        return True
+
+    def evict(self, max_age: Optional[float] = None, now: Optional[float] = None) -> int:
+        """Remove the trades which were added longer than `max_age` seconds ago.
+
+        Args:
+            max_age: Age in seconds, defaults to the `max_age` of the index.
+            now: Unix timestamp the age is measured at, defaults to now.
+
+        Returns:
+            The number of removed trades.
+
+        """
+        max_age = self.max_age if max_age is None else max_age
+        if max_age is None:
+            return 0
+        cutoff = (time.time() if now is None else now) - max_age
+        stale = []
+        # Trades are kept in the order they were added, so the scan stops at the first fresh one.
+        for doc, added_at in self._added_at.items():
+            if added_at > cutoff:
+                break
+            stale.append(self._docs[doc]['data_id'])
+        for trade_id in stale:
+            self.remove(trade_id)
+        return len(stale)
+
+    def query(self, data_id: Optional[int] = None, paint: Optional[str] = None,
+              certification: Optional[str] = None, platform: Optional[str] = None,
+              side: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Find the trades matching every given condition.
+
+        Args:
+            data_id: The item which is traded.
+            paint: Paint of the traded item.
+            certification: Certification of the traded item.
+            platform: Platform of the trade, e.g. `'STEAM'`.
+            side: Whether the author has (`'have'`) or wants (`'want'`) the item.
+
+        Returns:
+            The matching trades in the order they were added.
+
+        """
+        item_keys = [
+            (field, value) for field, value in
+            (('data_id', data_id), ('paint', paint), ('certification', certification),
+             ('side', side))
+            if value is not None
+        ]
+        docs = None  # type: Optional[Set[int]]
+        if item_keys:
+            refs = self._intersect([self._item_postings.get(key, set()) for key in item_keys])
+            docs = {doc for doc, _, _ in refs}
+        if platform is not None:
+            platform_docs = self._trade_postings.get(('platform', platform), set())
+            docs = platform_docs & docs if docs is not None else set(platform_docs)
+        if docs is None:
+            docs = set(self._docs)
+        return [self._docs[doc] for doc in sorted(docs)]
+
+    def get(self, trade_id: str) -> Optional[Dict[str, Any]]:
+        """Return an indexed trade by its `data_id`."""
+        doc = self._doc_ids.get(trade_id)
+        return self._docs[doc] if doc is not None else None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self._doc_ids
+
+    @staticmethod
+    def _intersect(postings: List[set]) -> set:
+        """Intersect posting lists, starting with the shortest."""
+        postings = sorted(postings, key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+    @staticmethod
+    def _postings_of(doc: int, trade: Dict[str, Any]) -> Iterable[tuple]:
+        """The `(key, reference)` pairs a trade is posted under."""
+        if trade.get('platform') is not None:
+            yield ('platform', trade['platform']), doc
+        for side in SIDES:
+            for position, item in enumerate(trade.get(side, ())):
+                ref = (doc, side, position)
+                yield ('side', side), ref
+                for field in ITEM_FIELDS:
+                    if item.get(field) is not None:
+                        yield (field, item[field]), ref
@@ -0,0 +1,41 @@
+"""Deferred imports of heavy dependencies.
+
+Scrapy and Twisted take a large share of the start-up time of short-lived programs which only
+read cached data.  Modules which need them only while crawling import them through `lazy_import`,
+which returns the module right away but only executes it once one of its attributes is used.
+
+Example:
+    >>> spiders = lazy_import('rlgpy.scraper.spiders')  # Nothing imported yet.
+    >>> spiders.TradeSpider  # Imports Scrapy and the spiders.
+
+"""
+
+import sys
+import importlib.util
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module which is only executed once one of its attributes is used.
+
+    Args:
+        name: Absolute name of the module.  Its parent packages are imported right away.
+
+    Raises:
+        ImportError: The module does not exist.
+
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named %r' % name, name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
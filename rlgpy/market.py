@@ -0,0 +1,373 @@
+"""Streaming supply and demand of items.
+
+A `MarketAggregator` counts how often each item is offered (`have`) and asked for (`want`) as
+trades come in, in total and broken down by paint, certification and platform.  The counts are
+kept per time bucket, so the counts of the last hour or week are read from a snapshot without
+storing or re-scanning any trade:
+
+    - Each bucket counts every key in a `CountMinSketch`, whose size does not grow with the number
+      of distinct items and variants.  Its estimates are never too low, and too high by at most
+      `e / width` of the counts in the bucket, except with a probability of `e ** -depth`.
+    - The items offered and asked for the most are tracked exactly by a `SpaceSaving` summary of
+      `top_k` items per side.
+    - Buckets older than `buckets * bucket_seconds` are dropped.
+
+Example:
+    >>> market = MarketAggregator(bucket_seconds=300, buckets=288)
+    >>> market.update(RocketLeagueGarage.iter_trades(max_trades=1000))
+    >>> snapshot = market.snapshot(window=3600)
+    >>> snapshot.supply(1709, paint='Titanium White'), snapshot.demand(1709, platform='STEAM')
+    >>> snapshot.top('want', 10)
+
+    The `RlMarketPipeline` keeps the counts of every trade crawl in a file:
+    >>> RocketLeagueGarage.get_trades(max_trades=1000)  # With `RLG_MARKET_PATH` set.
+    >>> MarketAggregator.load(path).snapshot(window=86400).top('have')
+
+"""
+
+import os
+import sys
+import json
+import time
+import struct
+import hashlib
+from array import array
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+SIDES = ('have', 'want')
+
+# Stands in for a breakdown field which is not part of a key.
+ANY = '*'
+
+DEFAULT_PATH = Path.home() / '.rlgpy' / 'market.bin'
+
+
+def _key(data_id: Any, side: str, paint: Optional[str], certification: Optional[str],
+         platform: Optional[str]) -> str:
+    return '|'.join(str(ANY if value is None else value)
+                    for value in (data_id, side, paint, certification, platform))
+
+
+class CountMinSketch:
+    """Approximate counts of keys in a fixed amount of memory.
+
+    Attributes:
+        width (int): Counters per row, the error shrinks as it grows.
+        depth (int): Number of rows, the probability of exceeding the error shrinks as it grows.
+        table (array): The `depth * width` counters, row by row.
+
+    """
+
+    def __init__(self, width: int = 1024, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = array('I', bytes(4 * width * depth))
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        first, second = struct.unpack_from('<QQ', digest)
+        for row in range(self.depth):
+            yield row * self.width + (first + row * second) % self.width
+
+    def add(self, key: str, count: int = 1):
+        """Count a key."""
+        for position in self._positions(key):
+            self.table[position] += count
+
+    def estimate(self, key: str) -> int:
+        """The count of a key, possibly too high but never too low."""
+        return min(self.table[position] for position in self._positions(key))
+
+    def merge(self, other: 'CountMinSketch'):
+        """Add the counts of a sketch of the same size."""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Only sketches of the same size can be merged.')
+        for position, count in enumerate(other.table):
+            if count:
+                self.table[position] += count
+
+
+class SpaceSaving:
+    """The most frequent keys, tracked exactly up to a fixed number of keys.
+
+    Once `capacity` keys are tracked a new key replaces the least frequent one and takes over its
+    count, which is remembered as the possible overcount of the new key.
+
+    Attributes:
+        capacity (int): Maximum number of keys tracked.
+
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._counts = {}  # type: Dict[Hashable, List[int]]
+
+    def add(self, key: Hashable, count: int = 1):
+        """Count a key."""
+        counter = self._counts.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self._counts) < self.capacity:
+            self._counts[key] = [count, 0]
+        else:
+            smallest = min(self._counts, key=lambda tracked: self._counts[tracked][0])
+            floor = self._counts.pop(smallest)[0]
+            self._counts[key] = [floor + count, floor]
+
+    def merge(self, other: 'SpaceSaving'):
+        """Add the counts of another summary, keeping the most frequent keys."""
+        for key, (count, error) in other._counts.items():
+            counter = self._counts.setdefault(key, [0, 0])
+            counter[0] += count
+            counter[1] += error
+        if len(self._counts) > self.capacity:
+            ranked = sorted(self._counts.items(), key=lambda entry: -entry[1][0])
+            self._counts = dict(ranked[:self.capacity])
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """The `n` most frequent keys with their counts, most frequent first."""
+        ranked = sorted(self._counts.items(), key=lambda entry: -entry[1][0])
+        return [(key, count) for key, (count, _) in ranked[:n]]
+
+    def to_list(self) -> List[list]:
+        return [[key, count, error] for key, (count, error) in self._counts.items()]
+
+    @classmethod
+    def from_list(cls, capacity: int, entries: List[list]) -> 'SpaceSaving':
+        summary = cls(capacity)
+        summary._counts = {key: [count, error] for key, count, error in entries}
+        return summary
+
+
+class _Bucket:
+    """Counts of the trades added within one time bucket."""
+
+    def __init__(self, start: float, width: int, depth: int, top_k: int):
+        self.start = start
+        self.trades = 0
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy = {side: SpaceSaving(top_k) for side in SIDES}
+
+
+class MarketSnapshot:
+    """Supply and demand of items over a time window.
+
+    Attributes:
+        start (float): Unix timestamp of the start of the oldest bucket in the window.
+        end (float): Unix timestamp the snapshot was taken at.
+        trades (int): Number of trades counted.
+
+    """
+
+    def __init__(self, sketch: CountMinSketch, heavy: Dict[str, SpaceSaving], trades: int,
+                 start: float, end: float):
+        self.sketch = sketch
+        self.heavy = heavy
+        self.trades = trades
+        self.start = start
+        self.end = end
+
+    def count(self, data_id: Any, side: str, paint: Optional[str] = None,
+              certification: Optional[str] = None, platform: Optional[str] = None) -> int:
+        """How often an item appeared on a side of the trades.
+
+        Args:
+            data_id: ID of the item.
+            side: `'have'` for the supply, `'want'` for the demand.
+            paint: Only count the item in this paint, `''` for unpainted, `None` for any paint.
+            certification: Only count the item with this certification, `''` for none.
+            platform: Only count trades on this platform.
+
+        Returns:
+            The estimated count, which is never too low.
+
+        """
+        if side not in SIDES:
+            raise ValueError('side must be one of %s, not %r.' % (', '.join(SIDES), side))
+        estimate = self.sketch.estimate(_key(data_id, side, paint, certification, platform))
+        if paint is None and certification is None and platform is None:
+            for key, count in self.heavy[side].top():
+                if key == data_id:
+                    return min(count, estimate)
+        return estimate
+
+    def supply(self, data_id: Any, **breakdown) -> int:
+        """How often an item was offered, see `count`."""
+        return self.count(data_id, 'have', **breakdown)
+
+    def demand(self, data_id: Any, **breakdown) -> int:
+        """How often an item was asked for, see `count`."""
+        return self.count(data_id, 'want', **breakdown)
+
+    def top(self, side: str, n: int = 10) -> List[Tuple[Any, int]]:
+        """The `n` items which appeared most often on a side, with their counts."""
+        return self.heavy[side].top(n)
+
+    def to_dict(self, n: int = 10) -> Dict[str, Any]:
+        """The window and the `n` most offered and asked for items."""
+        return {
+            'start': self.start,
+            'end': self.end,
+            'trades': self.trades,
+            'top': {side: self.top(side, n) for side in SIDES}
+        }
+
+
+class MarketAggregator:
+    """Counts of the items in trades, in time buckets.
+
+    Attributes:
+        bucket_seconds (float): Duration of a time bucket.
+        buckets (int): Number of buckets kept, older ones are dropped.
+        width (int): Width of the count-min sketch of each bucket.
+        depth (int): Depth of the count-min sketch of each bucket.
+        top_k (int): Number of items per side which are tracked exactly.
+
+    """
+
+    _MAGIC = b'RLGMARKET1'
+
+    def __init__(self, bucket_seconds: float = 3600, buckets: int = 168, width: int = 1024,
+                 depth: int = 4, top_k: int = 100):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self._buckets = []  # type: List[_Bucket]
+
+    def _bucket(self, at: float) -> _Bucket:
+        """The bucket of a timestamp, creating it and dropping expired buckets if needed."""
+        start = at - at % self.bucket_seconds
+        for bucket in reversed(self._buckets):
+            if bucket.start == start:
+                return bucket
+            if bucket.start < start:
+                break
+        bucket = _Bucket(start, self.width, self.depth, self.top_k)
+        self._buckets.append(bucket)
+        self._buckets.sort(key=lambda kept: kept.start)
+        newest = self._buckets[-1].start
+        self._buckets = [
+            kept for kept in self._buckets
+            if kept.start > newest - self.buckets * self.bucket_seconds
+        ]
+        return bucket
+
+    def add(self, trade: Dict[str, Any], at: Optional[float] = None):
+        """Count the items of a trade.
+
+        Args:
+            trade: A trade in JSON format, or a `RlTrade`.
+            at: Unix timestamp of the trade, defaults to now.
+
+        """
+        bucket = self._bucket(time.time() if at is None else at)
+        bucket.trades += 1
+        platform = trade.get('platform')
+        for side in SIDES:
+            for item in trade.get(side) or ():
+                data_id = item.get('data_id')
+                if data_id is None:
+                    continue
+                bucket.heavy[side].add(data_id)
+                for paint, certification, trade_platform in product(
+                        (item.get('paint', ''), None),
+                        (item.get('certification', ''), None),
+                        (platform, None)):
+                    bucket.sketch.add(_key(data_id, side, paint, certification, trade_platform))
+
+    def update(self, trades: Iterable[Dict[str, Any]], at: Optional[float] = None):
+        """Count the items of several trades."""
+        for trade in trades:
+            self.add(trade, at)
+
+    def snapshot(self, window: Optional[float] = None,
+                 now: Optional[float] = None) -> MarketSnapshot:
+        """The counts of the buckets within a time window.
+
+        Args:
+            window: Seconds to look back, every bucket kept if `None`.  Counts are kept per
+                bucket, so the window is rounded up to whole buckets.
+            now: Unix timestamp the window ends at, defaults to now.
+
+        Returns:
+            The merged counts, which stay valid when more trades are added.
+
+        """
+        now = time.time() if now is None else now
+        sketch = CountMinSketch(self.width, self.depth)
+        heavy = {side: SpaceSaving(self.top_k) for side in SIDES}
+        trades = 0
+        start = now
+        for bucket in self._buckets:
+            if window is not None and bucket.start + self.bucket_seconds <= now - window:
+                continue
+            sketch.merge(bucket.sketch)
+            for side in SIDES:
+                heavy[side].merge(bucket.heavy[side])
+            trades += bucket.trades
+            start = min(start, bucket.start)
+        return MarketSnapshot(sketch, heavy, trades, start, now)
+
+    def save(self, path: str):
+        """Write the counts to a file, replacing it atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = json.dumps({
+            'bucket_seconds': self.bucket_seconds,
+            'buckets': self.buckets,
+            'width': self.width,
+            'depth': self.depth,
+            'top_k': self.top_k,
+            'byteorder': sys.byteorder,
+            'entries': [{
+                'start': bucket.start,
+                'trades': bucket.trades,
+                'heavy': {side: bucket.heavy[side].to_list() for side in SIDES}
+            } for bucket in self._buckets]
+        }).encode('utf-8')
+        tmp_path = path.with_name('%s.%d.tmp' % (path.name, os.getpid()))
+        with tmp_path.open('wb') as f:
+            f.write(self._MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for bucket in self._buckets:
+                f.write(bucket.sketch.table.tobytes())
+        os.replace(str(tmp_path), str(path))
+
+    @classmethod
+    def load(cls, path: str) -> 'MarketAggregator':
+        """Read counts written by `save`.
+
+        Raises:
+            ValueError: The file does not contain market counts.
+
+        """
+        data = Path(path).read_bytes()
+        if not data.startswith(cls._MAGIC):
+            raise ValueError('%s is not a market counts file.' % path)
+        offset = len(cls._MAGIC)
+        header_length, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        header = json.loads(data[offset:offset + header_length].decode('utf-8'))
+        offset += header_length
+
+        market = cls(header['bucket_seconds'], header['buckets'], header['width'],
+                     header['depth'], header['top_k'])
+        size = 4 * market.width * market.depth
+        for entry in header['entries']:
+            bucket = _Bucket(entry['start'], market.width, market.depth, market.top_k)
+            bucket.trades = entry['trades']
+            bucket.sketch.table = array('I', data[offset:offset + size])
+            if header['byteorder'] != sys.byteorder:
+                bucket.sketch.table.byteswap()
+            bucket.heavy = {
+                side: SpaceSaving.from_list(market.top_k, entry['heavy'][side]) for side in SIDES
+            }
+            offset += size
+            market._buckets.append(bucket)
+        return market
@@ -0,0 +1,324 @@
+"""Matching engine for complementary and cyclic trades.
+
+Trade A covers trade B when the items A has include everything B wants, this is an edge `A -> B`
+of the trade graph.  Two trades which cover each other are a direct match, three trades which
+cover each other in a circle, `A -> B -> C -> A`, are a cycle in which every author receives what
+they want.  Only trades on the same platform are matched.
+
+Edges are found with indexed lookups instead of comparing every pair of trades:
+
+    - The trades which cover T have every item T wants, they are the intersection of the posting
+      lists of T's wanted items in the index of items had.
+    - The trades which T covers want a subset of the items T has.  Every trade is filed under
+      one of the items it wants, the one the fewest trades have, so they are found by looking up
+      each of T's items in this index and keeping the trades whose wanted items T all has.
+
+Items are indexed by `data_id` and paint, a wanted item without a paint is met by any paint.  The
+candidates are then checked for certification and count.  Built with `from_trades`, the graph of
+100,000 trades with 1.4 million edges takes about 10 seconds.
+
+Example:
+    >>> matcher = TradeMatcher.from_trades(RocketLeagueGarage.get_trades(max_trades=10000))
+    >>> matcher.direct_matches()
+    [('abc', 'xyz'), ...]
+    >>> matcher.add(trade)  # Incrementally, e.g. from `iter_trades`.
+    >>> matcher.matches_for(trade['data_id'])
+
+"""
+
+import gc
+from collections import OrderedDict, defaultdict, namedtuple
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# A tradeable item reduced to what matters for matching: paint, certification and count.
+_Offer = Tuple[Optional[str], Optional[str], int]
+_Want = Tuple[int, Optional[str], Optional[str], int]
+
+
+# A trade prepared for matching, with the index keys of its items and the key it is filed under
+# in the index of wanted items.  `exact` is set when the index keys alone decide whether the
+# wants of the trade are met.
+_Compiled = namedtuple(
+    '_Compiled', ['offers', 'wants', 'have_keys', 'want_keys', 'exact', 'anchor']
+)
+
+
+def _compile_have(have: List[Dict[str, Any]]) -> Dict[int, Tuple[_Offer, ...]]:
+    """Group the items had by `data_id`."""
+    offers = {}  # type: Dict[int, Tuple[_Offer, ...]]
+    for item in have:
+        if 'data_id' in item:
+            offer = (item.get('paint'), item.get('certification'), item.get('count', 1))
+            offers[item['data_id']] = offers.get(item['data_id'], ()) + (offer,)
+    return offers
+
+
+def _compile_want(want: List[Dict[str, Any]]) -> Tuple[_Want, ...]:
+    """Order the wanted items so that specific wants do not miss out to less specific ones."""
+    wants = [
+        (item['data_id'], item.get('paint') or None, item.get('certification') or None,
+         item.get('count', 1))
+        for item in want
+    ]
+    return tuple(sorted(wants, key=lambda wanted: (wanted[1] is None, wanted[2] is None)))
+
+
+def _wants_met(offers: Dict[int, Tuple[_Offer, ...]], wants: Tuple[_Want, ...]) -> bool:
+    """Whether the items had include every wanted item.
+
+    A wanted item is met by a distinct item had with the same `data_id`, at least the wanted
+    count and the same paint and certification, unless the wanted item leaves them out.
+
+    """
+    if len(wants) == 1:
+        data_id, paint, certification, count = wants[0]
+        for offer_paint, offer_certification, offer_count in offers.get(data_id, ()):
+            if ((paint is None or offer_paint == paint)
+                    and (certification is None or offer_certification == certification)
+                    and offer_count >= count):
+                return True
+        return False
+    used = set()  # type: Set[tuple]
+    for data_id, paint, certification, count in wants:
+        for position, (offer_paint, offer_certification, offer_count) in enumerate(
+                offers.get(data_id, ())):
+            if ((paint is None or offer_paint == paint)
+                    and (certification is None or offer_certification == certification)
+                    and offer_count >= count and (data_id, position) not in used):
+                used.add((data_id, position))
+                break
+        else:
+            return False
+    return True
+
+
+class TradeMatcher:
+    """Incrementally maintained graph of which trades cover each other.
+
+    Trades are identified by their `data_id`, adding a trade which is already known replaces it.
+    Trades which have or want nothing, or want an item without a `data_id`, are never matched.
+
+    """
+
+    def __init__(self):
+        self._trades = {}  # type: Dict[str, Dict[str, Any]]
+        # Keyed by `(platform, data_id, paint)`, with a paint of `None` for any paint.
+        self._have_index = defaultdict(set)  # type: Dict[tuple, Set[str]]
+        self._want_index = defaultdict(set)  # type: Dict[tuple, Set[str]]
+        self._compiled = {}  # type: Dict[str, _Compiled]
+        self._covers = defaultdict(set)  # type: Dict[str, Set[str]]
+        self._covered_by = defaultdict(set)  # type: Dict[str, Set[str]]
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[Dict[str, Any]]) -> 'TradeMatcher':
+        """Build the trade graph of trades in JSON format."""
+        matcher = cls()
+        matcher.update(trades)
+        return matcher
+
+    @staticmethod
+    def _compile(trade: Dict[str, Any]) -> Optional[_Compiled]:
+        """Prepare a trade for matching, `None` if it cannot be matched."""
+        want = trade.get('want')
+        if not want or not trade.get('have') or any('data_id' not in item for item in want):
+            return None
+        platform = trade.get('platform')
+        offers, wants = _compile_have(trade['have']), _compile_want(want)
+        have_keys = set()
+        for data_id, item_offers in offers.items():
+            have_keys.add((platform, data_id, None))
+            for paint, _, _ in item_offers:
+                if paint:
+                    have_keys.add((platform, data_id, paint))
+        want_keys = frozenset((platform, data_id, paint) for data_id, paint, _, _ in wants)
+        exact = (
+            len({data_id for data_id, _, _, _ in wants}) == len(wants)
+            and all(certification is None and count <= 1 for _, _, certification, count in wants)
+        )
+        return _Compiled(offers, wants, frozenset(have_keys), want_keys, exact, None)
+
+    def add(self, trade: Dict[str, Any]):
+        """Add a trade to the graph, finding the edges to the trades already added.
+
+        Args:
+            trade: The trade in JSON format.
+
+        """
+        trade_id = trade['data_id']
+        compiled = self._index(trade_id, trade)
+        if compiled is None:
+            return
+        givers, anchor = self._givers(trade_id, compiled)
+        self._link(trade_id, givers, self._receivers(compiled))
+        self._file(trade_id, compiled, anchor)
+
+    def update(self, trades: Iterable[Dict[str, Any]]):
+        """Add several trades to the graph.
+
+        The items had by every new trade are indexed first, so that all edges ending at a new
+        trade are found by intersecting posting lists of the index of items had.  Only the edges
+        from new trades to trades added before need the index of wanted items.  The garbage
+        collector is paused meanwhile, it would otherwise repeatedly scan the growing index.
+
+        """
+        batch = OrderedDict()  # type: Dict[str, Dict[str, Any]]
+        for trade in trades:
+            batch.pop(trade['data_id'], None)
+            batch[trade['data_id']] = trade
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            compiled = [(trade_id, self._index(trade_id, trade))
+                        for trade_id, trade in batch.items()]
+            compiled = [(trade_id, trade) for trade_id, trade in compiled if trade is not None]
+            anchors = []
+            for trade_id, trade in compiled:
+                givers, anchor = self._givers(trade_id, trade)
+                self._link(trade_id, givers, self._receivers(trade))
+                anchors.append(anchor)
+            for (trade_id, trade), anchor in zip(compiled, anchors):
+                self._file(trade_id, trade, anchor)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _index(self, trade_id: str, trade: Dict[str, Any]) -> Optional[_Compiled]:
+        """Replace a trade, adding its items had to the index.
+
+        Returns:
+            The compiled trade, `None` if it cannot be matched.
+
+        """
+        self.remove(trade_id)
+        self._trades[trade_id] = trade
+        compiled = self._compile(trade)
+        if compiled is not None:
+            self._compiled[trade_id] = compiled
+            for key in compiled.have_keys:
+                self._have_index[key].add(trade_id)
+        return compiled
+
+    def _givers(self, trade_id: str, compiled: _Compiled) -> Tuple[Set[str], tuple]:
+        """Trades which have every item a trade wants, and the key to file the trade under."""
+        postings = sorted(((self._have_index.get(key, set()), key) for key in compiled.want_keys),
+                          key=lambda posting: len(posting[0]))
+        sets = [posting for posting, _ in postings]
+        givers = sets[0].intersection(*sets[1:])
+        givers.discard(trade_id)
+        if not compiled.exact:
+            trades = self._compiled
+            givers = {
+                other_id for other_id in givers
+                if _wants_met(trades[other_id].offers, compiled.wants)
+            }
+        return givers, postings[0][1]
+
+    def _receivers(self, compiled: _Compiled) -> Set[str]:
+        """Trades filed in the index of wanted items which want only items a trade has."""
+        trades = self._compiled
+        receivers = set()
+        for key in compiled.have_keys:
+            for other_id in self._want_index.get(key, ()):
+                other = trades[other_id]
+                if other.want_keys <= compiled.have_keys and (
+                        other.exact or _wants_met(compiled.offers, other.wants)):
+                    receivers.add(other_id)
+        return receivers
+
+    def _link(self, trade_id: str, givers: Set[str], receivers: Set[str]):
+        """Add the edges from the givers to a trade and from the trade to the receivers."""
+        covers, covered_by = self._covers, self._covered_by
+        for other_id in givers:
+            covers[other_id].add(trade_id)
+        for other_id in receivers:
+            covered_by[other_id].add(trade_id)
+        if givers:
+            covered_by[trade_id] = givers
+        if receivers:
+            covers[trade_id].update(receivers)
+
+    def _file(self, trade_id: str, compiled: _Compiled, anchor: tuple):
+        """File a trade in the index of wanted items, under its least commonly had item."""
+        self._want_index[anchor].add(trade_id)
+        self._compiled[trade_id] = compiled._replace(anchor=anchor)
+
+    def remove(self, trade_id: str) -> bool:
+        """Remove a trade and its edges from the graph.
+
+        Returns:
+            Whether the trade was known.
+
+        """
+        if self._trades.pop(trade_id, None) is None:
+            return False
+        compiled = self._compiled.pop(trade_id, None)
+        if compiled is not None:
+            for key in compiled.have_keys:
+                self._discard(self._have_index, key, trade_id)
+            self._discard(self._want_index, compiled.anchor, trade_id)
+        for other_id in self._covers.pop(trade_id, ()):
+            self._discard(self._covered_by, other_id, trade_id)
+        for other_id in self._covered_by.pop(trade_id, ()):
+            self._discard(self._covers, other_id, trade_id)
+        return True
+
+    @staticmethod
+    def _discard(index: Dict[Any, Set[str]], key: Any, trade_id: str):
+        postings = index.get(key)
+        if postings is not None:
+            postings.discard(trade_id)
+            if not postings:
+                del index[key]
+
+    def covers(self, trade_id: str) -> Set[str]:
+        """IDs of the trades whose wants are met by the items of a trade."""
+        return set(self._covers.get(trade_id, ()))
+
+    def covered_by(self, trade_id: str) -> Set[str]:
+        """IDs of the trades which have everything a trade wants."""
+        return set(self._covered_by.get(trade_id, ()))
+
+    def matches_for(self, trade_id: str) -> List[str]:
+        """IDs of the trades which directly match a trade."""
+        covers = self._covers.get(trade_id, set())
+        return sorted(covers & self._covered_by.get(trade_id, set()))
+
+    def direct_matches(self) -> List[Tuple[str, str]]:
+        """Every pair of trades which cover each other."""
+        return sorted(
+            (trade_id, other_id)
+            for trade_id, covers in self._covers.items()
+            for other_id in covers & self._covered_by.get(trade_id, set())
+            if trade_id < other_id
+        )
+
+    def cycles_for(self, trade_id: str) -> List[Tuple[str, str, str]]:
+        """Three way cycles through a trade, starting with the trade.
+
+        Returns:
+            Each cycle `(A, B, C)` in which A covers B, B covers C and C covers A.
+
+        """
+        cycles = []
+        covered_by = self._covered_by.get(trade_id, set())
+        for second in self._covers.get(trade_id, ()):
+            for third in self._covers.get(second, set()) & covered_by:
+                if third != trade_id:
+                    cycles.append((trade_id, second, third))
+        return sorted(cycles)
+
+    def cycles(self) -> List[Tuple[str, str, str]]:
+        """Every three way cycle, each listed once starting with its smallest trade ID."""
+        return sorted(
+            cycle
+            for trade_id in self._covers
+            for cycle in self.cycles_for(trade_id)
+            if trade_id < cycle[1] and trade_id < cycle[2]
+        )
+
+    def __len__(self) -> int:
+        return len(self._trades)
+
+    def __contains__(self, trade_id: str) -> bool:
+        return trade_id in self._trades
@@ -0,0 +1,571 @@
+"""Long-running scheduler polling trade feeds and catalogs.
+
+A `Scheduler` crawls a set of feeds over and over on a single reactor, so that polling does not
+pay for a new process, Scrapy import and connection pool on every run:
+
+    - Each feed is due every `interval` seconds, delayed by up to `jitter` seconds so that feeds
+      with the same interval do not hit the site at the same moment.
+    - At most `max_concurrent` feeds crawl at once.  When more are due, those with the highest
+      `priority` start first, then those which have been due the longest.
+    - A feed whose previous run is still in flight skips its turn.  Turns which come up while a
+      feed is waiting for a free slot are coalesced into the run it is waiting for.
+    - Scraped items are passed to a sink as they arrive, either a `RollingJsonLinesSink` or any
+      callable taking the name of the feed and a batch of items.
+
+The queue depth, lag and throughput of each feed are kept in its `FeedStats`, which are logged
+every `stats_interval` seconds and returned by `Scheduler.stats`.
+
+Example:
+    >>> scheduler = Scheduler([
+    >>>     Feed.trades('kizuna', url='https://rocket-league.com/trades/KizunaAi', interval=60,
+    >>>                 jitter=10, priority=1, seen_path='kizuna.seen'),
+    >>>     Feed.items(interval=86400)
+    >>> ], sink=RollingJsonLinesSink('feeds'))
+    >>> scheduler.run()  # Until interrupted.
+
+"""
+
+import re
+import json
+import time
+import heapq
+import random
+import logging
+import itertools
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, IO, Iterable, List, Optional
+
+from rlgpy.api import RocketLeagueGarage
+from rlgpy.lazy import lazy_import
+from rlgpy.scraper.runners import SafeSpiderRunner
+
+if TYPE_CHECKING:  # pragma: no cover
+    from scrapy.spiders import Spider
+    from twisted.internet.defer import Deferred
+
+metrics = lazy_import('rlgpy.scraper.metrics')
+spiders = lazy_import('rlgpy.scraper.spiders')
+handlers = lazy_import('rlgpy.scraper.handlers')
+
+
+logger = logging.getLogger(__name__)
+
+
+FEED_NAME = re.compile(r'^[\w.-]+$')
+
+# Called with the name of a feed and a batch of its scraped items.
+Sink = Callable[[str, List[Dict[str, Any]]], None]
+
+
+class Feed:
+    """A spider crawled on a fixed interval.
+
+    Attributes:
+        name (str): Unique name of the feed, also the directory of its files in a sink.
+        spider (type): The scrapy spider to run.
+        settings (dict): The settings to run the spider with.
+        spider_kwargs (dict): Keyword arguments passed to the spider constructor.
+        interval (float): Seconds between the starts of two runs.
+        jitter (float): Maximum random delay of each run in seconds.
+        priority (int): Feeds with a higher priority start first when more feeds are due than
+            can run at once.
+
+    """
+
+    def __init__(self, name: str, spider: 'Spider', settings: Optional[Dict[str, Any]] = None,
+                 spider_kwargs: Optional[Dict[str, Any]] = None, interval: float = 60.0,
+                 jitter: float = 0.0, priority: int = 0):
+        """Initialize the feed.
+
+        Raises:
+            ValueError: The name is not usable as a file name, or the interval is not positive
+                or the jitter negative.
+
+        """
+        if not FEED_NAME.match(name):
+            raise ValueError('Invalid feed name %r' % name)
+        if interval <= 0 or jitter < 0:
+            raise ValueError('Feed %s needs a positive interval and no negative jitter' % name)
+        self.name = name
+        self.spider = spider
+        self.settings = settings or {}
+        self.spider_kwargs = spider_kwargs or {}
+        self.interval = interval
+        self.jitter = jitter
+        self.priority = priority
+
+    def __repr__(self) -> str:
+        return 'Feed(%r, interval=%s, priority=%d)' % (self.name, self.interval, self.priority)
+
+    @classmethod
+    def trades(cls, name: str, url: Optional[str] = None, interval: float = 60.0,
+               max_trades: int = 100, concurrent_c: int = 5, seen_path: Optional[str] = None,
+               cache_enabled: bool = False, adaptive: bool = False,
+               target_rate: Optional[float] = None, store_path: Optional[str] = None,
+               **options) -> 'Feed':
+        """A feed of the trades of a trade page, see `RocketLeagueGarage.iter_trades`.
+
+        With `seen_path` every run only delivers the trades which previous runs did not.
+
+        Args:
+            options: `jitter` and `priority` of the feed.
+
+        """
+        return cls(
+            name, spiders.TradeSpider,
+            settings=RocketLeagueGarage._trade_settings(
+                max_trades, concurrent_c, cache_enabled, adaptive, target_rate, store_path
+            ),
+            spider_kwargs=RocketLeagueGarage._trade_kwargs(url and [url], None, seen_path),
+            interval=interval, **options
+        )
+
+    @classmethod
+    def items(cls, name: str = 'items', interval: float = 86400.0, cache_enabled: bool = True,
+              store_path: Optional[str] = None, **options) -> 'Feed':
+        """A feed of the item catalog."""
+        return cls(
+            name, spiders.ItemSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled, store_path),
+            interval=interval, **options
+        )
+
+    @classmethod
+    def achievements(cls, name: str = 'achievements', interval: float = 86400.0,
+                     cache_enabled: bool = True, store_path: Optional[str] = None,
+                     **options) -> 'Feed':
+        """A feed of the achievements."""
+        return cls(
+            name, spiders.AchievementSpider,
+            settings=RocketLeagueGarage._catalog_settings(cache_enabled, store_path),
+            interval=interval, **options
+        )
+
+
+# Feed constructors by the `type` of a feed in a configuration, see `Scheduler.from_config`.
+FEED_TYPES = {
+    'trades': Feed.trades,
+    'items': Feed.items,
+    'achievements': Feed.achievements
+}
+
+
+class FeedStats:
+    """Counters of the runs of a feed.
+
+    Attributes:
+        runs (int): Finished runs.
+        items (int): Items delivered to the sink.
+        errors (int): Runs which failed.
+        skipped (int): Turns skipped because the previous run was still in flight.
+        coalesced (int): Turns merged into a run which was already waiting for a free slot.
+        queue_depth (int): Turns waiting for a free slot, counting coalesced ones.
+        lag (float): Seconds the last run waited for a free slot after it was due.
+        max_lag (float): Longest such wait.
+        last_items (int): Items delivered by the last run.
+        last_duration (float): Seconds the last run took.
+        last_error (str): Error of the last failed run.
+        last_metrics (CrawlMetrics): Metrics of the last finished crawl.
+        started_at (float): Unix timestamp at which the scheduler started.
+
+    """
+
+    def __init__(self, started_at: float):
+        self.runs = 0
+        self.items = 0
+        self.errors = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.queue_depth = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.last_items = 0
+        self.last_duration = None  # type: Optional[float]
+        self.last_error = None  # type: Optional[str]
+        self.last_metrics = None  # type: Optional[metrics.CrawlMetrics]
+        self.started_at = started_at
+
+    def throughput(self, now: float) -> float:
+        """Items delivered per second since the scheduler started."""
+        elapsed = now - self.started_at
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def run_throughput(self) -> Optional[float]:
+        """Items per second of the last run."""
+        if not self.last_duration:
+            return None
+        return self.last_items / self.last_duration
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        """The counters in JSON format."""
+        return {
+            'runs': self.runs,
+            'items': self.items,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'coalesced': self.coalesced,
+            'queue_depth': self.queue_depth,
+            'lag': self.lag,
+            'max_lag': self.max_lag,
+            'throughput': self.throughput(now),
+            'run_throughput': self.run_throughput,
+            'last_items': self.last_items,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error
+        }
+
+
+class RollingJsonLinesSink:
+    """Writes the items of each feed to JSON lines files which are rolled over by size and age.
+
+    The files of a feed are kept in a directory named after it, each named after the UTC time it
+    was opened at and a counter, e.g. `feeds/kizuna/20190601T120000-000.jsonl`.  Every batch is
+    flushed once written, so that readers see items shortly after they were scraped.
+
+    Attributes:
+        directory (Path): Directory of the feed directories.
+        max_bytes (int): Size at which a file is rolled over.
+        max_age (float): Seconds after which a file is rolled over.
+        keep (int): Number of files kept per feed, older ones are deleted.  Keeps all of them
+            when `None`.
+
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 2**20, max_age: float = 3600.0,
+                 keep: Optional[int] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self._files = {}  # type: Dict[str, tuple]
+
+    def __call__(self, feed: str, items: List[Dict[str, Any]]):
+        handle = self._file(feed)
+        handle.write(''.join(json.dumps(item) + '\n' for item in items))
+        handle.flush()
+
+    def files(self, feed: str) -> List[Path]:
+        """The files of a feed, oldest first."""
+        return sorted((self.directory / feed).glob('*.jsonl'))
+
+    def close(self):
+        """Close the open files."""
+        for handle, _ in self._files.values():
+            handle.close()
+        self._files.clear()
+
+    def _file(self, feed: str) -> IO[str]:
+        """The file of a feed to write to, rolling it over when it is due."""
+        now = time.time()
+        handle, opened_at = self._files.get(feed, (None, None))
+        if handle is not None:
+            if handle.tell() < self.max_bytes and now - opened_at < self.max_age:
+                return handle
+            handle.close()
+        directory = self.directory / feed
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))
+        count = max((int(path.stem.rsplit('-', 1)[1])
+                     for path in directory.glob('%s-*.jsonl' % stamp)), default=-1)
+        path = directory / ('%s-%03d.jsonl' % (stamp, count + 1))
+        handle = path.open('w', encoding='utf-8')
+        self._files[feed] = (handle, now)
+        if self.keep is not None:
+            for old in self.files(feed)[:-self.keep]:
+                old.unlink()
+        return handle
+
+
+class _FeedState:
+    """Scheduling state of a feed."""
+
+    def __init__(self, feed: Feed, stats: FeedStats):
+        self.feed = feed
+        self.stats = stats
+        self.next_turn = 0.0
+        self.timer = None
+        self.queued_at = None  # type: Optional[float]
+        self.running = False
+
+
+class Scheduler:
+    """Crawls feeds on their intervals on one reactor.
+
+    Attributes:
+        feeds (Dict[str, Feed]): The feeds by name.
+        sink (Sink): Called with the name of a feed and each batch of its items.
+        max_concurrent (int): Maximum number of feeds crawling at once.
+        stats_interval (float): Seconds between the log lines of the stats, never logged when
+            `None`.
+
+    """
+
+    def __init__(self, feeds: Iterable[Feed], sink: Sink, max_concurrent: int = 4,
+                 stats_interval: Optional[float] = 60.0, clock: Any = None):
+        """Initialize the scheduler, feeds are only crawled once it is started.
+
+        Args:
+            clock: Provides `seconds` and `callLater`, the reactor of `run` by default.
+
+        Raises:
+            ValueError: Two feeds have the same name.
+
+        """
+        self.feeds = {}  # type: Dict[str, Feed]
+        for feed in feeds:
+            if feed.name in self.feeds:
+                raise ValueError('Duplicate feed name %r' % feed.name)
+            self.feeds[feed.name] = feed
+        self.sink = sink
+        self.max_concurrent = max_concurrent
+        self.stats_interval = stats_interval
+        self._clock = clock
+        self._random = random.Random()
+        self._states = {}  # type: Dict[str, _FeedState]
+        self._queue = []  # type: List[tuple]
+        self._sequence = itertools.count()
+        self._active = 0
+        self._stats_call = None
+        self._dispatch_call = None
+        self._stopping = False
+        self._idle = []  # type: List[Deferred]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], sink: Sink) -> 'Scheduler':
+        """Create a scheduler from its configuration in JSON format.
+
+        Example:
+            >>> Scheduler.from_config({
+            >>>     'max_concurrent': 2,
+            >>>     'feeds': [
+            >>>         {'type': 'trades', 'name': 'steam', 'url': url, 'interval': 30},
+            >>>         {'type': 'items', 'interval': 3600, 'priority': -1}
+            >>>     ]
+            >>> }, sink)
+
+        Args:
+            config: The `feeds` with their `type` and the arguments of its `Feed` constructor,
+                and any other arguments of the scheduler.
+
+        Raises:
+            ValueError: A feed has an unknown type or invalid arguments.
+
+        """
+        config = dict(config)
+        feeds = []
+        for options in config.pop('feeds', []):
+            options = dict(options)
+            feed_type = options.pop('type', None)
+            if feed_type not in FEED_TYPES:
+                raise ValueError('Unknown feed type %r, expected one of %s' % (
+                    feed_type, ', '.join(FEED_TYPES)
+                ))
+            try:
+                feeds.append(FEED_TYPES[feed_type](**options))
+            except TypeError as exc:
+                raise ValueError('Invalid %s feed: %s' % (feed_type, exc))
+        return cls(feeds, sink, **config)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of feeds waiting for a free slot."""
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, Any]:
+        """The stats of the scheduler and of each feed in JSON format."""
+        now = self._clock.seconds() if self._clock is not None else time.time()
+        return {
+            'active': self._active,
+            'queue_depth': self.queue_depth,
+            'feeds': {name: state.stats.to_dict(now) for name, state in self._states.items()}
+        }
+
+    def start(self):
+        """Schedule the first run of every feed, within its jitter from now."""
+        now = self._clock.seconds()
+        self._stopping = False
+        for feed in self.feeds.values():
+            state = _FeedState(feed, FeedStats(now))
+            state.next_turn = now
+            self._states[feed.name] = state
+            self._schedule(state)
+        if self.stats_interval:
+            self._stats_call = self._clock.callLater(self.stats_interval, self._log_stats)
+
+    def stop(self) -> 'Deferred':
+        """Stop scheduling runs and cancel the running ones.
+
+        Returns:
+            A deferred which fires once the running crawls have closed.
+
+        """
+        from twisted.internet.defer import Deferred, succeed
+
+        self._stopping = True
+        for state in self._states.values():
+            if state.timer is not None and state.timer.active():
+                state.timer.cancel()
+        for call in (self._stats_call, self._dispatch_call):
+            if call is not None and call.active():
+                call.cancel()
+        self._dispatch_call = None
+        for _, _, _, state in self._queue:
+            state.queued_at = None
+            state.stats.queue_depth = 0
+        self._queue = []
+        if self._active == 0:
+            self._close_sink()
+            return succeed(None)
+        deferred = Deferred()
+        self._idle.append(deferred)
+        return deferred
+
+    def run(self, duration: Optional[float] = None) -> Dict[str, Any]:
+        """Start the scheduler and the reactor, a blocking function.
+
+        Stops on `SIGINT` or `SIGTERM`, or after `duration` seconds, once the running crawls
+        have closed.  The reactor can not be restarted, so call this at most once per process.
+
+        Returns:
+            The final stats, see `stats`.
+
+        """
+        # Imported here so that only the scheduling process installs a reactor.
+        from twisted.internet import reactor
+
+        if self._clock is None:
+            self._clock = reactor
+        reactor.addSystemEventTrigger('before', 'shutdown', self.stop)
+        if duration is not None:
+            reactor.callLater(duration, lambda: self.stop().addBoth(lambda _: reactor.stop()))
+        reactor.callWhenRunning(self.start)
+        logger.info('Scheduling feeds %s' % ', '.join(self.feeds))
+        reactor.run()
+        return self.stats()
+
+    def _crawl(self, feed: Feed, send: Callable[[tuple], None],
+               cancelled: Callable[[], bool]) -> 'Deferred':
+        """Start a crawl of the feed on the reactor, see `SafeSpiderRunner._start_crawl`."""
+        from scrapy.crawler import CrawlerRunner
+
+        runner = CrawlerRunner(
+            metrics.instrument(dict(feed.settings, **handlers.SHARED_POOL_SETTINGS))
+        )
+        return SafeSpiderRunner._start_crawl(
+            runner, feed.spider, feed.settings, feed.spider_kwargs, send, cancelled
+        )
+
+    def _schedule(self, state: _FeedState):
+        """Set the timer of the next turn of a feed."""
+        delay = state.next_turn - self._clock.seconds()
+        if state.feed.jitter:
+            delay += self._random.uniform(0, state.feed.jitter)
+        state.timer = self._clock.callLater(max(delay, 0.0), self._turn, state)
+
+    def _turn(self, state: _FeedState):
+        """Queue a run of the feed whose turn came up, unless it is running or queued."""
+        now = self._clock.seconds()
+        feed, stats = state.feed, state.stats
+        missed = 0
+        state.next_turn += feed.interval
+        while state.next_turn <= now:
+            # The reactor was blocked for longer than the interval.
+            state.next_turn += feed.interval
+            missed += 1
+        if state.running:
+            logger.debug('Skipping %s, its previous run is still in flight' % feed.name)
+            stats.skipped += 1 + missed
+        elif state.queued_at is not None:
+            stats.coalesced += 1 + missed
+            stats.queue_depth += 1 + missed
+        else:
+            state.queued_at = now
+            stats.coalesced += missed
+            stats.queue_depth = 1 + missed
+            heapq.heappush(self._queue, (-feed.priority, now, next(self._sequence), state))
+        self._schedule(state)
+        if self._dispatch_call is None:
+            # After the other turns due at the same time, so that they compete on priority.
+            self._dispatch_call = self._clock.callLater(0, self._dispatch)
+
+    def _dispatch(self):
+        """Start the queued runs for which there are free slots."""
+        self._dispatch_call = None
+        while self._queue and self._active < self.max_concurrent and not self._stopping:
+            state = heapq.heappop(self._queue)[-1]
+            self._start_run(state)
+
+    def _start_run(self, state: _FeedState):
+        feed, stats = state.feed, state.stats
+        started_at = self._clock.seconds()
+        stats.lag = started_at - state.queued_at
+        stats.max_lag = max(stats.max_lag, stats.lag)
+        stats.queue_depth = 0
+        state.queued_at = None
+        state.running = True
+        self._active += 1
+        items = [0]
+
+        def send(message: tuple):
+            kind, payload = message
+            if kind == 'items':
+                items[0] += len(payload)
+                try:
+                    self.sink(feed.name, payload)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception('Sink failed to take the items of %s' % feed.name)
+            elif kind == 'error':
+                stats.errors += 1
+                stats.last_error = payload
+                logger.warning('Feed %s failed: %s' % (feed.name, payload))
+            else:
+                stats.last_metrics = payload
+
+        def finish(result):
+            stats.runs += 1
+            stats.items += items[0]
+            stats.last_items = items[0]
+            stats.last_duration = self._clock.seconds() - started_at
+            state.running = False
+            self._active -= 1
+            if self._stopping:
+                self._check_idle()
+            else:
+                self._dispatch()
+            return result
+
+        from twisted.internet.defer import maybeDeferred
+
+        logger.debug('Starting %s after a lag of %.3fs' % (feed.name, stats.lag))
+        # A crawl which fails to start counts as a failed run, so that the feed gets its slot back.
+        deferred = maybeDeferred(self._crawl, feed, send, lambda: self._stopping)
+        deferred.addErrback(lambda failure: send(('error', failure.getErrorMessage())))
+        deferred.addBoth(finish)
+        deferred.addErrback(
+            lambda failure: logger.error('Run of %s failed: %s' % (
+                feed.name, failure.getErrorMessage()
+            ))
+        )
+
+    def _check_idle(self):
+        """Fire the deferreds of `stop` once the last running crawl closed."""
+        if self._active:
+            return
+        self._close_sink()
+        idle, self._idle = self._idle, []
+        for deferred in idle:
+            deferred.callback(None)
+
+    def _close_sink(self):
+        close = getattr(self.sink, 'close', None)
+        if close is not None:
+            close()
+
+    def _log_stats(self):
+        for name, stats in self.stats()['feeds'].items():
+            logger.info('Feed %s: %d runs, %d items, %d errors, queue depth %d, lag %.3fs, '
+                        '%.2f items/s' % (name, stats['runs'], stats['items'], stats['errors'],
+                                          stats['queue_depth'], stats['lag'],
+                                          stats['throughput']))
+        self._stats_call = self._clock.callLater(self.stats_interval, self._log_stats)
@@ -0,0 +1,114 @@
+"""Result channel between a crawling process and its parent.
+
+Instead of exporting items to a feed file which the parent re-reads, scraped items are converted
+to plain dictionaries and sent to the parent in batches.  Every message is a `(kind, payload)`
+tuple:
+
+    ('items', [...])    A batch of scraped items.
+    ('done', metrics)   The crawl finished with `CrawlMetrics`, no further messages follow.
+    ('error', str)      The crawl failed, no further messages follow.
+
+"""
+
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List
+
+
+RESULT_BATCH_SIZE = 100
+
+
+def to_dict(item: Any) -> Any:
+    """Convert a scraped item, including nested items, into plain python objects.
+
+    Args:
+        item: A scrapy item, dictionary or a list of them.
+
+    Returns:
+        The same data using only dictionaries and lists, as it would be exported to JSON.
+
+    """
+    if isinstance(item, Mapping):
+        return {key: to_dict(value) for key, value in item.items()}
+    if isinstance(item, (list, tuple)):
+        return [to_dict(value) for value in item]
+    return item
+
+
+class ItemBatcher:
+    """Collects scraped items and sends them in batches.
+
+    Attributes:
+        send (Callable): Called with each `(kind, payload)` message.
+        batch_size (int): Number of items sent per message.
+
+    """
+
+    def __init__(self, send: Callable[[tuple], None], batch_size: int = RESULT_BATCH_SIZE):
+        self.send = send
+        self.batch_size = batch_size
+        self._batch = []
+
+    def add(self, item: Any):
+        """Queue an item, sending the batch once it is full."""
+        self._batch.append(to_dict(item))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send the queued items, if any."""
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self.send(('items', batch))
+
+
+def iter_batches(recv: Callable[[], tuple]) -> Iterator[List[Dict[str, Any]]]:
+    """Yield batches of items as they arrive until the crawl has finished.
+
+    The generator returns the payload of the final message, the metrics of the crawl.
+
+    Args:
+        recv: Returns the next `(kind, payload)` message.
+
+    Yields:
+        Each batch of items sent over the channel.
+
+    Raises:
+        RuntimeError: The crawl failed or the sending process exited unexpectedly.
+
+    """
+    while True:
+        try:
+            kind, payload = recv()
+        except EOFError:
+            raise RuntimeError('Crawler process exited before finishing the crawl.')
+        if kind == 'items':
+            yield payload
+        elif kind == 'error':
+            raise RuntimeError('Crawl failed: %s' % payload)
+        else:
+            return payload
+
+
+def iter_items(recv: Callable[[], tuple]) -> Iterator[Dict[str, Any]]:
+    """Yield items as they arrive until the crawl has finished.
+
+    The generator returns the payload of the final message, the metrics of the crawl.
+
+    Args:
+        recv: Returns the next `(kind, payload)` message.
+
+    Yields:
+        Each item sent over the channel.
+
+    Raises:
+        RuntimeError: The crawl failed or the sending process exited unexpectedly.
+
+    """
+    batches = iter_batches(recv)
+    while True:
+        try:
+            batch = next(batches)
+        except StopIteration as done:
+            return done.value
+        yield from batch
+
@@ -0,0 +1,133 @@
+"""Bounded memory set membership for trade IDs.
+
+A `RotatingBloomFilter` remembers roughly the last `capacity * generations` keys using a fixed
+amount of memory, which lets incremental trade crawls run for weeks without the set of seen trades
+growing without bound.  Older keys are forgotten one generation at a time.
+
+"""
+
+import os
+import math
+import json
+import struct
+import hashlib
+from pathlib import Path
+from typing import Iterable, List
+
+
+class BloomFilter:
+    """Fixed size Bloom filter using double hashing.
+
+    Attributes:
+        num_bits (int): Size of the bit array.
+        num_hashes (int): Number of bits set per key.
+        count (int): Number of keys added.
+
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """Size the filter for `capacity` keys at the given false positive rate."""
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.sha1(key.encode('utf-8')).digest()
+        first, second = struct.unpack_from('<QQ', digest)
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, key: str):
+        """Add a key to the filter."""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+
+class RotatingBloomFilter:
+    """A Bloom filter which forgets the oldest keys once it is full.
+
+    Keys are added to the newest generation.  When it holds `capacity` keys a new generation is
+    started and the oldest one is dropped once there are more than `generations`.
+
+    Attributes:
+        capacity (int): Keys per generation.
+        error_rate (float): False positive rate of each generation.
+        generations (int): Number of generations kept.
+
+    """
+
+    _MAGIC = b'RLGBLOOM1'
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001, generations: int = 4):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.generations = generations
+        self._filters = [BloomFilter(capacity, error_rate)]
+
+    def add(self, key: str):
+        """Add a key, rotating the generations if the newest one is full."""
+        if self._filters[-1].count >= self.capacity:
+            self._filters.append(BloomFilter(self.capacity, self.error_rate))
+            if len(self._filters) > self.generations:
+                self._filters.pop(0)
+        self._filters[-1].add(key)
+
+    def update(self, keys: Iterable[str]):
+        """Add several keys."""
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in bloom for bloom in reversed(self._filters))
+
+    def save(self, path: str):
+        """Write the filter to a file, replacing it atomically."""
+        path = Path(path)
+        header = json.dumps({
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'generations': self.generations,
+            'counts': [bloom.count for bloom in self._filters]
+        }).encode('utf-8')
+        tmp_path = path.with_name('%s.%d.tmp' % (path.name, os.getpid()))
+        with tmp_path.open('wb') as f:
+            f.write(self._MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for bloom in self._filters:
+                f.write(bloom.bits)
+        os.replace(str(tmp_path), str(path))
+
+    @classmethod
+    def load(cls, path: str) -> 'RotatingBloomFilter':
+        """Read a filter written by `save`.
+
+        Raises:
+            ValueError: The file does not contain a filter.
+
+        """
+        data = Path(path).read_bytes()
+        if not data.startswith(cls._MAGIC):
+            raise ValueError('%s is not a bloom filter file.' % path)
+        offset = len(cls._MAGIC)
+        header_length, = struct.unpack_from('<I', data, offset)
+        offset += 4
+        header = json.loads(data[offset:offset + header_length].decode('utf-8'))
+        offset += header_length
+
+        seen = cls(header['capacity'], header['error_rate'], header['generations'])
+        filters = []  # type: List[BloomFilter]
+        for count in header['counts']:
+            bloom = BloomFilter(seen.capacity, seen.error_rate)
+            bloom.bits = bytearray(data[offset:offset + len(bloom.bits)])
+            bloom.count = count
+            offset += len(bloom.bits)
+            filters.append(bloom)
+        seen._filters = filters or seen._filters
+        return seen
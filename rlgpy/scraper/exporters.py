@@ -0,0 +1,400 @@
+"""Compact feed exporters for archiving large crawls.
+
+Two feed formats are added to the `jsonlines` feed scrapy exports by default:
+
+    - `msgpack`: one MessagePack map per item.  Smaller and faster to reload than JSON text,
+      requires the optional `msgpack` package.
+    - `columnar`: the values of each field are stored together and compressed with zlib, in row
+      groups of `ROW_GROUP_SIZE` items.  The tradeable items in the `have` and `want`
+      lists of trades are flattened into a child table keyed by the row of their trade.
+      A `ColumnarReader` memory maps the file and only decompresses the columns it is asked for.
+
+Example:
+    >>> settings = feed_settings('trades.col', 'columnar')
+    >>> SafeSpiderRunner.run(TradeSpider, dict(settings, CLOSESPIDER_ITEMCOUNT=100000),
+    >>>                      delete_file=False)
+    >>> reader = ColumnarReader('trades.col')
+    >>> reader.read(ROWS, ['data_id', 'platform'])
+    >>> reader.read(TRADEABLE_ITEMS, [TRADE_KEY, 'data_id', 'paint'])
+    >>> trades = reader.trades()  # Rebuilt in JSON format.
+
+"""
+
+import sys
+import json
+import mmap
+import zlib
+import struct
+from array import array
+from pathlib import Path
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+from scrapy.exporters import BaseItemExporter
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+# Exporters to register in `FEED_EXPORTERS` to use the formats of this module.
+FEED_EXPORTERS = {
+    'msgpack': 'rlgpy.scraper.exporters.MsgpackItemExporter',
+    'columnar': 'rlgpy.scraper.exporters.ColumnarItemExporter'
+}
+
+# Table holding the exported items, and the child table holding their tradeable items.
+ROWS = 'rows'
+TRADEABLE_ITEMS = 'tradeable_items'
+
+# Fields of a trade flattened into the child table, and the columns linking them to their trade:
+# the index of its row, which links duplicated trades correctly, and its `data_id`.
+CHILD_FIELDS = ('have', 'want')
+ROW_KEY = 'row'
+TRADE_KEY = 'trade_id'
+SIDE = 'side'
+
+# Column of the rows listing which of the `CHILD_FIELDS` they had, comma separated.
+FLATTENED = '_flattened'
+
+# Items per row group of a columnar file.
+ROW_GROUP_SIZE = 65536
+
+
+def feed_settings(uri: str, feed_format: str = 'jsonlines') -> Dict[str, Any]:
+    """Settings which export the scraped items to a file in one of the supported formats.
+
+    Args:
+        uri: The file to export to.
+        feed_format: `jsonlines`, `msgpack` or `columnar`.
+
+    """
+    return {'FEED_URI': uri, 'FEED_FORMAT': feed_format, 'FEED_EXPORTERS': FEED_EXPORTERS}
+
+
+def _builtin(value: Any) -> Any:
+    """Convert scrapy items nested in a value to dicts."""
+    if isinstance(value, dict) or hasattr(value, 'fields'):
+        return {key: _builtin(field) for key, field in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_builtin(field) for field in value]
+    return value
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise ImportError('The msgpack feed format requires the msgpack package.')
+
+
+class _DictExporter(BaseItemExporter):
+    """Base of the exporters, which export an item as a dict of its fields."""
+
+    def _item_fields(self, item: Any) -> Dict[str, Any]:
+        names = self.fields_to_export or list(item.keys())
+        return {name: _builtin(item[name]) for name in names if name in item}
+
+
+class MsgpackItemExporter(_DictExporter):
+    """Writes each item as a MessagePack map."""
+
+    def __init__(self, file, **kwargs):
+        _require_msgpack()
+        super().__init__(**kwargs)
+        self.file = file
+        self._packer = msgpack.Packer(use_bin_type=True)
+
+    def export_item(self, item: Any):
+        self.file.write(self._packer.pack(self._item_fields(item)))
+
+
+def read_msgpack(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a file written by the `MsgpackItemExporter`, one at a time."""
+    _require_msgpack()
+    with open(str(path), 'rb') as f:
+        yield from msgpack.Unpacker(f, raw=False)
+
+
+def _encode_column(values: List[Any], level: int) -> tuple:
+    """Serialize and compress the values of a column.
+
+    Returns:
+        The kind of encoding and the compressed data.
+
+    """
+    if values and all(type(value) is int for value in values):
+        try:
+            return 'int', zlib.compress(array('q', values).tobytes(), level)
+        except OverflowError:
+            pass
+    elif values and all(type(value) is str for value in values):
+        encoded = [value.encode('utf-8') for value in values]
+        data = array('I', [len(value) for value in encoded]).tobytes() + b''.join(encoded)
+        return 'str', zlib.compress(data, level)
+    return 'json', zlib.compress(json.dumps(values).encode('utf-8'), level)
+
+
+def _decode_column(kind: str, data: bytes, rows: int, swap: bool) -> List[Any]:
+    """Decompress and deserialize the values of a column written by `_encode_column`."""
+    data = zlib.decompress(data)
+    if kind == 'json':
+        return json.loads(data.decode('utf-8'))
+    if kind == 'int':
+        values = array('q', data)
+        if swap:
+            values.byteswap()
+        return values.tolist()
+    lengths = array('I', data[:4 * rows])
+    if swap:
+        lengths.byteswap()
+    values = []
+    offset = 4 * rows
+    for length in lengths:
+        values.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+    return values
+
+
+class _TableWriter:
+    """Buffers the rows of a table and writes them as a row group once it is full."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns = OrderedDict()  # type: Dict[str, List[Any]]
+        self.rows = 0
+        self.groups = []  # type: List[Dict[str, Any]]
+
+    def add(self, row: Dict[str, Any]):
+        for name in row:
+            if name not in self.columns:
+                self.columns[name] = [None] * self.rows
+        for name, values in self.columns.items():
+            values.append(row.get(name))
+        self.rows += 1
+
+    def flush(self, file, offset: int, level: int) -> int:
+        """Write the buffered rows at `offset` and return the offset after them."""
+        if not self.rows:
+            return offset
+        group = {'rows': self.rows, 'columns': OrderedDict()}
+        for name, values in self.columns.items():
+            kind, data = _encode_column(values, level)
+            file.write(data)
+            group['columns'][name] = [kind, offset, len(data)]
+            offset += len(data)
+        self.groups.append(group)
+        self.columns = OrderedDict()
+        self.rows = 0
+        return offset
+
+
+class ColumnarItemExporter(_DictExporter):
+    """Writes the items column by column, see the module documentation.
+
+    The file starts with `MAGIC` and ends with a JSON footer locating each column of each row
+    group, followed by the length of the data and the footer and `MAGIC` again.  Offsets are
+    relative to the first `MAGIC`, so a file appended to an existing one can still be read.
+
+    """
+
+    MAGIC = b'RLGCOL1'
+    _TRAILER = struct.Struct('<QI')
+
+    def __init__(self, file, row_group_size: int = ROW_GROUP_SIZE, compress_level: int = 6,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.file = file
+        self.row_group_size = row_group_size
+        self.compress_level = compress_level
+        self._tables = OrderedDict(
+            (name, _TableWriter(name)) for name in (ROWS, TRADEABLE_ITEMS)
+        )
+        self._offset = 0
+        self._row_count = 0
+
+    def start_exporting(self):
+        self.file.write(self.MAGIC)
+        self._offset = len(self.MAGIC)
+
+    def export_item(self, item: Any):
+        row = self._item_fields(item)
+        rows = self._tables[ROWS]
+        children = self._tables[TRADEABLE_ITEMS]
+        flattened = []
+        for side in CHILD_FIELDS:
+            if not isinstance(row.get(side), list):
+                continue
+            flattened.append(side)
+            for child in row.pop(side):
+                children.add(dict(child, **{
+                    ROW_KEY: self._row_count, TRADE_KEY: row.get('data_id'), SIDE: side
+                }))
+        if flattened:
+            row[FLATTENED] = ','.join(flattened)
+        rows.add(row)
+        self._row_count += 1
+        for table in self._tables.values():
+            if table.rows >= self.row_group_size:
+                self._offset = table.flush(self.file, self._offset, self.compress_level)
+
+    def finish_exporting(self):
+        for table in self._tables.values():
+            self._offset = table.flush(self.file, self._offset, self.compress_level)
+        footer = json.dumps({
+            'byteorder': sys.byteorder,
+            'tables': {
+                name: table.groups for name, table in self._tables.items() if table.groups
+            }
+        }).encode('utf-8')
+        self.file.write(footer)
+        self.file.write(self._TRAILER.pack(self._offset, len(footer)))
+        self.file.write(self.MAGIC)
+
+
+class ColumnarReader:
+    """Reads a file written by the `ColumnarItemExporter`.
+
+    The file is memory mapped, reading a column only touches the pages holding it.
+
+    Attributes:
+        path (Path): The file being read.
+        tables (Dict[str, List[Dict[str, Any]]]): Row groups of each table in the file.
+
+    """
+
+    def __init__(self, path: str):
+        """Map the file and read its footer.
+
+        Raises:
+            ValueError: The file is not a columnar feed.
+
+        """
+        self.path = Path(path)
+        self._file = self.path.open('rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError('%s is not a columnar feed.' % path)
+        magic = ColumnarItemExporter.MAGIC
+        trailer = ColumnarItemExporter._TRAILER
+        end = len(self._map) - len(magic)
+        if end < trailer.size or self._map[end:] != magic:
+            self.close()
+            raise ValueError('%s is not a columnar feed.' % path)
+        data_length, footer_length = trailer.unpack_from(self._map, end - trailer.size)
+        footer_start = end - trailer.size - footer_length
+        self._base = footer_start - data_length
+        footer = json.loads(self._map[footer_start:footer_start + footer_length].decode('utf-8'))
+        self._swap = footer['byteorder'] != sys.byteorder
+        self.tables = footer['tables']
+
+    def __enter__(self) -> 'ColumnarReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+    def rows(self, table: str = ROWS) -> int:
+        """Number of rows in a table."""
+        return sum(group['rows'] for group in self.tables.get(table, []))
+
+    def columns(self, table: str = ROWS) -> List[str]:
+        """Names of the columns of a table, in order of first appearance."""
+        names = OrderedDict()
+        for group in self.tables.get(table, []):
+            names.update((name, None) for name in group['columns'])
+        return list(names)
+
+    def read(self, table: str = ROWS,
+             columns: Optional[Iterable[str]] = None) -> Dict[str, List[Any]]:
+        """Read columns of a table.
+
+        Args:
+            table: `ROWS` or `TRADEABLE_ITEMS`.
+            columns: Names of the columns to read, all of them by default.  Columns missing from
+                a row group are read as `None` values.
+
+        Returns:
+            The values of each column.
+
+        """
+        columns = self.columns(table) if columns is None else list(columns)
+        result = OrderedDict((name, []) for name in columns)
+        for group in self.tables.get(table, []):
+            for name in columns:
+                location = group['columns'].get(name)
+                if location is None:
+                    result[name].extend([None] * group['rows'])
+                    continue
+                kind, offset, length = location
+                start = self._base + offset
+                result[name].extend(_decode_column(
+                    kind, self._map[start:start + length], group['rows'], self._swap
+                ))
+        return result
+
+    def iter_rows(self, table: str = ROWS,
+                  columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the rows of a table as dicts, leaving out `None` values."""
+        data = self.read(table, columns)
+        names = list(data)
+        for values in zip(*data.values()):
+            yield {name: value for name, value in zip(names, values) if value is not None}
+
+    def trades(self, columns: Optional[Iterable[str]] = None,
+               item_columns: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Rebuild the exported items in JSON format, with their tradeable items nested again.
+
+        Args:
+            columns: Fields of the trades to read, all of them by default.
+            item_columns: Fields of the tradeable items to read, all of them by default.
+
+        """
+        if columns is not None:
+            columns = [name for name in columns if name != FLATTENED]
+            if 'data_id' not in columns:
+                columns.append('data_id')
+            columns.append(FLATTENED)
+        trades = list(self.iter_rows(ROWS, columns))
+        for trade in trades:
+            flattened = trade.pop(FLATTENED, None)
+            for side in flattened.split(',') if flattened else ():
+                trade[side] = []
+        if TRADEABLE_ITEMS not in self.tables:
+            return trades
+        if item_columns is not None:
+            item_columns = [name for name in item_columns
+                            if name not in (ROW_KEY, TRADE_KEY, SIDE)]
+            item_columns += [ROW_KEY, SIDE]
+        for child in self.iter_rows(TRADEABLE_ITEMS, item_columns):
+            trade = trades[child.pop(ROW_KEY)]
+            child.pop(TRADE_KEY, None)
+            trade.setdefault(child.pop(SIDE), []).append(child)
+        return trades
+
+
+def read_feed(path: str, feed_format: str = 'jsonlines') -> List[Dict[str, Any]]:
+    """Read every item of a feed file.
+
+    Args:
+        path: The feed file.
+        feed_format: The `FEED_FORMAT` the file was exported with.
+
+    Raises:
+        ValueError: The format is not supported.
+
+    """
+    if feed_format in ('jsonlines', 'jl'):
+        return [json.loads(line) for line in Path(path).read_text().splitlines()]
+    if feed_format == 'msgpack':
+        return list(read_msgpack(path))
+    if feed_format == 'columnar':
+        with ColumnarReader(path) as reader:
+            return reader.trades()
+    raise ValueError('Unsupported feed format %s.' % feed_format)
@@ -0,0 +1,38 @@
+"""Custom download handlers."""
+
+from twisted.internet import defer
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+
+
+# Settings which make the crawlers of a process share one connection pool.
+SHARED_POOL_SETTINGS = {
+    'DOWNLOAD_HANDLERS': {
+        'http': 'rlgpy.scraper.handlers.PersistentHTTPDownloadHandler',
+        'https': 'rlgpy.scraper.handlers.PersistentHTTPDownloadHandler'
+    }
+}
+
+
+class PersistentHTTPDownloadHandler(HTTP11DownloadHandler):
+    """HTTP(S) download handler which shares one connection pool per process.
+
+    Scrapy creates a new download handler, and with it a new connection pool, for every crawler
+    and closes the pool once the crawl finishes.  Long-lived crawler processes, and processes
+    running several crawls at once, instead keep a single pool around so that keep-alive
+    connections are reused across crawls.
+
+    """
+
+    _shared_pool = None
+
+    def __init__(self, settings):
+        """Initialize the handler, adopting the process wide pool if one already exists."""
+        super().__init__(settings)
+        handler_cls = type(self)
+        if handler_cls._shared_pool is None:
+            handler_cls._shared_pool = self._pool
+        self._pool = handler_cls._shared_pool
+
+    def close(self) -> defer.Deferred:
+        """Keep the shared pool open for subsequent crawls."""
+        return defer.succeed(None)
@@ -0,0 +1,262 @@
+"""HTTP cache with per-spider TTLs, conditional revalidation and a shared, compressed store.
+
+Scrapy's own filesystem cache either never expires or drops pages outright once they are older
+than `HTTPCACHE_EXPIRATION_SECS`.  The classes in this module keep a page for as long as it is
+useful instead:
+
+    - A cached page is served without a request while it is younger than the TTL of the spider,
+      e.g. a day for the item catalog and a minute for trade pages.
+    - An older page is revalidated with `If-None-Match` / `If-Modified-Since`.  A `304 Not
+      Modified` answer serves the cached page and refreshes its age, so an unchanged catalog
+      page costs a request without a body.
+    - The cached page is served in place of a server error or download failure, but only until
+      it is `RLG_HTTPCACHE_MAX_STALE` seconds past its TTL.
+
+Each page is stored as a single gzip file which is written to a temporary file first and then
+moved into place, so worker processes sharing the cache directory never read a partial page.
+
+Example:
+    >>> from rlgpy.scraper.httpcache import cache_settings
+    >>> process = CrawlerProcess(cache_settings())
+    >>> process.crawl(ItemSpider)
+
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from email.utils import formatdate
+from typing import Any, Dict, Optional
+
+from scrapy.crawler import Crawler
+from scrapy.spiders import Spider
+from scrapy.http import Headers, Request, Response
+from scrapy.responsetypes import responsetypes
+from scrapy.settings import Settings
+from scrapy.utils.project import data_path
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+from w3lib.url import canonicalize_url
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DIR = Path.home() / '.rlgpy' / 'httpcache'
+
+# Seconds a cached page is served without revalidation, by spider name.
+DEFAULT_TTLS = {
+    'rl-item': 24 * 60 * 60,
+    'rl-achievement': 7 * 24 * 60 * 60,
+    'rl-trade': 60
+}
+
+# TTL of spiders missing from `RLG_HTTPCACHE_TTLS`.
+DEFAULT_TTL = 60 * 60
+
+# Seconds past its TTL a cached page may still stand in for a failed request.
+DEFAULT_MAX_STALE = 24 * 60 * 60
+
+# Headers of a `304 Not Modified` response which must not replace those of the cached page.
+_BODY_HEADERS = (b'Content-Length', b'Content-Encoding', b'Transfer-Encoding', b'Content-Type')
+
+
+def cache_settings(enabled: bool = True, directory: Path = DEFAULT_DIR) -> Dict[str, Any]:
+    """Settings which enable the cache of this module.
+
+    Args:
+        enabled: Whether pages are cached at all.
+        directory: Cache directory, shared by every process using the same one.
+
+    Returns:
+        The settings to merge into the settings of a crawl.
+
+    """
+    return {
+        'HTTPCACHE_ENABLED': enabled,
+        'HTTPCACHE_DIR': str(directory),
+        'HTTPCACHE_POLICY': 'rlgpy.scraper.httpcache.TTLCachePolicy',
+        'HTTPCACHE_STORAGE': 'rlgpy.scraper.httpcache.SharedFilesystemCacheStorage',
+        'DOWNLOADER_MIDDLEWARES': {
+            'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': None,
+            'rlgpy.scraper.httpcache.RevalidatingHttpCacheMiddleware': 900
+        }
+    }
+
+
+class TTLCachePolicy(RFC2616Policy):
+    """Cache policy which trusts a cached page for a fixed TTL and then revalidates it.
+
+    Freshness headers sent by the server are ignored, the site marks its pages as uncacheable
+    although the catalog changes only with game updates.  A `no-store` response is not cached.
+
+    Attributes:
+        ttl (float): Seconds a cached page is served without revalidation.
+        max_stale (float): Seconds past the TTL a cached page may stand in for a failed request.
+
+    """
+
+    CACHEABLE_STATUSES = (200, 203, 301, 308)
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings)
+        self.ttl = settings.getfloat('RLG_HTTPCACHE_TTL', DEFAULT_TTL)
+        self.max_stale = settings.getfloat('RLG_HTTPCACHE_MAX_STALE', DEFAULT_MAX_STALE)
+
+    def should_cache_response(self, response: Response, request: Request) -> bool:
+        if response.status not in self.CACHEABLE_STATUSES:
+            return False
+        return b'no-store' not in self._parse_cachecontrol(response)
+
+    def is_cached_response_fresh(self, cachedresponse: Response, request: Request) -> bool:
+        if b'no-cache' not in self._parse_cachecontrol(request):
+            if self.age(cachedresponse, request) < self.ttl:
+                return True
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse: Response, response: Response,
+                                 request: Request) -> bool:
+        if response.status == 304:
+            return True
+        return response.status >= 500 and self.may_serve_stale(cachedresponse, request)
+
+    def may_serve_stale(self, cachedresponse: Response, request: Request) -> bool:
+        """Whether a cached page is recent enough to stand in for a failed request."""
+        return self.age(cachedresponse, request) < self.ttl + self.max_stale
+
+    def age(self, cachedresponse: Response, request: Request, now: Optional[float] = None) -> float:
+        """Seconds since the cached page was fetched or last revalidated."""
+        return self._compute_current_age(cachedresponse, request, now or time.time())
+
+
+class RevalidatingHttpCacheMiddleware(HttpCacheMiddleware):
+    """HTTP cache middleware which refreshes revalidated pages and caps serving stale pages.
+
+    The TTL of the policy is taken from `RLG_HTTPCACHE_TTLS` by the name of the spider.  A cached
+    page confirmed by a `304 Not Modified` answer is stored again with the headers of the answer,
+    so that it is fresh for another TTL instead of being revalidated on every request.
+
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'RevalidatingHttpCacheMiddleware':
+        middleware = super().from_crawler(crawler)
+        ttls = crawler.settings.getdict('RLG_HTTPCACHE_TTLS', DEFAULT_TTLS)
+        name = getattr(crawler.spidercls, 'name', None)
+        if name in ttls and isinstance(middleware.policy, TTLCachePolicy):
+            middleware.policy.ttl = float(ttls[name])
+        return middleware
+
+    def process_response(self, request: Request, response: Response,
+                         spider: Spider) -> Response:
+        cachedresponse = request.meta.get('cached_response')
+        result = super().process_response(request, response, spider)
+        if cachedresponse is None or result is not cachedresponse or response.status != 304:
+            return result
+        headers = cachedresponse.headers.copy()
+        for name, values in response.headers.items():
+            if name not in _BODY_HEADERS:
+                headers.setlist(name, values)
+        if b'Date' not in response.headers:
+            headers[b'Date'] = formatdate(usegmt=True)
+        refreshed = cachedresponse.replace(headers=headers)
+        self.stats.inc_value('httpcache/refresh', spider=spider)
+        self.storage.store_response(spider, request, refreshed)
+        return refreshed
+
+    def process_exception(self, request: Request, exception: Exception,
+                          spider: Spider) -> Optional[Response]:
+        cachedresponse = request.meta.get('cached_response')
+        if (cachedresponse is not None and isinstance(self.policy, TTLCachePolicy)
+                and not self.policy.may_serve_stale(cachedresponse, request)):
+            del request.meta['cached_response']
+            self.stats.inc_value('httpcache/too_stale', spider=spider)
+            return None
+        return super().process_exception(request, exception, spider)
+
+
+class SharedFilesystemCacheStorage:
+    """Filesystem cache storage which can be shared by concurrent processes.
+
+    Each response is stored gzip compressed in a single file, `<spider>/<key[:2]>/<key>.gz`.  The
+    file holds a JSON header line with the URL, status, headers and store time, followed by the
+    body.  Files are replaced atomically, a reader sees either the old or the new response.
+
+    Attributes:
+        cachedir (str): The cache directory, relative paths are inside the project data directory.
+        expiration_secs (int): Seconds after which a stored response is discarded, `0` to keep
+            responses until they are replaced.
+
+    """
+
+    def __init__(self, settings: Settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+        self.compresslevel = settings.getint('RLG_HTTPCACHE_COMPRESSLEVEL', 6)
+
+    def open_spider(self, spider: Spider):
+        logger.debug('Using shared filesystem cache storage in %s', self.cachedir,
+                     extra={'spider': spider})
+
+    def close_spider(self, spider: Spider):
+        pass
+
+    def retrieve_response(self, spider: Spider, request: Request) -> Optional[Response]:
+        """Return the stored response, `None` if it is missing, expired or unreadable."""
+        path = self._entry_path(spider, request)
+        try:
+            with path.open('rb') as f:
+                data = gzip.decompress(f.read())
+            header, body = data.split(b'\n', 1)
+            entry = json.loads(header.decode('utf-8'))
+        except (OSError, EOFError, ValueError):
+            return None
+        if 0 < self.expiration_secs < time.time() - entry['timestamp']:
+            return None
+        headers = Headers(headers_raw_to_dict(entry['headers'].encode('latin-1')))
+        respcls = responsetypes.from_args(headers=headers, url=entry['url'], body=body)
+        return respcls(url=entry['url'], headers=headers, status=entry['status'], body=body)
+
+    def store_response(self, spider: Spider, request: Request, response: Response):
+        """Store a response, replacing the stored response of the same request.
+
+        A response without a `Date` header is stored with the current date, the age of a cached
+        page is measured from it.
+
+        """
+        path = self._entry_path(spider, request)
+        headers = response.headers
+        if b'Date' not in headers:
+            headers = headers.copy()
+            headers[b'Date'] = formatdate(usegmt=True)
+        header = json.dumps({
+            'url': response.url,
+            'status': response.status,
+            'headers': headers_dict_to_raw(headers).decode('latin-1'),
+            'timestamp': time.time()
+        }).encode('utf-8')
+        data = gzip.compress(header + b'\n' + response.body, compresslevel=self.compresslevel)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name('%s.%d.tmp' % (path.name, os.getpid()))
+        with tmp_path.open('wb') as f:
+            f.write(data)
+        os.replace(str(tmp_path), str(path))
+
+    def _entry_path(self, spider: Spider, request: Request) -> Path:
+        key = self.request_key(request)
+        return Path(self.cachedir, spider.name, key[:2], key + '.gz')
+
+    @staticmethod
+    def request_key(request: Request) -> str:
+        """Key of a request, the same for requests which only differ in their URL encoding."""
+        digest = hashlib.sha1()
+        digest.update(request.method.encode('ascii'))
+        digest.update(canonicalize_url(request.url).encode('utf-8'))
+        digest.update(request.body or b'')
+        return digest.hexdigest()
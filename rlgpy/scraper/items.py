@@ -76,6 +76,7 @@ class RlTrade(scrapy.Item):
         platform (str): Platform of the trade.
         have (List[RlTradeableItem]): List of items the author has.
         want (List[RlTradeableItem]): List of items the author wants.
+        source_url (str): The start URL through which the trade was found.
 
     """
 
@@ -85,6 +86,7 @@ class RlTrade(scrapy.Item):
     platform = scrapy.Field()
     have = scrapy.Field()
     want = scrapy.Field()
+    source_url = scrapy.Field()
 
 
 class RlTradeLoader(ItemLoader):
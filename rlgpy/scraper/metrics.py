@@ -0,0 +1,398 @@
+"""Metrics of a crawl, collected in the crawling process and returned with its results.
+
+Every crawl run by `SafeSpiderRunner`, the worker pool or `AsyncSpiderRun` returns a
+`CrawlResult`, a list of the scraped items with the `CrawlMetrics` of the crawl attached:
+
+    - The Scrapy stats of the crawl, with the request, response, byte and item counts.
+    - Download latency percentiles and items scraped per second.
+    - Seconds spent in each spider callback, e.g. `parse_trades`, and in each item pipeline.
+    - Seconds spent starting the crawling process and transferring the results to the parent.
+
+Setting `RLG_PROFILE` to `'cprofile'` runs the crawl under `cProfile`, `'sample'` samples the
+stack of the crawling thread every `RLG_PROFILE_INTERVAL` seconds instead, which slows the crawl
+down far less.  The profile is returned in the metrics.
+
+Example:
+    >>> items = SafeSpiderRunner.run(ItemSpider, {'RLG_PROFILE': 'cprofile'})
+    >>> items.metrics.latency
+    {'p50': 0.21, 'p90': 0.48, 'p99': 0.93, 'max': 1.2}
+    >>> items.metrics.profile_stats().sort_stats('cumulative').print_stats(20)
+
+"""
+
+import sys
+import time
+import pstats
+import functools
+import cProfile
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.http import Request, Response
+from scrapy.pipelines import ItemPipelineManager
+from scrapy.spiders import Spider
+
+
+# Stats keys under which the seconds spent in callbacks and pipelines are summed up.
+CALLBACK_TIME = 'rlg/callback_time/'
+PIPELINE_TIME = 'rlg/pipeline_time/'
+
+# Stats keys of the adaptive concurrency controller.
+THROTTLE = 'rlg/throttle/'
+
+# Stats keys counting the requests and parses saved by deduplication.
+DEDUP = 'rlg/dedup/'
+
+PERCENTILES = (50, 90, 99)
+
+# Seconds between stack samples of the sampling profiler.
+PROFILE_INTERVAL = 0.005
+
+
+def instrument(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the components timing callbacks and pipelines to the settings of a crawl."""
+    settings = dict(settings)
+    settings['SPIDER_MIDDLEWARES'] = dict(
+        settings.get('SPIDER_MIDDLEWARES', {}),
+        **{'rlgpy.scraper.metrics.CallbackTimingMiddleware': 950}
+    )
+    settings.setdefault('ITEM_PROCESSOR', 'rlgpy.scraper.metrics.TimedItemPipelineManager')
+    return settings
+
+
+def percentiles(values: List[float], points: tuple = PERCENTILES) -> Dict[str, float]:
+    """Nearest rank percentiles and the maximum of some values, empty if there are none."""
+    if not values:
+        return {}
+    values = sorted(values)
+    result = {}
+    for point in points:
+        rank = -(-point * len(values) // 100)  # Rounded up, in integers to avoid float errors.
+        result['p%d' % point] = values[max(rank, 1) - 1]
+    result['max'] = values[-1]
+    return result
+
+
+class CrawlMetrics:
+    """Metrics of a single crawl.
+
+    Attributes:
+        stats (Dict[str, Any]): The Scrapy stats of the crawl.
+        latencies (List[float]): Download latency of each downloaded response in seconds.
+        spawn_time (float): Seconds from starting the crawling process until it started the
+            crawl, `None` for crawls run on a warm worker.
+        send_time (float): Seconds the crawling process spent sending results.
+        receive_time (float): Seconds the parent spent receiving results.
+        profile: The profile of the crawl, the raw `cProfile` stats or the number of samples per
+            stack, `None` unless profiling was enabled with `RLG_PROFILE`.
+
+    """
+
+    def __init__(self, stats: Optional[Dict[str, Any]] = None,
+                 latencies: Optional[List[float]] = None, spawn_time: Optional[float] = None,
+                 send_time: float = 0.0, receive_time: float = 0.0, profile: Any = None):
+        self.stats = stats or {}
+        self.latencies = latencies or []
+        self.spawn_time = spawn_time
+        self.send_time = send_time
+        self.receive_time = receive_time
+        self.profile = profile
+
+    @property
+    def requests(self) -> int:
+        """Number of requests sent by the downloader."""
+        return self.stats.get('downloader/request_count', 0)
+
+    @property
+    def responses(self) -> int:
+        """Number of responses received by the downloader."""
+        return self.stats.get('downloader/response_count', 0)
+
+    @property
+    def bytes_downloaded(self) -> int:
+        """Bytes received by the downloader."""
+        return self.stats.get('downloader/response_bytes', 0)
+
+    @property
+    def items(self) -> int:
+        """Number of scraped items."""
+        return self.stats.get('item_scraped_count', 0)
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        """Seconds from opening to closing the spider."""
+        if 'start_time' not in self.stats or 'finish_time' not in self.stats:
+            return None
+        return (self.stats['finish_time'] - self.stats['start_time']).total_seconds()
+
+    @property
+    def items_per_second(self) -> Optional[float]:
+        """Items scraped per second of crawling."""
+        return self.items / self.elapsed if self.elapsed else None
+
+    @property
+    def latency(self) -> Dict[str, float]:
+        """Percentiles of the download latency in seconds."""
+        return percentiles(self.latencies)
+
+    @property
+    def callback_time(self) -> Dict[str, float]:
+        """Seconds spent in each spider callback."""
+        return self._timings(CALLBACK_TIME)
+
+    @property
+    def pipeline_time(self) -> Dict[str, float]:
+        """Seconds spent in each item pipeline."""
+        return self._timings(PIPELINE_TIME)
+
+    @property
+    def throttle(self) -> Dict[str, Any]:
+        """Decisions of the adaptive concurrency controller, empty if it was not enabled."""
+        return self._timings(THROTTLE)
+
+    @property
+    def dedup(self) -> Dict[str, int]:
+        """Number of requests and item parses skipped as duplicates."""
+        return self._timings(DEDUP)
+
+    @property
+    def transfer_time(self) -> float:
+        """Seconds spent transferring the results to the parent."""
+        return self.send_time + self.receive_time
+
+    def _timings(self, prefix: str) -> Dict[str, Any]:
+        return {
+            key[len(prefix):]: value for key, value in self.stats.items() if key.startswith(prefix)
+        }
+
+    def profile_stats(self) -> pstats.Stats:
+        """The `cProfile` profile of the crawl, ready to be sorted and printed."""
+        if not isinstance(self.profile, dict) or not self.profile or not all(
+                isinstance(key, tuple) for key in self.profile):
+            raise ValueError('The crawl was not profiled with RLG_PROFILE = "cprofile".')
+        return pstats.Stats(_RawProfile(self.profile))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The metrics as a dictionary, without the raw stats and profile."""
+        return {
+            'requests': self.requests,
+            'responses': self.responses,
+            'bytes_downloaded': self.bytes_downloaded,
+            'items': self.items,
+            'elapsed': self.elapsed,
+            'items_per_second': self.items_per_second,
+            'latency': self.latency,
+            'callback_time': self.callback_time,
+            'pipeline_time': self.pipeline_time,
+            'throttle': self.throttle,
+            'dedup': self.dedup,
+            'spawn_time': self.spawn_time,
+            'transfer_time': self.transfer_time
+        }
+
+
+class CrawlResult(list):
+    """The items scraped by a crawl.
+
+    Attributes:
+        metrics (CrawlMetrics): Metrics of the crawl, `None` if they were not reported.
+
+    """
+
+    metrics = None
+
+    @classmethod
+    def collect(cls, items: Iterator[Dict[str, Any]]) -> 'CrawlResult':
+        """Consume an iterator of items which returns the metrics of the crawl once exhausted."""
+        result = cls()
+
+        def consume():
+            result.metrics = yield from items
+
+        result.extend(consume())
+        return result
+
+
+class _RawProfile:
+    """Stands in for a `cProfile.Profile` whose stats were sent from another process."""
+
+    def __init__(self, stats: Dict[tuple, tuple]):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class _StackSampler:
+    """Counts the stacks of a thread, sampled at a fixed interval."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)  # pylint: disable=protected-access
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s:%s' % (code.co_filename, code.co_name))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+
+class MetricsCollector:
+    """Collects the metrics of a crawl inside the crawling process.
+
+    Attributes:
+        crawler (Crawler): The crawler of the crawl.
+        spawn_time (float): Seconds it took to start the crawling process.
+
+    """
+
+    def __init__(self, crawler: Crawler, spawn_time: Optional[float] = None):
+        self.crawler = crawler
+        self.spawn_time = spawn_time
+        self.latencies = []  # type: List[float]
+        self.send_time = 0.0
+        crawler.signals.connect(self.response_received, signal=signals.response_received)
+        mode = crawler.settings.get('RLG_PROFILE')
+        if mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+        elif mode == 'sample':
+            self._profiler = _StackSampler(
+                crawler.settings.getfloat('RLG_PROFILE_INTERVAL', PROFILE_INTERVAL)
+            )
+        elif mode:
+            raise ValueError('Unknown RLG_PROFILE %r, use "cprofile" or "sample".' % mode)
+        else:
+            self._profiler = None
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    # Required signal arguments... pylint: disable=unused-argument
+    def response_received(self, response: Response, request: Request, spider: Spider):
+        """Record the download latency of a downloaded response."""
+        latency = request.meta.get('download_latency')
+        if latency is not None and 'cached' not in response.flags:
+            self.latencies.append(latency)
+
+    def timed(self, send: Callable[[tuple], None]) -> Callable[[tuple], None]:
+        """Wrap the send function of the result channel to measure the time spent sending."""
+        def timed_send(message: tuple):
+            start = time.perf_counter()
+            try:
+                send(message)
+            finally:
+                self.send_time += time.perf_counter() - start
+        return timed_send
+
+    def finish(self) -> CrawlMetrics:
+        """Stop profiling and return the metrics of the crawl."""
+        profile = None
+        if isinstance(self._profiler, cProfile.Profile):
+            self._profiler.disable()
+            self._profiler.create_stats()
+            profile = self._profiler.stats
+        elif self._profiler is not None:
+            self._profiler.disable()
+            profile = dict(self._profiler.samples)
+        self._profiler = None
+        return CrawlMetrics(
+            stats=self.crawler.stats.get_stats(),
+            latencies=self.latencies,
+            spawn_time=self.spawn_time,
+            send_time=self.send_time,
+            profile=profile
+        )
+
+
+def callback_name(response: Response, spider: Spider) -> str:
+    """Name of the spider callback which handles a response, following `CrawlSpider` rules."""
+    rule = response.meta.get('rule')
+    rules = getattr(spider, '_rules', None)
+    if rule is not None and rules is not None and rule < len(rules):
+        callback = rules[rule].callback
+    else:
+        callback = response.request.callback if response.request is not None else None
+    if callback is None:
+        return 'parse'
+    return getattr(callback, '__name__', str(callback))
+
+
+class CallbackTimingMiddleware:
+    """Spider middleware which sums up the time spent in each spider callback.
+
+    It is placed closest to the spider, so that pulling each result out of the callback measures
+    only the callback itself.
+
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'CallbackTimingMiddleware':
+        return cls(crawler.stats)
+
+    def process_spider_output(self, response: Response, result: Iterator[Any],
+                              spider: Spider) -> Iterator[Any]:
+        key = CALLBACK_TIME + callback_name(response, spider)
+        results = iter(result)
+        while True:
+            start = time.perf_counter()
+            try:
+                output = next(results)
+            except StopIteration:
+                return
+            finally:
+                self.stats.inc_value(key, time.perf_counter() - start, spider=spider)
+            yield output
+
+
+class TimedItemPipelineManager(ItemPipelineManager):
+    """Item pipeline manager which sums up the time spent in each pipeline.
+
+    Only the synchronous part of `process_item` is measured, a pipeline returning a deferred is
+    charged with the time it took to return it.
+
+    """
+
+    stats = None
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'TimedItemPipelineManager':
+        manager = super().from_crawler(crawler)
+        manager.stats = crawler.stats
+        return manager
+
+    def _add_middleware(self, pipe: Any):
+        if hasattr(pipe, 'process_item'):
+            pipe.process_item = self._timed(type(pipe).__name__, pipe.process_item)
+        super()._add_middleware(pipe)
+
+    def _timed(self, name: str, process_item: Callable) -> Callable:
+        key = PIPELINE_TIME + name
+
+        @functools.wraps(process_item)
+        def timed_process_item(item: Any, *args) -> Any:
+            start = time.perf_counter()
+            try:
+                return process_item(item, *args)
+            finally:
+                if self.stats is not None:
+                    self.stats.inc_value(key, time.perf_counter() - start)
+        return timed_process_item
@@ -1,8 +1,16 @@
 """Rocket league item pipeline."""
 
-from scrapy.exceptions import DropItem
+import os
+import logging
+from typing import Any, Optional
+
+from scrapy.crawler import Crawler
+from scrapy.exceptions import DropItem, NotConfigured
 from scrapy.spiders import Spider
 
+from rlgpy.market import MarketAggregator
+from rlgpy.store import TradeStore
+
 from rlgpy.scraper.items import (
     RlItem,
     RlTrade,
@@ -10,6 +18,9 @@ from rlgpy.scraper.items import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 # Normal for pipeline class... pylint: disable=too-few-public-methods
 class RlItemPipeline:
     """Rocket League item data pipeline."""
@@ -26,7 +37,7 @@ class RlItemPipeline:
 
         self.item_ids.add(item['data_id'])
 
-        for field in item.fields:
+        for field in RlItem.fields:
             item.setdefault(field, '')
 
         return item
@@ -35,15 +46,28 @@ class RlItemPipeline:
 class RlTradePipeline:
     """Rocket League trade pipeline."""
 
-    # Required argument for pipeline fn... pylint: disable=unused-argument,no-self-use
+    def __init__(self):
+        """Initialize pipeline with a set of trades per start URL to avoid duplicates."""
+        self.trade_ids = set()
+
+    # Required argument for pipeline fn... pylint: disable=unused-argument
     def process_item(self, item: RlTrade, spider: Spider) -> RlTrade:
-        """Set the default values for tradeable items without certifications.
+        """Drop duplicate trades and set the default values for tradeable items.
+
+        The same trade can be found twice through one start URL, e.g. when new trades shift the
+        pagination during a crawl.  Trades found through different start URLs are kept.
 
         By default, tradeable items without a certification or paint or count will not have the
         keys 'certification' 'paint' or 'count'.  To normalize the data, the keys are added with
         a default value.
 
         """
+        trade_key = (item.get('source_url'), item['data_id'])
+        if trade_key in self.trade_ids:
+            raise DropItem('Trade already added.')
+
+        self.trade_ids.add(trade_key)
+
         for tradeable_item in item['have'] + item['want']:
             tradeable_item.setdefault('count', 1)
             tradeable_item.setdefault('certification', '')
@@ -51,6 +75,125 @@ class RlTradePipeline:
         return item
 
 
+class RlMarketPipeline:
+    """Counts the supply and demand of the items in the trades, see `rlgpy.market`.
+
+    Enabled by `RLG_MARKET_PATH`, the file in which the counts are kept between crawls.  A new
+    file is sized by the `RLG_MARKET_*` settings.
+
+    """
+
+    def __init__(self, path: str, market: MarketAggregator):
+        self.path = path
+        self.market = market
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'RlMarketPipeline':
+        settings = crawler.settings
+        path = settings.get('RLG_MARKET_PATH')
+        if not path:
+            raise NotConfigured
+        if os.path.exists(path):
+            market = MarketAggregator.load(path)
+        else:
+            market = MarketAggregator(
+                bucket_seconds=settings.getfloat('RLG_MARKET_BUCKET_SECONDS', 3600),
+                buckets=settings.getint('RLG_MARKET_BUCKETS', 168),
+                width=settings.getint('RLG_MARKET_WIDTH', 1024),
+                top_k=settings.getint('RLG_MARKET_TOP_K', 100)
+            )
+        return cls(path, market)
+
+    # Required argument for pipeline fn... pylint: disable=unused-argument
+    def process_item(self, item: RlTrade, spider: Spider) -> RlTrade:
+        """Count the items of a trade."""
+        self.market.add(item)
+        return item
+
+    def close_spider(self, spider: Spider):
+        """Persist the counts."""
+        self.market.save(self.path)
+
+
+class RlSQLitePipeline:
+    """Writes the scraped trades, items and achievements to a `TradeStore`, see `rlgpy.store`.
+
+    Enabled by `RLG_SQLITE_PATH`, the database file.  Records are upserted in transactions of
+    `RLG_SQLITE_BATCH_SIZE` records, the last one when the spider closes.
+
+    """
+
+    _WRITERS = {
+        RlTrade: 'upsert_trades',
+        RlItem: 'upsert_items',
+        RlAchievement: 'upsert_achievements'
+    }
+
+    # Writers of the plain dictionaries of the fast parsers, by spider name.
+    _SPIDER_WRITERS = {
+        'rl-trade': 'upsert_trades',
+        'rl-item': 'upsert_items',
+        'rl-achievement': 'upsert_achievements'
+    }
+
+    def __init__(self, path: str, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self.store = None
+        self.batches = {writer: [] for writer in self._WRITERS.values()}
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'RlSQLitePipeline':
+        settings = crawler.settings
+        path = settings.get('RLG_SQLITE_PATH')
+        if not path:
+            raise NotConfigured
+        return cls(path, settings.getint('RLG_SQLITE_BATCH_SIZE', 500))
+
+    def open_spider(self, spider: Spider):
+        """Open the store."""
+        self.store = TradeStore(self.path)
+
+    def _writer(self, item: Any, spider: Spider) -> Optional[str]:
+        """The store method writing the item, by its class, its spider or else its fields."""
+        writer = self._WRITERS.get(type(item))
+        if writer is None and spider is not None:
+            writer = self._SPIDER_WRITERS.get(getattr(spider, 'name', None))
+        if writer is None and isinstance(item, dict):
+            if 'have' in item or 'want' in item:
+                writer = 'upsert_trades'
+            elif 'gamerscore' in item or 'trophy_type' in item:
+                writer = 'upsert_achievements'
+            elif 'data_id' in item:
+                writer = 'upsert_items'
+        return writer
+
+    def process_item(self, item: Any, spider: Spider) -> Any:
+        """Queue the item, writing the batch of its kind once it is full."""
+        writer = self._writer(item, spider)
+        if writer is None:
+            logger.warning('Not storing unrecognized item %r' % (item,))
+            return item
+        batch = self.batches[writer]
+        batch.append(item)
+        if len(batch) >= self.batch_size:
+            self._flush(writer)
+        return item
+
+    def _flush(self, writer: str):
+        batch = self.batches[writer]
+        if batch:
+            getattr(self.store, writer)(batch)
+            self.batches[writer] = []
+
+    # Required argument for pipeline fn... pylint: disable=unused-argument
+    def close_spider(self, spider: Spider):
+        """Write the remaining items and close the store."""
+        for writer in self.batches:
+            self._flush(writer)
+        self.store.close()
+
+
 class RlAchievementPipeline:
     """Rocket League achievement pipeline."""
 
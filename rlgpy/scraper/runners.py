@@ -1,25 +1,116 @@
 """Custom spider runner."""
 
+import time
+import weakref
 import logging
-import json
+from collections import deque, OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any
-from multiprocessing import Process
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable, Iterator, Awaitable
+from multiprocessing import Process, Pipe, Event
+from multiprocessing.connection import Connection
 
-from twisted.internet import reactor
-from scrapy.spiders import Spider
-from scrapy.crawler import CrawlerRunner
+from rlgpy.lazy import lazy_import
+from rlgpy.scraper.channels import ItemBatcher, iter_items, RESULT_BATCH_SIZE
+
+if TYPE_CHECKING:  # pragma: no cover
+    from scrapy.spiders import Spider
+    from scrapy.crawler import CrawlerRunner
+    from twisted.internet.defer import Deferred
+
+# Scrapy and Twisted are only imported once a crawl starts, asyncio once it is used.
+asyncio = lazy_import('asyncio')
+metrics = lazy_import('rlgpy.scraper.metrics')
+handlers = lazy_import('rlgpy.scraper.handlers')
+exporters = lazy_import('rlgpy.scraper.exporters')
 
 
 logger = logging.getLogger(__name__)
 
 
+# Seconds between flushes of partially filled result batches and checks for cancellation.
+FLUSH_INTERVAL = 0.5
+
+# Seconds a cancelled crawl is given to close before its process is terminated.
+CANCEL_TIMEOUT = 10.0
+
+
 class SafeSpiderRunner:
-    """Runs a spider with the specified settings synchronously."""
+    """Runs a spider with the specified settings synchronously.
+
+    Results are sent from the crawling process over a pipe.  Passing a `FEED_URI` setting opts
+    into the file based feed instead, which is read back once the crawl has finished.  The
+    metrics of the crawl are sent along, see `rlgpy.scraper.metrics`.  `run_many` runs several
+    spiders concurrently in one process.
+
+    """
+
+
+    @staticmethod
+    def _start_crawl(runner: 'CrawlerRunner', spider: 'Spider', settings: Dict[str, Any],
+                     spider_kwargs: Dict[str, Any], send: Callable[[tuple], None],
+                     cancelled: Optional[Callable[[], bool]] = None,
+                     spawn_time: Optional[float] = None) -> 'Deferred':
+        """Start a crawl which reports its items, metrics and outcome through `send`.
+
+        Scraped items are only sent when the settings do not contain a `FEED_URI`.  Partially
+        filled batches are flushed every `FLUSH_INTERVAL` seconds so that consumers receive items
+        shortly after the page containing them was parsed.  The runner must have been created
+        with settings passed through `metrics.instrument` to measure callbacks and pipelines.
+
+        Args:
+            runner: The crawler runner to schedule the crawl on.
+            spider: The scrapy spider to run.
+            settings: The settings to run the spider with.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
+            send: Called with each `(kind, payload)` message of the result channel.
+            cancelled: Polled while crawling, the spider is closed once it returns `True`.
+            spawn_time: Seconds it took to start the crawling process.
+
+        Returns:
+            A deferred which fires once the final message has been sent.
+
+        """
+        from twisted.internet.task import LoopingCall
+        from scrapy import signals
+
+        crawler = runner.create_crawler(spider)
+        collector = metrics.MetricsCollector(crawler, spawn_time)
+        send = collector.timed(send)
+        batcher = ItemBatcher(send, settings.get('RLG_RESULT_BATCH_SIZE', RESULT_BATCH_SIZE))
+        if 'FEED_URI' not in settings:
+            crawler.signals.connect(batcher.add, signal=signals.item_scraped)
+
+        def tick():
+            batcher.flush()
+            if cancelled is None or not cancelled():
+                return
+            if crawler.engine is not None and crawler.engine.running:
+                tick_call.stop()
+                crawler.engine.close_spider(crawler.spider, 'cancelled')
+
+        tick_call = LoopingCall(tick)
+
+        def finish(_):
+            if tick_call.running:
+                tick_call.stop()
+            batcher.flush()
+            send(('done', collector.finish()))
+
+        def fail(failure):
+            if tick_call.running:
+                tick_call.stop()
+            collector.finish()
+            send(('error', failure.getErrorMessage()))
+
+        deferred = runner.crawl(crawler, **spider_kwargs)
+        deferred.addCallbacks(finish, fail)
+        tick_call.start(settings.get('RLG_RESULT_FLUSH_INTERVAL', FLUSH_INTERVAL), now=False)
+        return deferred
 
 
     @staticmethod
-    def _crawl_safely(spider: Spider, settings: Dict[str, Any]):
+    def _crawl_safely(spider: 'Spider', settings: Dict[str, Any], spider_kwargs: Dict[str, Any],
+                      conn: Connection, stop: Event, spawned_at: float):
         """Run a scrapy spider safely.
 
         Prevents reactor from exploding when multiple spiders are running at once.  This function
@@ -28,26 +119,90 @@ class SafeSpiderRunner:
         Args:
             spider: The scrapy spider to run.
             settings: The settings to run the spider with.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
+            conn: Sending end of the result pipe.
+            stop: Set by the parent to cancel the crawl.
+            spawned_at: Unix timestamp at which the parent started the process.
 
         """
-        runner = CrawlerRunner(settings)
-        deferred = runner.crawl(spider)
+        # Imported here so that only the crawling process installs a reactor.
+        from twisted.internet import reactor
+        from scrapy.crawler import CrawlerRunner
+
+        spawn_time = time.time() - spawned_at
+
+        def send(message: tuple):
+            try:
+                conn.send(message)
+            except OSError:
+                # The parent stopped listening, there is no point in crawling any further.
+                stop.set()
+
+        runner = CrawlerRunner(metrics.instrument(settings))
+        deferred = SafeSpiderRunner._start_crawl(
+            runner, spider, settings, spider_kwargs, send, stop.is_set, spawn_time
+        )
         deferred.addBoth(lambda _: reactor.stop())
         reactor.run()
+        conn.close()
+
+
+    @staticmethod
+    def _crawl_many_safely(crawls: Dict[str, tuple], conn: Connection, stop: Event,
+                           spawned_at: float):
+        """Run several scrapy spiders at once on the reactor of this process.
+
+        The crawls share one connection pool.  Messages are sent as `(key, (kind, payload))`.
+
+        Args:
+            crawls: The spider, settings and spider arguments of each crawl, by key.
+            conn: Sending end of the result pipe.
+            stop: Set by the parent to cancel the crawls.
+            spawned_at: Unix timestamp at which the parent started the process.
+
+        """
+        # Imported here so that only the crawling process installs a reactor.
+        from twisted.internet import reactor
+        from twisted.internet.defer import DeferredList
+        from scrapy.crawler import CrawlerRunner
+
+        spawn_time = time.time() - spawned_at
+
+        def sender(key: str) -> Callable[[tuple], None]:
+            def send(message: tuple):
+                try:
+                    conn.send((key, message))
+                except OSError:
+                    stop.set()
+            return send
+
+        deferreds = []
+        for key, (spider, settings, spider_kwargs) in crawls.items():
+            runner = CrawlerRunner(
+                metrics.instrument(dict(settings, **handlers.SHARED_POOL_SETTINGS))
+            )
+            deferreds.append(SafeSpiderRunner._start_crawl(
+                runner, spider, settings, spider_kwargs, sender(key), stop.is_set, spawn_time
+            ))
+        DeferredList(deferreds).addBoth(lambda _: reactor.stop())
+        reactor.run()
+        conn.close()
 
 
     @staticmethod
-    def _get_results(filepath: str, delete_file: bool) -> List[Dict[str, Any]]:
+    def _get_results(filepath: str, delete_file: bool,
+                     feed_format: str = 'jsonlines') -> List[Dict[str, Any]]:
         """Retrieve results from file.
 
         Args:
-            filepath: The filepath of the jsonlines file.
+            filepath: The filepath of the feed file.
             delete_file: Remove the file.
+            feed_format: The format of the feed file, see `rlgpy.scraper.exporters`.
 
         """
         logger.info('Getting results from file %s' % filepath)
         filepath = Path(filepath)
-        filedata = [json.loads(line) for line in filepath.read_text().splitlines()]
+        filedata = exporters.read_feed(str(filepath), feed_format)
         if delete_file:
             logger.info('Unlinking filepath %s' % filepath)
             filepath.unlink()
@@ -55,23 +210,347 @@ class SafeSpiderRunner:
 
 
     @staticmethod
-    def run(spider: Spider, settings: Dict[str, Any], delete_file: bool) -> List[Dict[str, Any]]:
-        """Run the spider until done, a blocking function.
+    def _spawn(spider: 'Spider', settings: Dict[str, Any],
+               spider_kwargs: Optional[Dict[str, Any]]) -> tuple:
+        """Start the crawling process.
+
+        Returns:
+            The process, the receiving end of its result pipe and its cancel event.
+
+        """
+        logger.info('Creating new process for spider %s' % spider)
+        return SafeSpiderRunner._spawn_process(
+            SafeSpiderRunner._crawl_safely, spider, settings, spider_kwargs or {}
+        )
+
+
+    @staticmethod
+    def _spawn_process(target: Callable[..., None], *args) -> tuple:
+        """Start a process running `target(*args, conn, stop, spawned_at)`.
+
+        Returns:
+            The process, the receiving end of its result pipe and its cancel event.
+
+        """
+        stop = Event()
+        parent_conn, child_conn = Pipe(duplex=False)
+        p = Process(target=target, args=args + (child_conn, stop, time.time()))
+        p.start()
+        child_conn.close()
+        return p, parent_conn, stop
+
+
+    @staticmethod
+    def _stop_process(p: Process, parent_conn: Connection, stop: Event, finished: bool,
+                      name: Any):
+        """Stop listening to a crawling process, cancelling its crawl unless it has finished."""
+        if not finished:
+            logger.info('Cancelling spider %s' % name)
+            stop.set()
+        parent_conn.close()
+        p.join(None if finished else CANCEL_TIMEOUT)
+        if p.is_alive():
+            logger.warning('Terminating spider process %s' % p.pid)
+            p.terminate()
+            p.join()
+
+
+    @staticmethod
+    def iterate(spider: 'Spider', settings: Dict[str, Any],
+                spider_kwargs: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Run the spider in a new process, yielding items while it is still crawling.
+
+        The pipe only buffers a limited amount of data, a consumer which falls behind therefore
+        pauses the crawl rather than letting results pile up in memory.  Closing the generator
+        before it is exhausted cancels the crawl.  Once exhausted, the generator returns the
+        `CrawlMetrics` of the crawl, see `CrawlResult.collect`.
 
         Args:
             spider: Spider to run.
             settings: Spider settings.
-            delete_file: Delete the file after getting the results.
+            spider_kwargs: Keyword arguments passed to the spider constructor, e.g. `start_urls`.
 
-        Returns:
-            A list of the json data.
+        Yields:
+            Each scraped item in json format.
 
         """
-        logger.info('Creating new process for spider %s' % spider)
-        p = Process(target=SafeSpiderRunner._crawl_safely, args=(spider, settings,))
-        p.start()
-        p.join()
+        p, parent_conn, stop = SafeSpiderRunner._spawn(spider, settings, spider_kwargs)
+        receive_time = 0.0
+
+        def recv() -> tuple:
+            nonlocal receive_time
+            parent_conn.poll(None)
+            start = time.perf_counter()
+            try:
+                return parent_conn.recv()
+            finally:
+                receive_time += time.perf_counter() - start
+
+        finished = False
+        crawl_metrics = None
+        try:
+            crawl_metrics = yield from iter_items(recv)
+            finished = True
+        finally:
+            SafeSpiderRunner._stop_process(p, parent_conn, stop, finished, spider)
         logger.info('%s finished running' % spider)
-        results = SafeSpiderRunner._get_results(settings['FEED_URI'], delete_file)
+        if crawl_metrics is not None:
+            crawl_metrics.receive_time = receive_time
+        return crawl_metrics
+
+
+    @staticmethod
+    def run(spider: 'Spider', settings: Dict[str, Any], delete_file: bool = True,
+            spider_kwargs: Optional[Dict[str, Any]] = None) -> 'metrics.CrawlResult':
+        """Run the spider until done, a blocking function.
+
+        Args:
+            spider: Spider to run.
+            settings: Spider settings.  Include `FEED_URI` to export the results to a file, see
+                `exporters.feed_settings` for the compact formats.
+            delete_file: Delete the feed file after getting the results.
+            spider_kwargs: Keyword arguments passed to the spider constructor, e.g. `start_urls`.
+
+        Returns:
+            A list of the json data, with the metrics of the crawl as its `metrics`.
+
+        """
+        results = metrics.CrawlResult.collect(
+            SafeSpiderRunner.iterate(spider, settings, spider_kwargs)
+        )
+        if 'FEED_URI' in settings:
+            results[:] = SafeSpiderRunner._get_results(
+                settings['FEED_URI'], delete_file, settings.get('FEED_FORMAT', 'jsonlines')
+            )
         logger.debug('%d items retrieved' % len(results))
         return results
+
+
+    @staticmethod
+    def run_many(crawls: Dict[str, tuple]) -> Dict[str, 'metrics.CrawlResult']:
+        """Run several spiders at once in a single new process, a blocking function.
+
+        The spiders are crawled concurrently on one reactor and share its connection pool, so the
+        call takes about as long as the slowest crawl rather than the sum of them.
+
+        Args:
+            crawls: The spider, settings and spider arguments (or `None`) of each crawl, by key.
+
+        Returns:
+            The results of each crawl by key, each with the metrics of its crawl as `metrics`.
+
+        Raises:
+            RuntimeError: A crawl failed, or the process exited before finishing the crawls.
+
+        """
+        crawls = OrderedDict(
+            (key, (spider, settings, spider_kwargs or {}))
+            for key, (spider, settings, spider_kwargs) in crawls.items()
+        )
+        names = ', '.join(str(spider) for spider, _, _ in crawls.values())
+        logger.info('Creating new process for spiders %s' % names)
+        p, parent_conn, stop = SafeSpiderRunner._spawn_process(
+            SafeSpiderRunner._crawl_many_safely, crawls
+        )
+        results = OrderedDict((key, metrics.CrawlResult()) for key in crawls)
+        errors = {}
+        pending = set(crawls)
+        finished = False
+        try:
+            while pending:
+                try:
+                    key, (kind, payload) = parent_conn.recv()
+                except EOFError:
+                    raise RuntimeError('Crawler process exited before finishing the crawl.')
+                if kind == 'items':
+                    results[key].extend(payload)
+                    continue
+                pending.discard(key)
+                if kind == 'error':
+                    errors[key] = payload
+                else:
+                    results[key].metrics = payload
+            finished = True
+        finally:
+            SafeSpiderRunner._stop_process(p, parent_conn, stop, finished, names)
+        if errors:
+            raise RuntimeError('Crawl failed: %s' % '; '.join(
+                '%s: %s' % (key, error) for key, error in sorted(errors.items())
+            ))
+        for key, (_, settings, _) in crawls.items():
+            if 'FEED_URI' in settings:
+                results[key][:] = SafeSpiderRunner._get_results(
+                    settings['FEED_URI'], True, settings.get('FEED_FORMAT', 'jsonlines')
+                )
+        logger.info('%s finished running' % names)
+        return results
+
+
+class AsyncSpiderRun:
+    """Runs a spider in a new process without blocking the asyncio event loop.
+
+    The result pipe and the process sentinel are watched with `loop.add_reader`, so any number
+    of runs can be awaited from a single event loop.  Iterate over the run with `async for` to
+    receive items while the spider is still crawling, or await `collect()` for all of them.
+    Cancelling the awaiting task, or calling `aclose()`, cancels the crawl.  So does dropping the
+    last reference to an unfinished run, e.g. after breaking out of `async for`.  The metrics of
+    the crawl are available as `metrics` once it has finished.
+
+    Example:
+        >>> run = AsyncSpiderRun(AchievementSpider, {})
+        >>> async for achievement in run:
+        >>>     print(achievement['name'])
+
+    """
+
+    def __init__(self, spider: 'Spider', settings: Dict[str, Any],
+                 spider_kwargs: Optional[Dict[str, Any]] = None,
+                 transform: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 prepare: Optional[Callable[[], Awaitable[None]]] = None):
+        """Initialize the run, the process is started on first use.
+
+        Args:
+            spider: Spider to run.
+            settings: Spider settings.
+            spider_kwargs: Keyword arguments passed to the spider constructor, e.g. `start_urls`.
+            transform: Applied to each item before it is returned.
+            prepare: Coroutine function awaited before the process is started.
+
+        """
+        self.spider = spider
+        self.settings = settings
+        self.spider_kwargs = spider_kwargs
+        self._transform = transform
+        self._prepare = prepare
+        self._loop = None
+        self._process = None
+        self._conn = None
+        self._stop = None
+        self._buffer = deque()
+        self._finished = False
+        self._exited = None
+        self._finalizer = None
+        self._receive_time = 0.0
+        self.metrics = None  # type: Optional[metrics.CrawlMetrics]
+
+    def __aiter__(self) -> 'AsyncSpiderRun':
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            while not self._buffer:
+                if self._finished:
+                    raise StopAsyncIteration
+                await self._receive()
+        except asyncio.CancelledError:
+            self._close(cancel=True)
+            raise
+        item = self._buffer.popleft()
+        return self._transform(item) if self._transform else item
+
+    async def collect(self) -> 'metrics.CrawlResult':
+        """Wait for the crawl to finish.
+
+        Returns:
+            Every scraped item, with the metrics of the crawl as its `metrics`.
+
+        """
+        results = metrics.CrawlResult()
+        async for item in self:
+            results.append(item)
+        results.metrics = self.metrics
+        return results
+
+    async def aclose(self):
+        """Cancel the crawl, if it is still running, and wait for its process to exit."""
+        self._close(cancel=not self._finished)
+        if self._exited is not None:
+            await asyncio.shield(self._exited)
+
+    async def _start(self):
+        """Start the crawling process."""
+        if self._prepare is not None:
+            await self._prepare()
+        self._loop = asyncio.get_event_loop()
+        self._exited = self._loop.create_future()
+        self._process, self._conn, self._stop = SafeSpiderRunner._spawn(
+            self.spider, self.settings, self.spider_kwargs
+        )
+        # Must not refer to the run, so that it does not keep the run alive.
+        self._finalizer = weakref.finalize(
+            self, AsyncSpiderRun._abandon, self._loop, self._process, self._conn, self._stop,
+            self.spider
+        )
+
+    @staticmethod
+    def _abandon(loop: 'asyncio.AbstractEventLoop', process: Process, conn: Connection,
+                 stop: Event, spider: 'Spider'):
+        """Cancel the crawl of a run which was dropped before it was closed."""
+        if conn.closed:
+            return
+        if not loop.is_running():
+            SafeSpiderRunner._stop_process(process, conn, stop, False, spider)
+            return
+        logger.info('Cancelling abandoned spider %s' % spider)
+        loop.remove_reader(conn.fileno())
+        stop.set()
+        conn.close()
+        terminate = loop.call_later(CANCEL_TIMEOUT, process.terminate)
+
+        def reap():
+            loop.remove_reader(process.sentinel)
+            terminate.cancel()
+            process.join()
+
+        loop.add_reader(process.sentinel, reap)
+
+    async def _receive(self):
+        """Wait for the next message on the result pipe and handle it."""
+        if self._process is None:
+            await self._start()
+        readable = self._loop.create_future()
+        fd = self._conn.fileno()
+        self._loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await readable
+        finally:
+            self._loop.remove_reader(fd)
+        start = time.perf_counter()
+        try:
+            kind, payload = self._conn.recv()
+        except EOFError:
+            self._close(cancel=False)
+            raise RuntimeError('Crawler process exited before finishing the crawl.')
+        self._receive_time += time.perf_counter() - start
+        if kind == 'items':
+            self._buffer.extend(payload)
+        elif kind == 'error':
+            self._close(cancel=False)
+            raise RuntimeError('Crawl failed: %s' % payload)
+        else:
+            self.metrics = payload
+            if self.metrics is not None:
+                self.metrics.receive_time = self._receive_time
+            self._close(cancel=False)
+
+    def _close(self, cancel: bool):
+        """Stop listening to the process and reap it once it exits."""
+        if self._finished or self._process is None:
+            self._finished = True
+            return
+        self._finished = True
+        self._finalizer.detach()
+        if cancel:
+            logger.info('Cancelling spider %s' % self.spider)
+            self._stop.set()
+        self._conn.close()
+        terminate = self._loop.call_later(CANCEL_TIMEOUT, self._process.terminate)
+
+        def reap():
+            self._loop.remove_reader(self._process.sentinel)
+            terminate.cancel()
+            self._process.join()
+            self._exited.set_result(None)
+            logger.info('%s finished running' % self.spider)
+
+        self._loop.add_reader(self._process.sentinel, reap)
@@ -0,0 +1,110 @@
+"""Snapshots of the item catalog pages used to skip pages which did not change.
+
+A `CatalogSnapshot` remembers a content hash of every item category page together with the items
+parsed from it.  When a page is fetched again with the same hash its items are taken over from
+the snapshot instead of parsing the page.  Comparing two snapshots gives the items which were
+added, removed or changed in between.
+
+Example:
+    >>> process.crawl(ItemSpider, snapshot_path='item_snapshot.json')
+    >>> CatalogSnapshot.load('item_snapshot.json').delta
+    {'added': [...], 'removed': [...], 'changed': [...]}
+
+"""
+
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_PATH = Path.home() / '.rlgpy' / 'item_snapshot.json'
+
+
+class CatalogSnapshot:
+    """Content hashes and items of the item category pages.
+
+    Attributes:
+        pages (Dict[str, Dict[str, Any]]): The `hash` and `items` of each page by its URL.
+        delta (Dict[str, List[Dict[str, Any]]]): The items `added`, `removed` and `changed` since
+            the previous snapshot, as recorded when the snapshot was taken.
+        taken_at (float): Unix timestamp the snapshot was taken at.
+
+    """
+
+    def __init__(self, pages: Optional[Dict[str, Dict[str, Any]]] = None,
+                 delta: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                 taken_at: Optional[float] = None):
+        self.pages = pages if pages is not None else {}
+        self.delta = delta if delta is not None else {'added': [], 'removed': [], 'changed': []}
+        self.taken_at = taken_at if taken_at is not None else time.time()
+
+    @classmethod
+    def load(cls, path: str) -> 'CatalogSnapshot':
+        """Read a snapshot, an empty snapshot if the file does not exist."""
+        path = Path(path)
+        if not path.is_file():
+            return cls()
+        data = json.loads(path.read_text())
+        return cls(data['pages'], data.get('delta'), data.get('taken_at'))
+
+    def save(self, path: str):
+        """Write the snapshot to a file, replacing it atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name('%s.%d.tmp' % (path.name, os.getpid()))
+        tmp_path.write_text(json.dumps({
+            'taken_at': self.taken_at,
+            'pages': self.pages,
+            'delta': self.delta
+        }))
+        os.replace(str(tmp_path), str(path))
+
+    @staticmethod
+    def page_hash(body: bytes) -> str:
+        """Content hash of a page."""
+        return hashlib.sha1(body).hexdigest()
+
+    def unchanged_items(self, url: str, page_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """The items of a page if its content hash is unchanged, otherwise `None`."""
+        page = self.pages.get(url)
+        if page is None or page['hash'] != page_hash:
+            return None
+        return page['items']
+
+    def set_page(self, url: str, page_hash: str, items: Optional[List[Dict[str, Any]]] = None):
+        """Record the content hash of a page and the items parsed from it."""
+        self.pages[url] = {'hash': page_hash, 'items': list(items or ())}
+
+    def add_item(self, url: str, item: Dict[str, Any]):
+        """Record an item parsed from a page whose hash was already recorded."""
+        self.pages[url]['items'].append(item)
+
+    def items(self) -> Dict[Any, Dict[str, Any]]:
+        """Every item of the snapshot by `data_id`."""
+        return {item['data_id']: item for page in self.pages.values() for item in page['items']}
+
+    def diff(self, previous: 'CatalogSnapshot') -> Dict[str, List[Dict[str, Any]]]:
+        """Compare the snapshot to an earlier one.
+
+        Args:
+            previous: The earlier snapshot.
+
+        Returns:
+            The items which are only in this snapshot (`added`), only in the earlier one
+            (`removed`), and those which differ (`changed`, as they are now).
+
+        """
+        items, previous_items = self.items(), previous.items()
+        return {
+            'added': [item for data_id, item in items.items() if data_id not in previous_items],
+            'removed': [
+                item for data_id, item in previous_items.items() if data_id not in items
+            ],
+            'changed': [
+                item for data_id, item in items.items()
+                if data_id in previous_items and previous_items[data_id] != item
+            ]
+        }
@@ -1,5 +1,32 @@
-"""Rocket League Garage spiders."""
+"""Rocket League Garage spiders.
 
-from rlgpy.scraper.spiders.item import ItemSpider
-from rlgpy.scraper.spiders.trade import TradeSpider
-from rlgpy.scraper.spiders.achievement import AchievementSpider
+On Python 3.7 and later each spider module, and Scrapy with it, is only imported once the spider
+is first used.
+
+"""
+
+import sys
+import importlib
+
+
+_SPIDER_MODULES = {
+    'ItemSpider': 'rlgpy.scraper.spiders.item',
+    'TradeSpider': 'rlgpy.scraper.spiders.trade',
+    'AchievementSpider': 'rlgpy.scraper.spiders.achievement'
+}
+
+__all__ = list(_SPIDER_MODULES)
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str):
+        module = _SPIDER_MODULES.get(name)
+        if module is None:
+            raise AttributeError('module %r has no attribute %r' % (__name__, name))
+        spider = getattr(importlib.import_module(module), name)
+        globals()[name] = spider
+        return spider
+else:  # pragma: no cover
+    from rlgpy.scraper.spiders.item import ItemSpider
+    from rlgpy.scraper.spiders.trade import TradeSpider
+    from rlgpy.scraper.spiders.achievement import AchievementSpider
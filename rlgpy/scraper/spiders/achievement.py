@@ -37,7 +37,10 @@ class AchievementSpider(scrapy.Spider):
     allowed_domains = ['rocket-league.com']
     start_urls = ['https://rocket-league.com/trophies']
     custom_settings = {
-        'ITEM_PIPELINES': {'rlgpy.scraper.pipelines.RlAchievementPipeline': 300}
+        'ITEM_PIPELINES': {
+            'rlgpy.scraper.pipelines.RlAchievementPipeline': 300,
+            'rlgpy.scraper.pipelines.RlSQLitePipeline': 500
+        }
     }
 
 
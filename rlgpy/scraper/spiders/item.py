@@ -11,13 +11,48 @@ Example:
     Produces a jsonlines file 'item_data.jl' which contains each Rocket League item in JSON format
     separated by newline.
 
+    Setting `RLG_FAST_PARSER` to `True` parses the items with the precompiled parsers in
+    `rlgpy.scraper.parsers` instead of the item loaders.
+
+    With a `snapshot_path` only the pages which changed since the previous crawl are parsed and
+    only their items are scraped.  The items added, removed and changed since the previous crawl
+    are recorded in the snapshot, see `rlgpy.scraper.snapshots`.
+    >>> process.crawl(ItemSpider, snapshot_path='item_snapshot.json')
+
+    The category pages listed in `RLG_ITEM_CATEGORIES` are requested right away together with the
+    item overview page, which only adds the categories missing from the setting.  Every category
+    page is requested once, whatever the form of the links to it, and an item listed in several
+    categories is only parsed the first time.
+
 """
 
-from scrapy.http import Response
+from typing import Iterator, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.http import Request, Response
 from scrapy.spiders import CrawlSpider, Rule
 from scrapy.linkextractors import LinkExtractor
+from w3lib.url import canonicalize_url, url_query_cleaner
 
+from rlgpy.scraper import parsers
 from rlgpy.scraper.items import RlItemLoader, RlItem
+from rlgpy.scraper.snapshots import CatalogSnapshot
+from rlgpy.scraper.metrics import DEDUP
+
+
+# Category pages requested without waiting for the links on the item overview page.
+CATEGORIES = ['bodies', 'wheels', 'decals', 'boosts', 'toppers', 'antennas', 'trails', 'explosions']
+
+# Query parameters which select a different listing, all others are dropped from page URLs.
+PAGE_PARAMS = ('p',)
+
+
+def canonical_url(url: str) -> str:
+    """The URL of a category page without fragment, trailing slash or irrelevant parameters."""
+    scheme, netloc, path, query, _ = urlsplit(url_query_cleaner(url, PAGE_PARAMS))
+    return canonicalize_url(urlunsplit((scheme, netloc.lower(), path.rstrip('/'), query, '')))
 
 
 class ItemSpider(CrawlSpider):
@@ -30,6 +65,9 @@ class ItemSpider(CrawlSpider):
         rules (:obj:`tuple` of :obj:`scrapy.spiders.Rule`): Additional spider rules for following
             links.
         custom_settings: ItemSpider specific settings, mapping it to the associated pipeline.
+        snapshot_path (str): File of the catalog snapshot, enables skipping unchanged pages.
+        requested_urls (Set[str]): Canonical URLs of the pages requested so far.
+        item_ids (Set[int]): IDs of the items parsed so far.
 
     """
 
@@ -38,16 +76,107 @@ class ItemSpider(CrawlSpider):
     start_urls = ['https://rocket-league.com/items']
     rules = (
         Rule(
-            link_extractor=LinkExtractor(allow=(r'/items/*',)),
+            link_extractor=LinkExtractor(allow=(r'/items/[\w-]+/?(\?p=\d+)?(#.*)?$',)),
             callback='parse_items'
         ),
     )
     custom_settings = {
-        'ITEM_PIPELINES': {'rlgpy.scraper.pipelines.RlItemPipeline': 300}
+        'ITEM_PIPELINES': {
+            'rlgpy.scraper.pipelines.RlItemPipeline': 300,
+            'rlgpy.scraper.pipelines.RlSQLitePipeline': 500
+        }
     }
+    snapshot_path = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.previous_snapshot = None
+        self.snapshot = None
+        self.requested_urls = set()
+        self.item_ids = set()
+
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler, *args, **kwargs) -> 'ItemSpider':
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if spider.snapshot_path is not None:
+            spider.previous_snapshot = CatalogSnapshot.load(spider.snapshot_path)
+            spider.snapshot = CatalogSnapshot()
+            crawler.signals.connect(spider.item_scraped, signal=signals.item_scraped)
+        return spider
+
+
+    def item_scraped(self, item: RlItem, response: Response):
+        """Record the items which made it through the pipelines in the snapshot."""
+        self.snapshot.add_item(response.url, dict(item))
+
 
+    def closed(self, reason: str):
+        """Record the changes since the previous snapshot and save the new snapshot.
 
-    def parse_items(self, response: Response) -> RlItem:
+        Pages which were not crawled because the crawl was cut short are taken over from the
+        previous snapshot, so that their items are not reported as removed.
+
+        """
+        if self.snapshot is None:
+            return
+        if reason != 'finished':
+            for url, page in self.previous_snapshot.pages.items():
+                self.snapshot.pages.setdefault(url, page)
+        self.snapshot.delta = self.snapshot.diff(self.previous_snapshot)
+        self.snapshot.save(self.snapshot_path)
+        self.logger.info(
+            'Catalog snapshot: %d added, %d removed, %d changed items',
+            *(len(self.snapshot.delta[kind]) for kind in ('added', 'removed', 'changed'))
+        )
+
+
+    def start_requests(self) -> Iterator[Request]:
+        """Request the item overview pages together with the known category pages."""
+        for url in self.start_urls:
+            self.requested_urls.add(canonical_url(url))
+            yield Request(url, dont_filter=True)
+        for url in self.start_urls:
+            for category in self.settings.getlist('RLG_ITEM_CATEGORIES', CATEGORIES):
+                request = self._request_once(urljoin(url.rstrip('/') + '/', category))
+                if request is not None:
+                    yield request
+
+
+    def _request_once(self, url: str) -> Optional[Request]:
+        """A request for a category page, `None` if the page was requested already."""
+        canonical = canonical_url(url)
+        if canonical in self.requested_urls:
+            self.crawler.stats.inc_value(DEDUP + 'requests_skipped', spider=self)
+            return None
+        self.requested_urls.add(canonical)
+        return Request(canonical, callback=self.parse_items)
+
+
+    def _requests_to_follow(self, response: Response) -> Iterator[Request]:
+        """Follow the links to category pages which were not requested yet."""
+        for request in super()._requests_to_follow(response):
+            canonical = canonical_url(request.url)
+            if canonical in self.requested_urls:
+                self.crawler.stats.inc_value(DEDUP + 'requests_skipped', spider=self)
+                continue
+            self.requested_urls.add(canonical)
+            yield request.replace(url=canonical)
+
+
+    def _first_sighting(self, data_id: Optional[str]) -> bool:
+        """Whether an item is seen for the first time, counting the items which are skipped."""
+        if data_id is None:
+            return True
+        data_id = int(data_id)
+        if data_id in self.item_ids:
+            self.crawler.stats.inc_value(DEDUP + 'items_skipped', spider=self)
+            return False
+        self.item_ids.add(data_id)
+        return True
+
+
+    def parse_items(self, response: Response) -> Iterator[RlItem]:
         """Parse items from the item category pages.
 
         Args:
@@ -59,8 +188,26 @@ class ItemSpider(CrawlSpider):
         """
         self.logger.info('Crawler Found Item Page: %s', response.url)
 
+        if self.snapshot is not None:
+            page_hash = CatalogSnapshot.page_hash(response.body)
+            items = self.previous_snapshot.unchanged_items(response.url, page_hash)
+            self.snapshot.set_page(response.url, page_hash, items)
+            if items is not None:
+                self.crawler.stats.inc_value('rlg/snapshot/unchanged_pages', spider=self)
+                self.item_ids.update(item['data_id'] for item in items)
+                return
+            self.crawler.stats.inc_value('rlg/snapshot/changed_pages', spider=self)
+
+        if self.settings.getbool('RLG_FAST_PARSER'):
+            for elem_item in parsers.ITEMS(response.selector.root):
+                if self._first_sighting(parsers.item_data_id(elem_item)):
+                    yield parsers.parse_item(elem_item)
+            return
+
         # Iterate through each rocket league item and build it.
         for elem_item in response.xpath('//div[starts-with(@class, "rlg-item__container")]'):
+            if not self._first_sighting(elem_item.xpath('.//div/@data-id').extract_first()):
+                continue
             loader = RlItemLoader(item=RlItem(), selector=elem_item)
             loader.add_xpath('data_id', './/div/@data-id')
             loader.add_xpath('img_url', './/img/@src')
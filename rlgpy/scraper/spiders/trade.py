@@ -19,15 +19,43 @@ Examples:
     >>>     'https://rocket-league.com/trading?filterItem=733&filterCertification=0&...'
     >>> ]
 
+    Several start URLs can be crawled in one run.  Each trade is tagged with the start URL it was
+    found through, and `max_trades_per_url` caps the number of trades taken from each of them.
+    >>> process.crawl(TradeSpider, start_urls=[...], max_trades_per_url=50)
+
+    Polling the same pages repeatedly can be made incremental by remembering the trades that were
+    already scraped in a file.  Known trades are skipped and a start URL stops paginating once one
+    of its pages contains only known trades.
+    >>> process.crawl(TradeSpider, seen_path='seen_trades.bloom')
+
+    By default the following pages are found through the pagination links of each page, so page
+    N + 1 is only requested once page N has been parsed.  Setting `RLG_TRADE_PAGINATION` to
+    `'direct'` requests the pages by number instead, all of the pages needed for the trade budget
+    at once, keeping the filter parameters of the start URL.
+    >>> process.crawl(TradeSpider, start_urls=['https://rocket-league.com/trading?filterItem=733'])
+
+    Setting `RLG_FAST_PARSER` to `True` parses the trades with the precompiled parsers in
+    `rlgpy.scraper.parsers` instead of the item loaders.
+
 """
 
-from typing import List
+import os
+import math
 
+from collections import Counter
+from typing import List, Iterator, Union
+
+from scrapy import signals
+from scrapy.crawler import Crawler
 from scrapy.selector import Selector
-from scrapy.http import Response
+from scrapy.settings import Settings, SETTINGS_PRIORITIES
+from scrapy.http import Request, Response
 from scrapy.spiders import CrawlSpider, Rule
 from scrapy.linkextractors import LinkExtractor
+from w3lib.url import add_or_replace_parameter, url_query_parameter
 
+from rlgpy.scraper import parsers
+from rlgpy.scraper.dedup import RotatingBloomFilter
 from rlgpy.scraper.items import (
     RlTradeLoader,
     RlTrade,
@@ -36,6 +64,9 @@ from rlgpy.scraper.items import (
 )
 
 
+PAGINATION_MODES = ('links', 'direct')
+
+
 class TradeSpider(CrawlSpider):
     """Spider which crawls and extracts Rocket League trade data.
 
@@ -46,6 +77,13 @@ class TradeSpider(CrawlSpider):
         rules (:obj:`tuple` of :obj:`scrapy.spiders.Rule`): Additional spider rules for following
             links.
         custom_settings: ItemSpider specific settings, mapping it to the associated pipeline.
+        default_limits: Concurrent requests and number of trades of a crawl which does not set
+            them in its settings.
+        max_trades_per_url (int): Maximum number of trades scraped through each start URL, no
+            limit if `None`.
+        seen_ids (Iterable[str]): IDs of trades which were already scraped and are skipped.
+        seen_path (str): File in which the IDs of scraped trades are remembered between runs.
+            Enables incremental crawling together with `seen_ids`.
 
     """
     name = 'rl-trade'
@@ -54,14 +92,180 @@ class TradeSpider(CrawlSpider):
     rules = (
         Rule(
             link_extractor=LinkExtractor(allow=(r'/trading\?p=\d*',)),
-            callback='parse_trades'
+            callback='parse_trades',
+            follow=True
         ),
     )
     custom_settings = {
+        'ITEM_PIPELINES': {
+            'rlgpy.scraper.pipelines.RlTradePipeline': 300,
+            'rlgpy.scraper.pipelines.RlMarketPipeline': 400,
+            'rlgpy.scraper.pipelines.RlSQLitePipeline': 500
+        }
+    }
+    default_limits = {
         'CONCURRENT_REQUESTS': 5,
-        'CLOSESPIDER_ITEMCOUNT': 500,
-        'ITEM_PIPELINES': {'rlgpy.scraper.pipelines.RlTradePipeline': 300}
+        'CLOSESPIDER_ITEMCOUNT': 500
     }
+    max_trades_per_url = None
+    seen_ids = None
+    seen_path = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests_per_url = Counter()
+        self.caught_up_urls = set()
+        self.seen = None
+        self.direct = False
+        self.yielded_per_url = Counter()
+        self.pending_pages = Counter()
+        self.requested_pages = Counter()
+        self.last_page = {}
+        self.trades_per_page = {}
+
+
+    @classmethod
+    def update_settings(cls, settings: Settings):
+        """Apply the custom settings, and the default limits unless the crawl sets its own."""
+        super().update_settings(settings)
+        for name, value in cls.default_limits.items():
+            if settings.getpriority(name) <= SETTINGS_PRIORITIES['default']:
+                settings.set(name, value, priority='spider')
+
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler, *args, **kwargs) -> 'TradeSpider':
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.trade_scraped, signal=signals.item_scraped)
+        pagination = crawler.settings.get('RLG_TRADE_PAGINATION', 'links')
+        if pagination not in PAGINATION_MODES:
+            raise ValueError('Unknown RLG_TRADE_PAGINATION %r, expected one of %s.' % (
+                pagination, ', '.join(PAGINATION_MODES)
+            ))
+        spider.direct = pagination == 'direct'
+        if spider.seen_ids is not None or spider.seen_path is not None:
+            spider.seen = spider._load_seen(crawler.settings)
+        return spider
+
+
+    def _load_seen(self, settings) -> RotatingBloomFilter:
+        """Load the seen trades filter, or create it sized by the `RLG_SEEN_*` settings."""
+        if self.seen_path is not None and os.path.exists(self.seen_path):
+            seen = RotatingBloomFilter.load(self.seen_path)
+        else:
+            seen = RotatingBloomFilter(
+                capacity=settings.getint('RLG_SEEN_CAPACITY', 100000),
+                error_rate=settings.getfloat('RLG_SEEN_ERROR_RATE', 0.001),
+                generations=settings.getint('RLG_SEEN_GENERATIONS', 4)
+            )
+        seen.update(self.seen_ids or ())
+        return seen
+
+
+    def closed(self, reason: str):
+        """Persist the seen trades filter."""
+        if self.seen is not None and self.seen_path is not None:
+            self.seen.save(self.seen_path)
+
+
+    def trade_scraped(self, item: RlTrade):
+        """Remember the trades which made it through the pipelines."""
+        if self.seen is not None and item.get('data_id'):
+            self.seen.add(item['data_id'])
+
+
+    def url_exhausted(self, source_url: str) -> bool:
+        """Whether the trade budget of a start URL has been used up or it has caught up."""
+        if source_url in self.caught_up_urls:
+            return True
+        if self.max_trades_per_url is None:
+            return False
+        return self.yielded_per_url[source_url] >= int(self.max_trades_per_url)
+
+
+    def start_requests(self) -> Iterator[Request]:
+        """Request each start URL, remembering it as the source of the pages crawled from it."""
+        for url in self.start_urls:
+            yield Request(url, dont_filter=True, meta={'source_url': url})
+
+
+    def parse_start_url(self, response: Response) -> Iterator[RlTrade]:
+        """Parse the trades on the start page itself, e.g. a profile or filtered trade page."""
+        return self.parse_trades(response)
+
+
+    def _requests_to_follow(self, response: Response) -> Iterator[Request]:
+        """Follow pagination links, sharing the request budget fairly between start URLs.
+
+        Requests inherit the start URL of the page they were found on.  Start URLs with fewer
+        requests so far get a higher priority, so that no single URL can take up all of the
+        concurrent requests.
+
+        """
+        source_url = response.meta.get('source_url', response.url)
+        if self.direct or self.url_exhausted(source_url):
+            return
+        for request in super()._requests_to_follow(response):
+            request.meta['source_url'] = source_url
+            request.priority = -self.requests_per_url[source_url]
+            self.requests_per_url[source_url] += 1
+            yield request
+
+
+    def trade_budget(self, source_url: str) -> int:
+        """Number of trades to scrape through a start URL, 0 if there is no limit."""
+        if self.max_trades_per_url is not None:
+            return int(self.max_trades_per_url)
+        return math.ceil(
+            self.settings.getint('CLOSESPIDER_ITEMCOUNT') / max(1, len(self.start_urls))
+        )
+
+
+    def _paginate(self, response: Response, source_url: str,
+                  trade_count: int) -> Iterator[Request]:
+        """Request the following pages of a start URL by number.
+
+        The pages needed for the trade budget of the start URL, going by the number of trades on
+        its first page, are requested at once.  Once all of them have been parsed and the budget
+        is still not met, e.g. because known trades were skipped, the next batch is requested.
+        No more pages are requested after an empty page.
+
+        Args:
+            response: The parsed trade page.
+            source_url: The start URL the page belongs to.
+            trade_count: Number of trades on the page.
+
+        Yields:
+            Requests for the following pages.
+
+        """
+        page = response.meta.get('page')
+        if page is None:
+            page = int(url_query_parameter(source_url, 'p', '1') or 1)
+        else:
+            self.pending_pages[source_url] -= 1
+        if not trade_count:
+            self.last_page[source_url] = min(self.last_page.get(source_url, page), page - 1)
+        if (source_url in self.last_page or self.pending_pages[source_url] > 0
+                or self.url_exhausted(source_url)):
+            return
+
+        per_page = self.trades_per_page.setdefault(source_url, trade_count)
+        budget = self.trade_budget(source_url)
+        if budget:
+            batch = math.ceil((budget - self.yielded_per_url[source_url]) / per_page)
+        else:
+            batch = self.settings.getint('CONCURRENT_REQUESTS')
+        first = max(page, self.requested_pages[source_url]) + 1
+        for number in range(first, first + batch):
+            self.pending_pages[source_url] += 1
+            self.requested_pages[source_url] = number
+            yield Request(
+                add_or_replace_parameter(source_url, 'p', str(number)),
+                callback=self.parse_trades,
+                priority=-number,
+                meta={'source_url': source_url, 'page': number}
+            )
 
     @staticmethod
     def parse_items(selector: Selector) -> List[RlTradeableItem]:
@@ -88,24 +292,73 @@ class TradeSpider(CrawlSpider):
         return items
 
 
-    def parse_trades(self, response: Response) -> RlTrade:
+    @staticmethod
+    def load_trade(trade: Selector, source_url: str) -> RlTrade:
+        """Load a trade from the provided selector.
+
+        Args:
+            trade: The element selector of a single trade.
+            source_url: The start URL through which the trade was found.
+
+        Returns: The loaded trade item.
+
+        """
+        loader = RlTradeLoader(item=RlTrade(), selector=trade)
+        loader.add_value('source_url', source_url)
+        loader.add_css('data_id', '[name="bookmark"]::attr(data-alias)')
+        loader.add_css('url', 'div:first-child a::attr(href)')
+        loader.add_css('platform', 'div.rlg-trade-platform-name span::text', re=r'([^\s:]+)')
+        loader.add_css('rlg_username', 'div.rlg-trade__avatar img::attr(alt)')
+        loader.add_value('have', TradeSpider.parse_items(trade.css('div#rlg-youritems a')))
+        loader.add_value('want', TradeSpider.parse_items(trade.css('div#rlg-theiritems a')))
+        return loader.load_item()
+
+
+    def parse_trades(self, response: Response) -> Iterator[Union[RlTrade, Request]]:
         """Parse trades on the current page.
 
         Args:
             response: The response containing the resource from the extracted URL.
 
         Yields:
-            A loaded trade item.
+            A loaded trade item, followed by the requests for the next pages with direct
+            pagination.
 
         """
         self.logger.info('Crawler Found Trade Page: %s', response.url)
 
-        for trade in response.css('div.is--user'):
-            loader = RlTradeLoader(item=RlTrade(), selector=trade)
-            loader.add_css('data_id', '[name="bookmark"]::attr(data-alias)')
-            loader.add_css('url', 'div:first-child a::attr(href)')
-            loader.add_css('platform', 'div.rlg-trade-platform-name span::text', re=r'([^\s:]+)')
-            loader.add_css('rlg_username', 'div.rlg-trade__avatar img::attr(alt)')
-            loader.add_value('have', TradeSpider.parse_items(trade.css('div#rlg-youritems a')))
-            loader.add_value('want', TradeSpider.parse_items(trade.css('div#rlg-theiritems a')))
-            yield loader.load_item()
+        source_url = response.meta.get('source_url', response.url)
+        if self.url_exhausted(source_url):
+            return
+
+        fast = self.settings.getbool('RLG_FAST_PARSER')
+        if fast:
+            trades = parsers.TRADES(response.selector.root)
+        else:
+            trades = response.css('div.is--user')
+
+        found_new = 0
+        for trade in trades:
+            if self.url_exhausted(source_url):
+                break
+            if self.seen is not None:
+                if fast:
+                    data_id = parsers.trade_data_id(trade)
+                else:
+                    data_id = trade.css('[name="bookmark"]::attr(data-alias)').extract_first()
+                # Trades without a bookmark can not be recognized, they are always scraped.
+                if data_id and data_id in self.seen:
+                    continue
+            found_new += 1
+            self.yielded_per_url[source_url] += 1
+            if fast:
+                yield parsers.parse_trade(trade, source_url)
+            else:
+                yield TradeSpider.load_trade(trade, source_url)
+
+        if trades and not found_new:
+            self.logger.info('Caught up with known trades of %s', source_url)
+            self.caught_up_urls.add(source_url)
+
+        if self.direct:
+            yield from self._paginate(response, source_url, len(trades))
@@ -0,0 +1,281 @@
+"""Adaptive concurrency for crawling RLG as fast as it allows.
+
+A fixed `CONCURRENT_REQUESTS` is either too low and wastes throughput, or too high and gets the
+crawl throttled by the site.  The `AdaptiveConcurrencyMiddleware` tunes the concurrency and delay
+of each download slot, i.e. of each domain, with an additive increase, multiplicative decrease
+controller:
+
+    - Every `RLG_ADAPTIVE_WINDOW` responses of a slot are evaluated.  When the window had no more
+      than `RLG_ADAPTIVE_ERROR_RATE` errors and its median latency stayed within
+      `RLG_ADAPTIVE_LATENCY_FACTOR` times the lowest median latency seen, the delay is halved or,
+      once there is no delay left, the concurrency is raised by one up to the ceiling.
+    - Otherwise the concurrency is halved, or the delay doubled once the concurrency is down to
+      one request at a time.
+    - A `429 Too Many Requests` or `503 Service Unavailable` response halves the concurrency at
+      once and pauses the slot for the time the `Retry-After` header asks for.
+    - Once the crawl scrapes `RLG_ADAPTIVE_TARGET_RATE` items per second the concurrency is no
+      longer raised.
+
+Every decision is counted in the crawl stats under `rlg/throttle/`, and the latest decisions are
+listed in `rlg/throttle/decisions`, so they show up in the `throttle` metrics of the crawl.
+
+Example:
+    >>> settings = adaptive_settings(max_concurrency=16, target_rate=50)
+    >>> items = SafeSpiderRunner.run(TradeSpider, settings)
+    >>> items.metrics.throttle['concurrency']
+
+"""
+
+import time
+import statistics
+from collections import deque
+from email.utils import mktime_tz, parsedate_tz
+from typing import Any, Dict, List, Optional, Tuple
+
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Request, Response
+from scrapy.spiders import Spider
+
+from rlgpy.scraper.metrics import THROTTLE
+
+
+# Statuses with which the site asks clients to slow down.
+BACKOFF_STATUSES = (429, 503)
+
+# Seconds a slot is paused after a backoff status without a `Retry-After` header.
+DEFAULT_BACKOFF = 5.0
+
+# Smallest delay set once the concurrency cannot be lowered any further.
+MIN_STEP_DELAY = 0.25
+
+# Seconds over which the scrape rate is measured.
+RATE_PERIOD = 10.0
+
+# Number of decisions kept in the stats.
+MAX_DECISIONS = 100
+
+
+def adaptive_settings(max_concurrency: int = 16, target_rate: Optional[float] = None,
+                      start_concurrency: int = 2) -> Dict[str, Any]:
+    """Settings which enable adaptive concurrency.
+
+    Args:
+        max_concurrency: Hard ceiling of concurrent requests, per slot and in total.
+        target_rate: Items per second at which the concurrency is no longer raised, `None` to
+            raise it for as long as the site keeps up.
+        start_concurrency: Concurrent requests of each slot at the start of the crawl.
+
+    Returns:
+        The settings to merge into the settings of a crawl.
+
+    """
+    return {
+        'RLG_ADAPTIVE_CONCURRENCY': True,
+        'RLG_ADAPTIVE_MAX_CONCURRENCY': max_concurrency,
+        'RLG_ADAPTIVE_TARGET_RATE': target_rate,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': min(start_concurrency, max_concurrency),
+        'RETRY_HTTP_CODES': [500, 502, 503, 504, 522, 524, 408, 429],
+        'DOWNLOADER_MIDDLEWARES': {
+            'rlgpy.scraper.throttle.AdaptiveConcurrencyMiddleware': 800
+        }
+    }
+
+
+def parse_retry_after(value: Optional[bytes], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait according to a `Retry-After` header, in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.decode('latin-1').strip()
+    if value.isdigit():
+        return float(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, mktime_tz(parsed) - (time.time() if now is None else now))
+
+
+class _SlotState:
+    """Observations of a download slot within the current window."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.responses = 0
+        self.errors = 0
+        self.latencies = []  # type: List[float]
+        self.baseline = None  # type: Optional[float]
+        self.paused_until = None  # type: Optional[float]
+
+    def reset(self):
+        self.responses = 0
+        self.errors = 0
+        self.latencies = []
+
+
+class AdaptiveConcurrencyMiddleware:
+    """Downloader middleware tuning the concurrency and delay of each download slot.
+
+    Enabled by `RLG_ADAPTIVE_CONCURRENCY`.  It takes over `CONCURRENT_REQUESTS`, which is set to
+    `RLG_ADAPTIVE_MAX_CONCURRENCY` for the crawl.
+
+    Attributes:
+        max_concurrency (int): Hard ceiling of concurrent requests.
+        target_rate (float): Items per second at which the concurrency is no longer raised.
+        decisions (List[Dict[str, Any]]): The latest decisions of the controller.
+
+    """
+
+    def __init__(self, crawler: Crawler):
+        settings = crawler.settings
+        if not settings.getbool('RLG_ADAPTIVE_CONCURRENCY'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_concurrency = settings.getint(
+            'RLG_ADAPTIVE_MAX_CONCURRENCY', settings.getint('CONCURRENT_REQUESTS')
+        )
+        self.target_rate = settings.getfloat('RLG_ADAPTIVE_TARGET_RATE') or None
+        self.window = settings.getint('RLG_ADAPTIVE_WINDOW', 10)
+        self.error_rate = settings.getfloat('RLG_ADAPTIVE_ERROR_RATE', 0.1)
+        self.latency_factor = settings.getfloat('RLG_ADAPTIVE_LATENCY_FACTOR', 2.0)
+        self.min_delay = settings.getfloat('DOWNLOAD_DELAY')
+        self.max_delay = settings.getfloat('RLG_ADAPTIVE_MAX_DELAY', 60.0)
+        self.decisions = []  # type: List[Dict[str, Any]]
+        self._states = {}  # type: Dict[str, _SlotState]
+        self._scraped = deque()  # type: deque
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.item_scraped, signal=signals.item_scraped)
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'AdaptiveConcurrencyMiddleware':
+        return cls(crawler)
+
+    # Required signal arguments... pylint: disable=unused-argument
+    def spider_opened(self, spider: Spider):
+        """Let the controller raise the concurrency of a slot up to the ceiling."""
+        self.crawler.engine.downloader.total_concurrency = self.max_concurrency
+        self.stats.set_value(THROTTLE + 'decisions', self.decisions)
+        self.stats.set_value(THROTTLE + 'max_concurrency', self.max_concurrency)
+
+    def item_scraped(self, item: Any):
+        """Remember when items were scraped to measure the scrape rate."""
+        self._scraped.append(time.time())
+
+    def scrape_rate(self, now: float) -> float:
+        """Items scraped per second over the last `RATE_PERIOD` seconds."""
+        while self._scraped and self._scraped[0] < now - RATE_PERIOD:
+            self._scraped.popleft()
+        return len(self._scraped) / RATE_PERIOD
+
+    def process_response(self, request: Request, response: Response,
+                         spider: Spider) -> Response:
+        if 'cached' in response.flags:
+            return response
+        key, slot = self._slot(request)
+        if slot is None:
+            return response
+        state = self._state(key, slot)
+        if response.status in BACKOFF_STATUSES:
+            self._back_off(key, slot, state, response)
+        else:
+            self._observe(
+                key, slot, state, request.meta.get('download_latency'), response.status >= 500
+            )
+        return response
+
+    def process_exception(self, request: Request, exception: Exception, spider: Spider):
+        key, slot = self._slot(request)
+        if slot is not None:
+            self._observe(key, slot, self._state(key, slot), None, True)
+
+    def _slot(self, request: Request) -> Tuple[Optional[str], Any]:
+        key = request.meta.get('download_slot')
+        engine = self.crawler.engine
+        if key is None or engine is None:
+            return None, None
+        return key, engine.downloader.slots.get(key)
+
+    def _state(self, key: str, slot: Any) -> _SlotState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _SlotState(slot.delay)
+        return state
+
+    def _observe(self, key: str, slot: Any, state: _SlotState, latency: Optional[float],
+                 error: bool):
+        """Record a response or failure of a slot, adjusting the slot once the window is full."""
+        if state.paused_until is not None and time.time() >= state.paused_until:
+            state.paused_until = None
+            state.reset()
+            self._decide(key, slot, 'resume', slot.concurrency, state.delay, 'pause over')
+        state.responses += 1
+        state.errors += error
+        if latency is not None:
+            state.latencies.append(latency)
+        if state.responses >= self.window:
+            self._adjust(key, slot, state)
+
+    def _back_off(self, key: str, slot: Any, state: _SlotState, response: Response):
+        """Halve the concurrency and pause the slot for as long as the site asks."""
+        now = time.time()
+        retry_after = parse_retry_after(response.headers.get('Retry-After'), now)
+        pause = min(self.max_delay, DEFAULT_BACKOFF if retry_after is None else retry_after)
+        state.paused_until = max(state.paused_until or now, now + pause)
+        state.delay = min(self.max_delay, max(state.delay * 2, MIN_STEP_DELAY))
+        state.reset()
+        self._decide(
+            key, slot, 'backoff', max(1, slot.concurrency // 2), max(pause, state.delay),
+            'HTTP %d, retry after %.1fs' % (response.status, pause)
+        )
+
+    def _adjust(self, key: str, slot: Any, state: _SlotState):
+        """Evaluate a full window of responses of a slot."""
+        errors, responses = state.errors, state.responses
+        latency = statistics.median(state.latencies) if state.latencies else None
+        state.reset()
+        if state.paused_until is not None:
+            return
+        if latency is not None:
+            state.baseline = latency if state.baseline is None else min(state.baseline, latency)
+
+        if errors > self.error_rate * responses:
+            reason = '%d of %d requests failed' % (errors, responses)
+        elif latency is not None and latency > state.baseline * self.latency_factor:
+            reason = 'median latency %.2fs, %.2fs at best' % (latency, state.baseline)
+        else:
+            reason = None
+        if reason is not None:
+            if slot.concurrency > 1:
+                self._decide(key, slot, 'decrease', slot.concurrency // 2, state.delay, reason)
+            else:
+                state.delay = min(self.max_delay, max(state.delay * 2, MIN_STEP_DELAY))
+                self._decide(key, slot, 'decrease', 1, state.delay, reason)
+            return
+
+        if state.delay > self.min_delay:
+            state.delay = state.delay / 2 if state.delay / 2 >= MIN_STEP_DELAY else self.min_delay
+            self._decide(key, slot, 'increase', slot.concurrency, state.delay, 'healthy')
+        elif self.target_rate is not None and self.scrape_rate(time.time()) >= self.target_rate:
+            self.stats.inc_value(THROTTLE + 'hold')
+        elif slot.concurrency < self.max_concurrency:
+            self._decide(key, slot, 'increase', slot.concurrency + 1, state.delay, 'healthy')
+
+    def _decide(self, key: str, slot: Any, action: str, concurrency: int, delay: float,
+                reason: str):
+        """Apply a decision to a slot and record it."""
+        slot.concurrency = concurrency
+        slot.delay = delay
+        self.stats.inc_value(THROTTLE + action)
+        self.stats.set_value(THROTTLE + 'concurrency', concurrency)
+        self.stats.set_value(THROTTLE + 'delay', delay)
+        self.stats.max_value(THROTTLE + 'peak_concurrency', concurrency)
+        self.decisions.append({
+            'time': time.time(),
+            'slot': key,
+            'action': action,
+            'concurrency': concurrency,
+            'delay': delay,
+            'reason': reason
+        })
+        del self.decisions[:-MAX_DECISIONS]
@@ -0,0 +1,394 @@
+"""Pool of long-lived crawler processes.
+
+Starting a crawl with `SafeSpiderRunner` forks a process, imports Scrapy and Twisted, starts a
+reactor and tears everything down again.  The workers in this module keep their reactor running
+and accept crawl jobs over a pipe, so that the start-up cost, the DNS cache and the HTTP
+connection pool are shared by every job a worker runs.
+
+Example:
+    >>> from rlgpy.scraper.spiders import AchievementSpider
+    >>> from rlgpy.scraper.workers import CrawlerWorkerPool
+    >>> with CrawlerWorkerPool(size=2) as pool:
+    >>>     achievements = pool.run(AchievementSpider, {})
+
+"""
+
+import os
+import time
+import logging
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import Process, Pipe, Queue
+from multiprocessing.connection import Connection
+from queue import Empty
+from typing import List, Dict, Any, Optional
+
+from scrapy.spiders import Spider
+
+from rlgpy.scraper.runners import SafeSpiderRunner
+from rlgpy.scraper.handlers import SHARED_POOL_SETTINGS
+from rlgpy.scraper.metrics import CrawlResult, instrument
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds between checks for dead workers and jobs past their timeout.
+CHECK_INTERVAL = 1.0
+
+
+def _worker_main(worker_id: int, commands: Connection, events: Queue, dns_cache_size: int):
+    """Entry point of a worker process.
+
+    The reactor runs in the main thread of the worker while a listener thread receives commands
+    from the pool and hands the jobs over to the reactor.
+
+    Args:
+        worker_id: Index of the worker within the pool.
+        commands: Receiving end of the command pipe.
+        events: Queue used to report job progress back to the pool.
+        dns_cache_size: Number of DNS entries to keep cached for the lifetime of the worker.
+
+    """
+    # Imported here so that the pool itself does not need a reactor.
+    from twisted.internet import reactor
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.resolver import CachingThreadedResolver
+
+    reactor.installResolver(CachingThreadedResolver(reactor, dns_cache_size, 60.0))
+
+    def start_job(job_id: int, spider: Spider, settings: Dict[str, Any],
+                  spider_kwargs: Dict[str, Any]):
+        def send(message: tuple):
+            events.put((message[0], worker_id, job_id, message[1]))
+
+        events.put(('started', worker_id, job_id, None))
+        try:
+            runner = CrawlerRunner(instrument(dict(settings, **SHARED_POOL_SETTINGS)))
+            SafeSpiderRunner._start_crawl(runner, spider, settings, spider_kwargs, send)
+        except Exception as exc:  # pylint: disable=broad-except
+            # The crawl could not be started, e.g. because of invalid settings.
+            send(('error', repr(exc)))
+
+    def listen():
+        while True:
+            try:
+                command = commands.recv()
+            except EOFError:
+                command = ('stop',)
+            if command[0] == 'stop':
+                reactor.callFromThread(reactor.stop)
+                return
+            reactor.callFromThread(start_job, *command[1:])
+
+    threading.Thread(target=listen, daemon=True).start()
+    events.put(('ready', worker_id, None, os.getpid()))
+    reactor.run(installSignalHandlers=False)
+
+
+class _Job:
+    """A crawl job waiting for or running on a worker."""
+
+    def __init__(self, job_id: int, spider: Spider, settings: Dict[str, Any],
+                 spider_kwargs: Dict[str, Any], delete_file: bool,
+                 timeout: Optional[float] = None):
+        self.job_id = job_id
+        self.spider = spider
+        self.settings = settings
+        self.spider_kwargs = spider_kwargs
+        self.delete_file = delete_file
+        self.results = CrawlResult()
+        self.future = Future()
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+
+class _Worker:
+    """Pool-side handle of a worker process."""
+
+    def __init__(self, worker_id: int, events: Queue, dns_cache_size: int):
+        self.worker_id = worker_id
+        child_commands, self.commands = Pipe(duplex=False)
+        self.process = Process(
+            target=_worker_main,
+            args=(worker_id, child_commands, events, dns_cache_size,),
+            daemon=True
+        )
+        self.process.start()
+        child_commands.close()
+        self.job = None
+        self.jobs_done = 0
+        self.started_at = time.time()
+
+    def send(self, job: _Job):
+        """Hand a job to the worker."""
+        self.job = job
+        self.commands.send(('job', job.job_id, job.spider, job.settings, job.spider_kwargs))
+
+    def stop(self, timeout: float):
+        """Ask the worker to stop, terminating it if it does not exit in time."""
+        try:
+            self.commands.send(('stop',))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning('Terminating unresponsive worker %d' % self.worker_id)
+            self.process.terminate()
+            self.process.join()
+        self.commands.close()
+
+
+class CrawlerWorkerPool:
+    """Runs crawl jobs on a fixed number of warm worker processes.
+
+    Each worker runs one job at a time; jobs submitted while every worker is busy wait in a FIFO
+    queue.  Workers which die are replaced and their running job fails.  Jobs which do not
+    finish within their timeout fail, and the worker running such a job is replaced.
+
+    Attributes:
+        size (int): Number of worker processes.
+        dns_cache_size (int): Number of DNS entries each worker keeps cached.
+
+    """
+
+    def __init__(self, size: Optional[int] = None, dns_cache_size: int = 10000):
+        """Initialize the pool, the workers are spawned by `start`.
+
+        Args:
+            size: Number of worker processes, defaults to the number of CPUs.
+            dns_cache_size: Number of DNS entries each worker keeps cached.
+
+        """
+        self.size = size or os.cpu_count() or 1
+        self.dns_cache_size = dns_cache_size
+        self._events = Queue()
+        self._workers = {}
+        self._pending = deque()
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._running = False
+
+    def __enter__(self) -> 'CrawlerWorkerPool':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def start(self):
+        """Spawn the worker processes."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for worker_id in range(self.size):
+                self._workers[worker_id] = _Worker(worker_id, self._events, self.dns_cache_size)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+        logger.info('Started crawler worker pool with %d workers' % self.size)
+
+    def submit(self, spider: Spider, settings: Dict[str, Any], delete_file: bool = True,
+               spider_kwargs: Optional[Dict[str, Any]] = None,
+               timeout: Optional[float] = None) -> Future:
+        """Queue a crawl job.
+
+        Args:
+            spider: Spider to run.
+            settings: Spider settings.  Include `FEED_URI` to export the results to a file.
+            delete_file: Delete the feed file after getting the results.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
+            timeout: Seconds after which the job fails with a `TimeoutError`, counted from now
+                and checked every `CHECK_INTERVAL` seconds.  No limit when `None`.
+
+        Returns:
+            A future which resolves to the list of json data, with the metrics of the crawl as
+            its `metrics`.
+
+        """
+        job = _Job(next(self._job_ids), spider, settings, spider_kwargs or {}, delete_file,
+                   timeout)
+        with self._lock:
+            if not self._running:
+                raise RuntimeError('Worker pool is not running.')
+            self._pending.append(job)
+            self._dispatch()
+        return job.future
+
+    def run(self, spider: Spider, settings: Dict[str, Any], delete_file: bool = True,
+            spider_kwargs: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> CrawlResult:
+        """Run a crawl job on the pool and wait for its results.
+
+        Args:
+            spider: Spider to run.
+            settings: Spider settings.  Include `FEED_URI` to export the results to a file.
+            delete_file: Delete the feed file after getting the results.
+            spider_kwargs: Keyword arguments passed to the spider constructor.
+            timeout: Seconds after which the job fails, see `submit`.
+
+        Returns:
+            A list of the json data, with the metrics of the crawl as its `metrics`.
+
+        Raises:
+            concurrent.futures.TimeoutError: The job did not finish within `timeout` seconds.
+
+        """
+        return self.submit(spider, settings, delete_file, spider_kwargs, timeout).result()
+
+    def health(self) -> Dict[str, Any]:
+        """Report the state of the pool.
+
+        Returns:
+            A dictionary with the number of queued jobs and the state of every worker.
+
+        """
+        with self._lock:
+            workers = [
+                {
+                    'worker_id': worker.worker_id,
+                    'pid': worker.process.pid,
+                    'alive': worker.process.is_alive(),
+                    'busy': worker.job is not None,
+                    'jobs_done': worker.jobs_done,
+                    'uptime': time.time() - worker.started_at
+                }
+                for worker in self._workers.values()
+            ]
+            return {
+                'running': self._running,
+                'pending_jobs': len(self._pending),
+                'workers': workers
+            }
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop all workers and fail the jobs that have not finished.
+
+        Args:
+            timeout: Seconds to wait for each worker to exit before terminating it.
+
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            workers = list(self._workers.values())
+            jobs = list(self._pending) + [worker.job for worker in workers if worker.job]
+            self._pending.clear()
+            self._workers.clear()
+        for worker in workers:
+            worker.stop(timeout)
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(RuntimeError('Worker pool was shut down.'))
+        self._collector.join(timeout)
+        logger.info('Crawler worker pool shut down')
+
+    def _dispatch(self):
+        """Send queued jobs to idle workers, the lock must be held."""
+        for worker in self._workers.values():
+            if not self._pending:
+                return
+            if worker.job is None and worker.process.is_alive():
+                worker.send(self._pending.popleft())
+
+    def _collect(self):
+        """Handle worker events and check the workers until the pool is shut down.
+
+        The workers are checked on a timer rather than when no events arrive, so that busy
+        workers can not keep a dead worker from being noticed.
+
+        """
+        next_check = time.monotonic() + CHECK_INTERVAL
+        while self._running:
+            try:
+                event, worker_id, job_id, payload = self._events.get(
+                    timeout=max(next_check - time.monotonic(), 0.0)
+                )
+            except Empty:
+                pass
+            else:
+                if event == 'items':
+                    self._receive_items(worker_id, job_id, payload)
+                elif event in ('done', 'error'):
+                    self._finish(worker_id, job_id, event, payload)
+            if time.monotonic() >= next_check:
+                self._expire_jobs()
+                self._replace_dead_workers()
+                next_check = time.monotonic() + CHECK_INTERVAL
+
+    def _receive_items(self, worker_id: int, job_id: int, items: List[Dict[str, Any]]):
+        """Add a batch of items to the results of a running job."""
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is not None and worker.job is not None and worker.job.job_id == job_id:
+                worker.job.results.extend(items)
+
+    def _finish(self, worker_id: int, job_id: int, event: str, payload: Any):
+        """Resolve the future of a finished job and give the worker its next job."""
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is None or worker.job is None or worker.job.job_id != job_id:
+                return
+            job, worker.job = worker.job, None
+            worker.jobs_done += 1
+            self._dispatch()
+
+        if event == 'error':
+            job.future.set_exception(RuntimeError('Crawl failed: %s' % payload))
+            return
+        job.results.metrics = payload
+        if 'FEED_URI' not in job.settings:
+            job.future.set_result(job.results)
+            return
+        try:
+            job.results[:] = SafeSpiderRunner._get_results(
+                job.settings['FEED_URI'], job.delete_file,
+                job.settings.get('FEED_FORMAT', 'jsonlines')
+            )
+            job.future.set_result(job.results)
+        except Exception as exc:  # pylint: disable=broad-except
+            job.future.set_exception(exc)
+
+    def _expire_jobs(self):
+        """Fail the jobs past their timeout, terminating the workers running them."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for job in list(self._pending):
+                if job.deadline is not None and now >= job.deadline:
+                    self._pending.remove(job)
+                    expired.append(job)
+            for worker in self._workers.values():
+                job = worker.job
+                if job is None or job.deadline is None or now < job.deadline:
+                    continue
+                logger.warning('Terminating worker %d, job %d timed out' % (
+                    worker.worker_id, job.job_id
+                ))
+                worker.job = None
+                worker.process.terminate()
+                worker.process.join()
+                expired.append(job)
+        for job in expired:
+            job.future.set_exception(FutureTimeoutError('Crawl did not finish in time.'))
+
+    def _replace_dead_workers(self):
+        """Respawn workers whose process exited and fail the job they were running."""
+        failed = []
+        with self._lock:
+            for worker_id, worker in list(self._workers.items()):
+                if worker.process.is_alive():
+                    continue
+                logger.warning('Worker %d exited with code %s' % (
+                    worker_id, worker.process.exitcode
+                ))
+                if worker.job is not None:
+                    failed.append(worker.job)
+                worker.commands.close()
+                self._workers[worker_id] = _Worker(worker_id, self._events, self.dns_cache_size)
+            self._dispatch()
+        for job in failed:
+            job.future.set_exception(RuntimeError('Worker died while running the crawl.'))
@@ -0,0 +1,274 @@
+"""SQLite storage of trades, items and achievements.
+
+A `TradeStore` keeps the trade history and the item and achievement catalogs in one SQLite
+database in WAL mode, so that it can be read while a crawl is writing to it.  Records are upserted
+by their key in batched transactions.  A trade is keyed by its `data_id` alone, so a trade found
+through several start URLs is stored once, with the `source_url` of the last crawl which found
+it.  Trades and their tradeable items are stored in separate tables, the tradeable items are
+indexed by item, paint, certification and platform to answer queries without crawling:
+
+    >>> store = TradeStore('rlg.db')
+    >>> store.upsert_trades(RocketLeagueGarage.get_trades(max_trades=1000))
+    >>> store.trades(data_id=1709, paint='Titanium White', side='have', platform='STEAM')
+    >>> store.item(1709)['name']
+
+    Passing `store_path` to the API calls, or setting `RLG_SQLITE_PATH` in the settings of a
+    crawl, writes the results to the store as they are scraped, see `RlSQLitePipeline`.
+
+"""
+
+import time
+import logging
+import sqlite3
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+
+# Fields stored for each kind of record, the first one being its key.
+TRADE_FIELDS = ('data_id', 'url', 'rlg_username', 'platform', 'source_url')
+TRADEABLE_FIELDS = ('data_id', 'count', 'certification', 'paint')
+ITEM_FIELDS = ('data_id', 'name', 'category', 'platform', 'rarity', 'dlcpack', 'img_url')
+ACHIEVEMENT_FIELDS = ('name', 'img_url', 'gamerscore', 'trophy_type', 'description')
+
+SIDES = ('have', 'want')
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    data_id TEXT PRIMARY KEY,
+    url TEXT,
+    rlg_username TEXT,
+    platform TEXT,
+    source_url TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tradeable_items (
+    trade_id TEXT NOT NULL REFERENCES trades (data_id) ON DELETE CASCADE,
+    side TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data_id INTEGER NOT NULL,
+    count INTEGER,
+    certification TEXT,
+    paint TEXT,
+    PRIMARY KEY (trade_id, side, position)
+);
+CREATE TABLE IF NOT EXISTS items (
+    data_id INTEGER PRIMARY KEY,
+    name TEXT,
+    category TEXT,
+    platform TEXT,
+    rarity TEXT,
+    dlcpack TEXT,
+    img_url TEXT
+);
+CREATE TABLE IF NOT EXISTS achievements (
+    name TEXT PRIMARY KEY,
+    img_url TEXT,
+    gamerscore INTEGER,
+    trophy_type TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS tradeable_items_item
+    ON tradeable_items (data_id, paint, certification);
+CREATE INDEX IF NOT EXISTS trades_platform ON trades (platform, updated_at);
+CREATE INDEX IF NOT EXISTS trades_updated ON trades (updated_at);
+"""
+
+
+def _insert(table: str, fields: Iterable[str]) -> str:
+    fields = list(fields)
+    return 'INSERT OR REPLACE INTO %s (%s) VALUES (%s)' % (
+        table, ', '.join(fields), ', '.join('?' * len(fields))
+    )
+
+
+class TradeStore:
+    """Trades, items and achievements in a SQLite database.
+
+    Attributes:
+        path (Path): The database file.
+
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """Open the database, creating its tables if needed.
+
+        Args:
+            path: The database file.
+            timeout: Seconds to wait for another connection to finish writing.
+
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=timeout)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> 'TradeStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+    def upsert_trades(self, trades: Iterable[Dict[str, Any]], at: Optional[float] = None) -> int:
+        """Insert or replace trades and their tradeable items in one transaction.
+
+        Trades without a `data_id` and tradeable items whose `data_id` failed to parse can not
+        be stored, they are skipped rather than failing the whole batch.
+
+        Args:
+            trades: Trades in JSON format.
+            at: Unix timestamp at which the trades were scraped, defaults to now.
+
+        Returns:
+            The number of trades written.
+
+        """
+        at = time.time() if at is None else at
+        trade_rows = []
+        item_rows = []
+        skipped_trades = skipped_items = 0
+        for trade in trades:
+            if not trade.get('data_id'):
+                skipped_trades += 1
+                continue
+            trade_rows.append([trade.get(field) for field in TRADE_FIELDS] + [at])
+            for side in SIDES:
+                for position, item in enumerate(trade.get(side) or []):
+                    if item.get('data_id') is None:
+                        skipped_items += 1
+                        continue
+                    item_rows.append([trade['data_id'], side, position] +
+                                     [item.get(field) for field in TRADEABLE_FIELDS])
+        if skipped_trades or skipped_items:
+            logger.warning('Skipped %d trades without an id and %d tradeable items without an id'
+                           % (skipped_trades, skipped_items))
+        with self._conn:
+            self._conn.executemany(
+                'DELETE FROM tradeable_items WHERE trade_id = ?', [row[:1] for row in trade_rows]
+            )
+            self._conn.executemany(_insert('trades', TRADE_FIELDS + ('updated_at',)), trade_rows)
+            self._conn.executemany(
+                _insert('tradeable_items', ('trade_id', 'side', 'position') + TRADEABLE_FIELDS),
+                item_rows
+            )
+        return len(trade_rows)
+
+    def upsert_items(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace catalog items in one transaction, returns the number written."""
+        return self._upsert('items', ITEM_FIELDS, items)
+
+    def upsert_achievements(self, achievements: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace achievements in one transaction, returns the number written."""
+        return self._upsert('achievements', ACHIEVEMENT_FIELDS, achievements)
+
+    def _upsert(self, table: str, fields: tuple, records: Iterable[Dict[str, Any]]) -> int:
+        rows = [[record.get(field) for field in fields] for record in records]
+        with self._conn:
+            self._conn.executemany(_insert(table, fields), rows)
+        return len(rows)
+
+    def trades(self, data_id: Optional[int] = None, side: Optional[str] = None,
+               paint: Optional[str] = None, certification: Optional[str] = None,
+               platform: Optional[str] = None, since: Optional[float] = None,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find stored trades, the most recently scraped first.
+
+        Args:
+            data_id: Only trades with this item.
+            side: Only trades with the item on this side, `have` or `want`.
+            paint: Only trades with an item of this paint, `''` for unpainted items.
+            certification: Only trades with an item of this certification.
+            platform: Only trades on this platform.
+            since: Only trades scraped at or after this Unix timestamp.
+            limit: Maximum number of trades returned.
+
+        Returns:
+            The trades in JSON format.
+
+        """
+        item_filters = [(column, value) for column, value in (
+            ('data_id', data_id), ('side', side), ('paint', paint),
+            ('certification', certification)
+        ) if value is not None]
+        conditions = []
+        params = []  # type: List[Any]
+        if item_filters:
+            conditions.append(
+                'data_id IN (SELECT trade_id FROM tradeable_items WHERE %s)' %
+                ' AND '.join('%s = ?' % column for column, _ in item_filters)
+            )
+            params.extend(value for _, value in item_filters)
+        if platform is not None:
+            conditions.append('platform = ?')
+            params.append(platform)
+        if since is not None:
+            conditions.append('updated_at >= ?')
+            params.append(since)
+        query = 'SELECT * FROM trades'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY updated_at DESC, rowid'
+        if limit is not None:
+            query += ' LIMIT %d' % limit
+        return self._with_items(self._conn.execute(query, params).fetchall())
+
+    def trade(self, data_id: str) -> Optional[Dict[str, Any]]:
+        """Return a stored trade in JSON format, `None` if it is not stored."""
+        rows = self._conn.execute('SELECT * FROM trades WHERE data_id = ?', (data_id,)).fetchall()
+        trades = self._with_items(rows)
+        return trades[0] if trades else None
+
+    def _with_items(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Convert trade rows to JSON format with their tradeable items."""
+        trades = {}
+        for row in rows:
+            trade = {field: row[field] for field in TRADE_FIELDS if row[field] is not None}
+            trade.update(have=[], want=[])
+            trades[row['data_id']] = trade
+        ids = list(trades)
+        # Stay below the default limit of 999 parameters per query.
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            items = self._conn.execute(
+                'SELECT * FROM tradeable_items WHERE trade_id IN (%s) '
+                'ORDER BY trade_id, side, position' % ', '.join('?' * len(chunk)), chunk
+            )
+            for item in items:
+                trades[item['trade_id']][item['side']].append(
+                    {field: item[field] for field in TRADEABLE_FIELDS if item[field] is not None}
+                )
+        return list(trades.values())
+
+    def items(self) -> List[Dict[str, Any]]:
+        """Return the stored catalog items in JSON format."""
+        return self._records('items', ITEM_FIELDS)
+
+    def item(self, data_id: int) -> Optional[Dict[str, Any]]:
+        """Return a stored catalog item in JSON format, `None` if it is not stored."""
+        items = self._records('items', ITEM_FIELDS, data_id)
+        return items[0] if items else None
+
+    def achievements(self) -> List[Dict[str, Any]]:
+        """Return the stored achievements in JSON format."""
+        return self._records('achievements', ACHIEVEMENT_FIELDS)
+
+    def _records(self, table: str, fields: tuple, key: Any = None) -> List[Dict[str, Any]]:
+        query = 'SELECT * FROM %s' % table
+        params = []  # type: List[Any]
+        if key is not None:
+            query += ' WHERE %s = ?' % fields[0]
+            params.append(key)
+        return [
+            {field: row[field] for field in fields if row[field] is not None}
+            for row in self._conn.execute(query + ' ORDER BY %s' % fields[0], params)
+        ]
@@ -0,0 +1,298 @@
+"""Compact columnar storage for large numbers of trades.
+
+A `TradeTable` keeps trades and their tradeable items in parallel typed arrays instead of nested
+dictionaries.  Strings which repeat, such as platforms, certifications and paints, are stored once
+and referenced by a small integer code, as are trade URLs, which differ only in the trade ID they
+end with.  Numeric trade IDs are stored as integers.  Item metadata is not copied into each
+tradeable item, it is looked up by `data_id` in the item catalog when a trade is converted back to
+a dictionary.
+
+Example:
+    >>> table = RocketLeagueGarage.get_trades(max_trades=100000, as_table=True)
+    >>> rows = table.select(platform='STEAM', data_id=1709, paint='Titanium White', side='have')
+    >>> trades = [table[row] for row in rows]
+
+"""
+
+import re
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+
+HAVE = 0
+WANT = 1
+SIDES = {'have': HAVE, 'want': WANT}
+
+# Code of a value which is missing.
+MISSING = 0
+
+# Trade IDs which are stored as integers, those which convert back to the same string and fit in
+# 64 bits.
+NUMERIC_ID = re.compile(r'(0|[1-9][0-9]{0,17})\Z')
+
+
+class Categories:
+    """Interns the distinct values of a column as integer codes.
+
+    Code 0 is reserved for a missing value.
+
+    """
+
+    def __init__(self):
+        self.values = [None]  # type: List[Any]
+        self._codes = {}  # type: Dict[Any, int]
+
+    def encode(self, value: Any) -> int:
+        """Return the code of a value, assigning a new code to an unseen value."""
+        if value is None:
+            return MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: Any) -> Optional[int]:
+        """Return the code of a value, `None` if it never occurred."""
+        if value is None:
+            return MISSING
+        return self._codes.get(value)
+
+    def __getitem__(self, code: int) -> Any:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values) - 1
+
+
+class TradeTable:
+    """Trades stored as columns.
+
+    Trade columns have one entry per trade, item columns one entry per tradeable item.  The items
+    of trade `i` are stored in the item rows `item_start[i]` up to `item_start[i + 1]`, the items
+    the author has first.
+
+    Trade IDs of digits are stored in `data_id`, other IDs in `text_data_id` by row with `-1` in
+    `data_id`.  The URL of a trade is stored as the code of its `(prefix, ends_with_id)` category,
+    the URL being the prefix followed by the trade ID when `ends_with_id` is set.
+
+    Attributes:
+        catalog: Item metadata looked up by `data_id` when converting to dictionaries, any object
+            with a `get(data_id)` method such as an `ItemCatalog`.  `None` to leave trades as
+            they were scraped.
+        categories (Dict[str, Categories]): The values of the categorical columns.
+
+    """
+
+    TRADE_CATEGORIES = ('platform', 'rlg_username', 'source_url', 'url')
+    ITEM_CATEGORIES = ('certification', 'paint', 'rarity')
+
+    def __init__(self, catalog: Any = None):
+        self.catalog = catalog
+        self.categories = {
+            name: Categories() for name in self.TRADE_CATEGORIES + self.ITEM_CATEGORIES
+        }
+        # Trade columns.
+        self.data_id = array('q')
+        self.text_data_id = {}  # type: Dict[int, str]
+        self.url = array('I')
+        self.platform = array('H')
+        self.rlg_username = array('I')
+        self.source_url = array('H')
+        self.item_start = array('I', [0])
+        # Item columns, `-1` marks a missing number.
+        self.item_data_id = array('i')
+        self.count = array('i')
+        self.certification = array('H')
+        self.paint = array('H')
+        self.rarity = array('H')
+        self.side = array('B')
+        self.trade = array('I')
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[Dict[str, Any]], catalog: Any = None) -> 'TradeTable':
+        """Build a table from trades in JSON format, consuming them one at a time.
+
+        Args:
+            trades: Trades as returned by the trade spider, not enriched.
+            catalog: Item metadata referenced by the table.
+
+        Returns:
+            The table.
+
+        """
+        table = cls(catalog)
+        table.extend(trades)
+        return table
+
+    def append(self, trade: Dict[str, Any]):
+        """Add a trade in JSON format."""
+        row = len(self.data_id)
+        categories = self.categories
+        data_id = trade.get('data_id')
+        if data_id is not None and NUMERIC_ID.match(data_id):
+            self.data_id.append(int(data_id))
+        else:
+            self.data_id.append(-1)
+            if data_id is not None:
+                self.text_data_id[row] = data_id
+        self.url.append(categories['url'].encode(self._url_category(trade.get('url'), data_id)))
+        self.platform.append(categories['platform'].encode(trade.get('platform')))
+        self.rlg_username.append(categories['rlg_username'].encode(trade.get('rlg_username')))
+        self.source_url.append(categories['source_url'].encode(trade.get('source_url')))
+        for side, items in ((HAVE, trade.get('have', ())), (WANT, trade.get('want', ()))):
+            for item in items:
+                self._append_item(item, side, row)
+        self.item_start.append(len(self.item_data_id))
+
+    def extend(self, trades: Iterable[Dict[str, Any]]):
+        """Add several trades in JSON format."""
+        for trade in trades:
+            self.append(trade)
+
+    def _append_item(self, item: Dict[str, Any], side: int, row: int):
+        categories = self.categories
+        data_id = item.get('data_id', -1)
+        metadata = self._metadata(data_id)
+        self.item_data_id.append(data_id)
+        self.count.append(item.get('count', -1))
+        self.certification.append(categories['certification'].encode(item.get('certification')))
+        self.paint.append(categories['paint'].encode(item.get('paint')))
+        self.rarity.append(categories['rarity'].encode(metadata and metadata.get('rarity')))
+        self.side.append(side)
+        self.trade.append(row)
+
+    @staticmethod
+    def _url_category(url: Optional[str], data_id: Optional[str]) -> Optional[tuple]:
+        if url is None:
+            return None
+        if data_id and url.endswith(data_id):
+            return url[:-len(data_id)], True
+        return url, False
+
+    def _trade_data_id(self, row: int) -> Optional[str]:
+        if self.data_id[row] < 0:
+            return self.text_data_id.get(row)
+        return str(self.data_id[row])
+
+    def _url(self, row: int) -> Optional[str]:
+        category = self.categories['url'][self.url[row]]
+        if category is None:
+            return None
+        url, ends_with_id = category
+        return url + self._trade_data_id(row) if ends_with_id else url
+
+    def _metadata(self, data_id: int) -> Optional[Dict[str, Any]]:
+        if self.catalog is None or data_id < 0:
+            return None
+        return self.catalog.get(data_id)
+
+    def __len__(self) -> int:
+        return len(self.data_id)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        """Convert a single trade to JSON format, including the metadata of its items."""
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError('Trade table index out of range.')
+        categories = self.categories
+        trade = {}
+        for field, value in (
+                ('data_id', self._trade_data_id(row)),
+                ('url', self._url(row)),
+                ('platform', categories['platform'][self.platform[row]]),
+                ('rlg_username', categories['rlg_username'][self.rlg_username[row]]),
+                ('source_url', categories['source_url'][self.source_url[row]])):
+            if value is not None:
+                trade[field] = value
+        for item_row in range(self.item_start[row], self.item_start[row + 1]):
+            side = 'have' if self.side[item_row] == HAVE else 'want'
+            trade.setdefault(side, []).append(self._item(item_row))
+        return trade
+
+    def _item(self, item_row: int) -> Dict[str, Any]:
+        item = {}
+        if self.item_data_id[item_row] >= 0:
+            item['data_id'] = self.item_data_id[item_row]
+        if self.count[item_row] >= 0:
+            item['count'] = self.count[item_row]
+        for field in ('certification', 'paint'):
+            value = self.categories[field][getattr(self, field)[item_row]]
+            if value is not None:
+                item[field] = value
+        metadata = self._metadata(self.item_data_id[item_row])
+        if metadata:
+            for field, value in metadata.items():
+                item.setdefault(field, value)
+        return item
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert every trade to JSON format, the same as `get_trades` returns them."""
+        return list(self)
+
+    def select(self, platform: Optional[str] = None, data_id: Optional[int] = None,
+               certification: Optional[str] = None, paint: Optional[str] = None,
+               rarity: Optional[str] = None, side: Optional[str] = None) -> List[int]:
+        """Find trades by scanning the columns.
+
+        Args:
+            platform: Platform of the trade.
+            data_id: The item which is traded.
+            certification: Certification of the traded item.
+            paint: Paint of the traded item.
+            rarity: Rarity of the traded item.
+            side: Whether the author has (`'have'`) or wants (`'want'`) the item.
+
+        Returns:
+            The rows of the trades which match every given condition, with all of the item
+            conditions met by a single tradeable item.
+
+        """
+        if platform is not None:
+            platform_code = self.categories['platform'].code(platform)
+            if platform_code is None:
+                return []
+        item_conditions = []
+        for column, value in (('certification', certification), ('paint', paint),
+                              ('rarity', rarity)):
+            if value is not None:
+                code = self.categories[column].code(value)
+                if code is None:
+                    return []
+                item_conditions.append((getattr(self, column), code))
+        if data_id is not None:
+            item_conditions.append((self.item_data_id, data_id))
+        if side is not None:
+            item_conditions.append((self.side, SIDES[side]))
+
+        if item_conditions:
+            rows = self._scan_items(item_conditions)
+        else:
+            rows = range(len(self))
+        if platform is None:
+            return list(rows)
+        return [row for row in rows if self.platform[row] == platform_code]
+
+    def _scan_items(self, conditions: List[tuple]) -> List[int]:
+        """Rows of the trades with an item matching every `(column, value)` condition."""
+        (first_column, first_value), others = conditions[0], conditions[1:]
+        rows = set()  # type: Set[int]
+        for item_row, value in enumerate(first_column):
+            if value == first_value and all(column[item_row] == expected
+                                            for column, expected in others):
+                rows.add(self.trade[item_row])
+        return sorted(rows)
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns in bytes, not counting the strings they reference."""
+        columns = [
+            self.data_id, self.url, self.platform, self.rlg_username, self.source_url,
+            self.item_start, self.item_data_id, self.count, self.certification, self.paint,
+            self.rarity, self.side, self.trade
+        ]
+        return sum(column.itemsize * len(column) for column in columns)
@@ -1,10 +1,11 @@
 """Test the integrity of the spider data being retrieved."""
 
+import asyncio
 import logging
 
 import pytest
 
-from rlgpy.api import RocketLeagueGarage
+from rlgpy.api import RocketLeagueGarage, AsyncRocketLeagueGarage
 
 
 logger = logging.getLogger(__name__)
@@ -26,3 +27,59 @@ def test_trades_not_empty():
 def test_achievements():
     achievements = RocketLeagueGarage.get_achievements()
     assert len(achievements) > 0
+
+
+@pytest.mark.integration
+def test_iter_trades_stops_early():
+    trades = RocketLeagueGarage.iter_trades(max_trades=1000)
+    first = next(trades)
+    trades.close()
+    assert 'have' in first and 'want' in first
+
+
+@pytest.mark.integration
+def test_async_calls_run_concurrently():
+    loop = asyncio.new_event_loop()
+    try:
+        items, achievements = loop.run_until_complete(asyncio.gather(
+            AsyncRocketLeagueGarage.get_items(),
+            AsyncRocketLeagueGarage.get_achievements()
+        ))
+    finally:
+        loop.close()
+    assert len(items) > 0
+    assert len(achievements) > 0
+
+
+@pytest.mark.integration
+def test_trades_many_tagged_by_source():
+    urls = [
+        'https://rocket-league.com/trading?filterItem=1709&filterCertification=0&filterPaint=0&filterPlatform=0&filterSearchType=1',
+        'https://rocket-league.com/trading?filterItem=773&filterCertification=0&filterPaint=0&filterPlatform=0&filterSearchType=1'
+    ]
+    trades = RocketLeagueGarage.get_trades_many(urls, max_trades_per_url=5)
+    assert {trade['source_url'] for trade in trades} <= set(urls)
+    for url in urls:
+        assert sum(trade['source_url'] == url for trade in trades) <= 5
+
+
+@pytest.mark.integration
+def test_trades_as_table():
+    table = RocketLeagueGarage.get_trades(max_trades=20, as_table=True)
+    assert len(table) > 0
+    assert 'have' in table[0] or 'want' in table[0]
+
+
+@pytest.mark.integration
+def test_get_all_enriches_trades_with_items_of_the_run():
+    results = RocketLeagueGarage.get_all(max_trades=20)
+    assert set(results) == {'items', 'trades', 'achievements'}
+    assert all(len(data) > 0 for data in results.values())
+    names = {item['data_id']: item['name'] for item in results['items']}
+    item = (results['trades'][0].get('have') or results['trades'][0]['want'])[0]
+    assert item['name'] == names[item['data_id']]
+
+
+def test_get_all_unknown_data():
+    with pytest.raises(ValueError):
+        RocketLeagueGarage.get_all(include=['items', 'prices'])
@@ -0,0 +1,100 @@
+"""Test the item metadata catalog."""
+
+import pickle
+
+import pytest
+
+from rlgpy.catalog import ItemCatalog, expand
+
+
+ITEMS = [
+    {'data_id': 1, 'name': 'Octane', 'category': 'Bodies', 'platform': 'All', 'rarity': 'Import'},
+    {'data_id': 2, 'name': 'Zomba', 'category': 'Wheels', 'platform': 'All', 'rarity': 'Exotic'}
+]
+
+
+class CountingLoader:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(item) for item in ITEMS]
+
+
+def test_catalog_crawls_once_and_enriches(tmp_path):
+    loader = CountingLoader()
+    catalog = ItemCatalog(path=tmp_path / 'catalog.json', loader=loader)
+    trade = {'have': [{'data_id': 1, 'count': 1}], 'want': [{'data_id': 3, 'count': 1}]}
+    catalog.enrich(trade)
+    catalog.enrich(trade)
+    assert loader.calls == 1
+    assert trade['have'][0]['name'] == 'Octane'
+    assert 'name' not in trade['want'][0]
+
+
+def test_catalog_cold_start_from_disk(tmp_path):
+    path = tmp_path / 'catalog.json'
+    ItemCatalog(path=path, loader=CountingLoader()).refresh()
+    loader = CountingLoader()
+    catalog = ItemCatalog(path=path, loader=loader)
+    assert catalog.get(2)['name'] == 'Zomba'
+    assert loader.calls == 0
+
+
+@pytest.mark.parametrize(argnames='content', argvalues=[
+    '{"items": []}', '{"crawled_at": 1}', '[]', '{"items": [{"name": "x"}], "crawled_at": 1}'
+])
+def test_catalog_ignores_malformed_file(tmp_path, content):
+    path = tmp_path / 'catalog.json'
+    path.write_text(content)
+    loader = CountingLoader()
+    catalog = ItemCatalog(path=path, loader=loader)
+    assert not catalog.load()
+    trade = {'have': [{'count': 1}, {'data_id': 1}]}
+    catalog.enrich(trade)
+    assert loader.calls == 1
+    assert trade['have'] == [{'count': 1}, dict(ITEMS[0])]
+
+
+def test_catalog_refreshes_when_stale(tmp_path):
+    loader = CountingLoader()
+    catalog = ItemCatalog(ttl=0, path=None, loader=loader)
+    catalog.get(1)
+    catalog.get(1)
+    assert loader.calls == 2
+
+
+def test_catalog_enriches_trade_without_want():
+    catalog = ItemCatalog(path=None, loader=CountingLoader())
+    trade = {'have': [{'data_id': 2}]}
+    catalog.enrich(trade)
+    assert trade['have'][0]['name'] == 'Zomba'
+
+
+def test_catalog_enriches_by_reference(tmp_path):
+    catalog = ItemCatalog(path=tmp_path / 'catalog.json', loader=CountingLoader(), reference=True)
+    trades = [
+        {'platform': 'PS4', 'have': [{'data_id': 1, 'count': 1, 'platform': 'PS4'}],
+         'want': [{'data_id': 2, 'count': 1}]}
+        for _ in range(2)
+    ]
+    for trade in trades:
+        catalog.enrich(trade)
+    record = trades[0]['have'][0]['metadata']
+    assert record is trades[1]['have'][0]['metadata'] is catalog.record(1)
+    assert record.name == 'Octane'
+    with pytest.raises(AttributeError):
+        record.name = 'Dominus'
+    assert pickle.loads(pickle.dumps(record)) == record
+
+    expanded = expand(trades[0])
+    assert expanded['have'][0]['platform'] == 'PS4'  # The scraped field wins.
+    assert expanded['want'][0]['name'] == 'Zomba'
+    assert 'metadata' in trades[0]['have'][0]
+
+    copied = {'have': [{'data_id': 1, 'count': 1, 'platform': 'PS4'}],
+              'want': [{'data_id': 2, 'count': 1}]}
+    catalog.enrich(copied, reference=False)
+    assert expanded == dict(copied, platform='PS4')
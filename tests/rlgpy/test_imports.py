@@ -0,0 +1,45 @@
+"""Test that the entry points start without importing the crawler."""
+
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+from rlgpy.cli import build_parser
+
+
+ROOT = Path(__file__).parents[2]
+ENTRY_POINTS = [
+    'rlgpy', 'rlgpy.api', 'rlgpy.cli', 'rlgpy.scheduler', 'rlgpy.scraper.runners',
+    'rlgpy.scraper.spiders'
+]
+HEAVY = ('scrapy', 'twisted', 'lxml', 'parsel')
+IMPORT_BUDGET = 0.3
+
+
+def _import(module):
+    script = (
+        'import sys, json, time; start = time.perf_counter(); import %s; '
+        'print(json.dumps([time.perf_counter() - start, list(sys.modules)]))' % module
+    )
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=str(ROOT))
+    return json.loads(output.decode())
+
+
+def test_entry_points_do_not_import_scrapy():
+    for module in ENTRY_POINTS:
+        _, modules = _import(module)
+        heavy = [name for name in modules if name.split('.')[0] in HEAVY]
+        assert heavy == [], module
+
+
+def test_import_budget():
+    assert min(_import('rlgpy.api')[0] for _ in range(3)) < IMPORT_BUDGET
+
+
+def test_cli_arguments():
+    args = build_parser().parse_args(['trades', '--max-trades', '5', '--adaptive'])
+    assert (args.command, args.max_trades, args.concurrent, args.adaptive) == ('trades', 5, 5, True)
+    assert build_parser().parse_args(['items', '--no-cache']).no_cache
+    args = build_parser().parse_args(['schedule', 'feeds.json', '--keep', '3'])
+    assert (args.config, args.output, args.keep) == ('feeds.json', 'feeds', 3)
@@ -0,0 +1,56 @@
+"""Test the inverted trade index."""
+
+from rlgpy.index import TradeIndex
+
+
+TRADES = [
+    {
+        'data_id': 'abc', 'platform': 'STEAM',
+        'have': [{'data_id': 1, 'paint': 'Titanium White', 'certification': 'Striker'}],
+        'want': [{'data_id': 2}]
+    },
+    {
+        'data_id': 'def', 'platform': 'STEAM',
+        'have': [{'data_id': 1}, {'data_id': 3, 'paint': 'Titanium White'}]
+    },
+    {'data_id': 'ghi', 'platform': 'PS4', 'want': [{'data_id': 1, 'paint': 'Titanium White'}]}
+]
+
+
+def trade_ids(trades):
+    return [trade['data_id'] for trade in trades]
+
+
+def test_index_query():
+    index = TradeIndex.from_trades(TRADES)
+    assert trade_ids(index.query(data_id=1)) == ['abc', 'def', 'ghi']
+    assert trade_ids(index.query(data_id=1, paint='Titanium White')) == ['abc', 'ghi']
+    assert trade_ids(index.query(data_id=1, paint='Titanium White', side='have')) == ['abc']
+    assert trade_ids(index.query(data_id=1, certification='Striker', platform='PS4')) == []
+    assert trade_ids(index.query(platform='STEAM', side='want')) == ['abc']
+    assert trade_ids(index.query(paint='Crimson')) == []
+    assert trade_ids(index.query()) == ['abc', 'def', 'ghi']
+
+
+def test_index_incremental_add_and_remove():
+    index = TradeIndex.from_trades(TRADES[:1])
+    index.add(TRADES[2])
+    assert trade_ids(index.query(data_id=1)) == ['abc', 'ghi']
+    index.add({'data_id': 'abc', 'platform': 'STEAM', 'have': [{'data_id': 4}]})
+    assert len(index) == 2
+    assert trade_ids(index.query(data_id=1)) == ['ghi']
+    assert trade_ids(index.query(data_id=4)) == ['abc']
+    assert index.remove('ghi')
+    assert not index.remove('ghi')
+    assert index.query(data_id=1) == []
+    assert 'ghi' not in index and index.get('abc')['have'][0]['data_id'] == 4
+
+
+def test_index_evicts_stale_trades():
+    index = TradeIndex(max_age=60)
+    index.add(TRADES[0], added_at=0)
+    index.add(TRADES[1], added_at=100)
+    assert index.evict(now=120) == 1
+    assert trade_ids(index.query(data_id=1)) == ['def']
+    assert index.evict(max_age=0, now=120) == 1
+    assert len(index) == 0
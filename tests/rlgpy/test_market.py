@@ -0,0 +1,103 @@
+"""Test the streaming supply and demand counts."""
+
+import pytest
+from scrapy.utils.test import get_crawler
+
+from rlgpy.market import CountMinSketch, MarketAggregator, SpaceSaving
+from rlgpy.scraper.pipelines import RlMarketPipeline
+from rlgpy.scraper.spiders import TradeSpider
+
+
+def trade(platform, have, want):
+    return {
+        'platform': platform,
+        'have': [{'data_id': data_id, 'paint': paint, 'certification': ''}
+                 for data_id, paint in have],
+        'want': [{'data_id': data_id, 'paint': paint, 'certification': ''}
+                 for data_id, paint in want]
+    }
+
+
+TRADES = [
+    trade('STEAM', [(1709, 'Titanium White'), (2, '')], [(3, '')]),
+    trade('PS4', [(1709, '')], [(1709, 'Titanium White')]),
+    trade('STEAM', [(1709, 'Titanium White')], [(3, '')]),
+]
+
+
+def test_count_min_sketch_never_undercounts():
+    sketch = CountMinSketch(width=16, depth=3)
+    for key in range(200):
+        sketch.add(str(key), key % 5)
+    assert all(sketch.estimate(str(key)) >= key % 5 for key in range(200))
+    merged = CountMinSketch(width=16, depth=3)
+    merged.merge(sketch)
+    merged.merge(sketch)
+    assert merged.estimate('7') == 2 * sketch.estimate('7')
+    with pytest.raises(ValueError):
+        merged.merge(CountMinSketch(width=8, depth=3))
+
+
+def test_space_saving_keeps_heavy_hitters():
+    summary = SpaceSaving(capacity=10)
+    for key in [1] * 50 + [2] * 30 + list(range(100, 140)) + [3] * 20:
+        summary.add(key)
+    assert [key for key, _ in summary.top(2)] == [1, 2]
+    assert summary.top(1) == [(1, 50)]
+
+
+def test_breakdown_counts():
+    market = MarketAggregator()
+    market.update(TRADES, at=1000)
+    snapshot = market.snapshot(now=1000)
+    assert snapshot.trades == 3
+    assert snapshot.supply(1709) == 3
+    assert snapshot.supply(1709, paint='Titanium White') == 2
+    assert snapshot.supply(1709, paint='') == 1
+    assert snapshot.supply(1709, platform='PS4') == 1
+    assert snapshot.supply(1709, paint='Titanium White', platform='STEAM') == 2
+    assert snapshot.demand(1709) == 1
+    assert snapshot.demand(3, certification='') == 2
+    assert snapshot.top('have', 1) == [(1709, 3)]
+    with pytest.raises(ValueError):
+        snapshot.count(1709, 'sell')
+
+
+def test_time_windows():
+    market = MarketAggregator(bucket_seconds=60, buckets=3)
+    market.add(TRADES[0], at=0)
+    market.add(TRADES[1], at=90)
+    market.add(TRADES[2], at=150)
+    assert market.snapshot(window=30, now=170).supply(1709) == 1
+    assert market.snapshot(window=100, now=170).supply(1709) == 2
+    assert market.snapshot(now=170).supply(1709) == 3
+    market.add(TRADES[2], at=200)  # Drops the bucket of the first trade.
+    assert market.snapshot(now=200).supply(1709) == 3
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'market.bin')
+    market = MarketAggregator(bucket_seconds=60)
+    market.add(TRADES[0], at=0)
+    market.add(TRADES[1], at=90)
+    market.save(path)
+    loaded = MarketAggregator.load(path)
+    assert loaded.bucket_seconds == 60
+    snapshot = loaded.snapshot(now=90)
+    assert snapshot.supply(1709, paint='') == 1
+    assert snapshot.to_dict()['top'] == market.snapshot(now=90).to_dict()['top']
+    (tmp_path / 'other.bin').write_bytes(b'nope')
+    with pytest.raises(ValueError):
+        MarketAggregator.load(str(tmp_path / 'other.bin'))
+
+
+def test_pipeline_keeps_counts_between_crawls(tmp_path):
+    path = str(tmp_path / 'market.bin')
+    for _ in range(2):
+        pipeline = RlMarketPipeline.from_crawler(
+            get_crawler(TradeSpider, {'RLG_MARKET_PATH': path})
+        )
+        for item in TRADES:
+            assert pipeline.process_item(item, None) is item
+        pipeline.close_spider(None)
+    assert MarketAggregator.load(path).snapshot().supply(1709) == 6
@@ -0,0 +1,80 @@
+"""Test the trade matching engine."""
+
+from rlgpy.matching import TradeMatcher
+
+
+def trade(trade_id, have, want, platform='STEAM'):
+    return {
+        'data_id': trade_id,
+        'platform': platform,
+        'have': [dict(zip(('data_id', 'paint', 'certification', 'count'), item)) for item in have],
+        'want': [dict(zip(('data_id', 'paint', 'certification', 'count'), item)) for item in want]
+    }
+
+
+def test_direct_match():
+    matcher = TradeMatcher.from_trades([
+        trade('a', [(1, 'Titanium White', '', 1)], [(2, '', '', 1)]),
+        trade('b', [(2, 'Black', 'Striker', 2)], [(1, 'Titanium White', '', 1)]),
+        trade('c', [(2, '', '', 1)], [(1, 'Crimson', '', 1)]),
+        trade('d', [(2, '', '', 1)], [(1, '', '', 1)], platform='PS4')
+    ])
+    assert matcher.direct_matches() == [('a', 'b')]
+    assert matcher.matches_for('a') == ['b']
+    assert matcher.covers('a') == {'b'}
+    assert matcher.covered_by('a') == {'b', 'c'}
+
+
+def test_wants_need_count_certification_and_distinct_items():
+    matcher = TradeMatcher.from_trades([
+        trade('a', [(1, '', 'Striker', 1)], [(5, '', '', 1)]),
+        trade('b', [(5, '', '', 1)], [(1, '', 'Victor', 1)]),
+        trade('c', [(5, '', '', 1)], [(1, '', '', 2)]),
+        trade('d', [(5, '', '', 1)], [(1, '', '', 1), (1, '', '', 1)]),
+        trade('e', [(5, '', '', 1)], [(1, '', 'Striker', 1)])
+    ])
+    assert matcher.covers('a') == {'e'}
+    assert matcher.direct_matches() == [('a', 'e')]
+
+
+def test_cycles():
+    matcher = TradeMatcher.from_trades([
+        trade('a', [(1, '', '', 1)], [(3, '', '', 1)]),
+        trade('b', [(2, '', '', 1)], [(1, '', '', 1)]),
+        trade('c', [(3, '', '', 1)], [(2, '', '', 1)])
+    ])
+    assert matcher.direct_matches() == []
+    assert matcher.cycles() == [('a', 'b', 'c')]
+    assert matcher.cycles_for('b') == [('b', 'c', 'a')]
+
+
+def test_incremental_add_and_remove():
+    matcher = TradeMatcher.from_trades([trade('a', [(1, '', '', 1)], [(2, '', '', 1)])])
+    assert matcher.direct_matches() == []
+    matcher.add(trade('b', [(2, '', '', 1)], [(1, '', '', 1)]))
+    assert matcher.direct_matches() == [('a', 'b')]
+    matcher.add(trade('b', [(3, '', '', 1)], [(1, '', '', 1)]))
+    assert matcher.direct_matches() == []
+    assert matcher.covers('a') == {'b'}
+    assert matcher.remove('a')
+    assert matcher.covered_by('b') == set()
+    assert 'a' not in matcher and len(matcher) == 1
+
+
+def test_update_matches_add():
+    trades = [
+        trade('a', [(1, 'Black', '', 1), (2, '', '', 1)], [(3, '', '', 1)]),
+        trade('b', [(3, '', 'Striker', 1)], [(1, '', '', 1)]),
+        trade('c', [(3, '', '', 2)], [(1, 'Black', '', 1), (2, '', '', 1)]),
+        trade('d', [(1, '', '', 1)], [(3, '', '', 2)]),
+        trade('b', [(3, '', '', 1)], [(2, '', '', 1)])
+    ]
+    added = TradeMatcher()
+    for new in trades:
+        added.add(new)
+    updated = TradeMatcher.from_trades(trades[:2])
+    updated.update(trades[2:])
+    for trade_id in 'abcd':
+        assert updated.covers(trade_id) == added.covers(trade_id)
+        assert updated.covered_by(trade_id) == added.covered_by(trade_id)
+    assert updated.direct_matches() == added.direct_matches() == [('a', 'b'), ('a', 'c')]
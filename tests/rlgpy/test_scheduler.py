@@ -0,0 +1,159 @@
+"""Test the feed scheduler."""
+
+import multiprocessing
+
+import pytest
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+
+from rlgpy.scheduler import Feed, RollingJsonLinesSink, Scheduler
+from rlgpy.scraper.spiders import AchievementSpider, TradeSpider
+
+
+class FakeScheduler(Scheduler):
+    """Starts crawls which only finish when the test says so."""
+
+    def __init__(self, feeds, **kwargs):
+        self.received = []
+        self.crawls = {}
+        self.started = []
+        super().__init__(feeds, lambda feed, items: self.received.append((feed, items)),
+                         stats_interval=None, clock=Clock(), **kwargs)
+
+    def _crawl(self, feed, send, cancelled):
+        deferred = Deferred()
+        self.crawls[feed.name] = (send, deferred)
+        self.started.append(feed.name)
+        return deferred
+
+    def finish(self, name, items=()):
+        send, deferred = self.crawls.pop(name)
+        if items:
+            send(('items', list(items)))
+        send(('done', None))
+        deferred.callback(None)
+
+
+def test_skips_feeds_in_flight():
+    scheduler = FakeScheduler([Feed('a', TradeSpider, interval=10)])
+    scheduler.start()
+    scheduler._clock.advance(0)
+    assert scheduler.started == ['a']
+    scheduler._clock.advance(25)
+    assert scheduler.started == ['a']
+    scheduler.finish('a', [{'data_id': 1}])
+    scheduler._clock.advance(5)
+    assert scheduler.started == ['a', 'a']
+    stats = scheduler.stats()['feeds']['a']
+    assert (stats['runs'], stats['items'], stats['skipped']) == (1, 1, 2)
+    assert scheduler.received == [('a', [{'data_id': 1}])]
+
+
+def test_coalesces_queued_turns_by_priority():
+    scheduler = FakeScheduler([
+        Feed('low', TradeSpider, interval=10),
+        Feed('high', TradeSpider, interval=10, priority=1),
+        Feed('slow', TradeSpider, interval=100, priority=5)
+    ], max_concurrent=1)
+    scheduler.start()
+    scheduler._clock.advance(0)
+    assert scheduler.started == ['slow']
+    scheduler._clock.advance(20)
+    assert scheduler.queue_depth == 2
+    assert scheduler.stats()['feeds']['low']['queue_depth'] == 3
+    scheduler.finish('slow')
+    scheduler.finish('high')
+    assert scheduler.started == ['slow', 'high', 'low']
+    stats = scheduler.stats()['feeds']['low']
+    assert (stats['coalesced'], stats['queue_depth'], stats['lag']) == (2, 0, 20)
+
+
+def test_jitter_and_stop():
+    scheduler = FakeScheduler([Feed('a', TradeSpider, interval=10, jitter=5)])
+    scheduler.start()
+    scheduler._clock.advance(5)
+    assert scheduler.started == ['a']
+    stopped = scheduler.stop()
+    assert not stopped.called
+    scheduler.finish('a')
+    assert stopped.called
+    scheduler._clock.advance(100)
+    assert scheduler.started == ['a']
+
+
+def test_crawl_failing_to_start_frees_its_slot():
+    class BrokenScheduler(FakeScheduler):
+        def _crawl(self, feed, send, cancelled):
+            if feed.name == 'broken':
+                raise ValueError('Bad settings')
+            return super()._crawl(feed, send, cancelled)
+
+    scheduler = BrokenScheduler([Feed('broken', TradeSpider, interval=10, priority=1),
+                                 Feed('a', TradeSpider, interval=10)], max_concurrent=1)
+    scheduler.start()
+    scheduler._clock.advance(0)
+    assert scheduler.started == ['a']
+    scheduler.finish('a')
+    scheduler._clock.advance(10)
+    assert scheduler.started == ['a', 'a']
+    stats = scheduler.stats()['feeds']['broken']
+    assert (stats['runs'], stats['errors'], stats['skipped']) == (2, 2, 0)
+    assert stats['last_error'] == 'Bad settings'
+
+
+def test_from_config():
+    scheduler = Scheduler.from_config({
+        'max_concurrent': 2,
+        'feeds': [
+            {'type': 'trades', 'name': 'steam', 'url': 'https://rocket-league.com/trades/x',
+             'interval': 30, 'max_trades': 10, 'priority': 1, 'adaptive': True,
+             'target_rate': 50},
+            {'type': 'items', 'interval': 3600}
+        ]
+    }, print)
+    assert scheduler.max_concurrent == 2
+    assert scheduler.feeds['steam'].settings['CLOSESPIDER_ITEMCOUNT'] == 10
+    assert scheduler.feeds['steam'].settings['RLG_ADAPTIVE_TARGET_RATE'] == 50
+    assert scheduler.feeds['steam'].spider_kwargs == {
+        'start_urls': ['https://rocket-league.com/trades/x']
+    }
+    assert scheduler.feeds['items'].interval == 3600
+    with pytest.raises(ValueError):
+        Scheduler.from_config({'feeds': [{'type': 'users'}]}, print)
+    with pytest.raises(ValueError):
+        Scheduler.from_config({'feeds': [{'type': 'items', 'url': 'x'}]}, print)
+    with pytest.raises(ValueError):
+        Scheduler([Feed('a', TradeSpider), Feed('a', TradeSpider)], print)
+
+
+def test_rolling_sink(tmp_path):
+    sink = RollingJsonLinesSink(str(tmp_path), max_bytes=20, keep=2)
+    for data_id in range(4):
+        sink('a', [{'data_id': data_id}, {'data_id': data_id}])
+    sink('b', [{'data_id': 9}])
+    sink.close()
+    files = sink.files('a')
+    assert len(files) == 2
+    assert files[-1].read_text() == '{"data_id": 3}\n' * 2
+    assert len(sink.files('b')) == 1
+
+
+def _run_scheduler(directory, results):
+    scheduler = Scheduler(
+        [Feed('achievements', AchievementSpider, spider_kwargs={'start_urls': []}, interval=0.3)],
+        RollingJsonLinesSink(directory)
+    )
+    results.put(scheduler.run(duration=1.5))
+
+
+def test_runs_crawls_on_one_reactor(tmp_path):
+    """Ensure the scheduler crawls repeatedly in one process and stops after the duration."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_scheduler, args=(str(tmp_path), results))
+    process.start()
+    stats = results.get(timeout=30)
+    process.join()
+    assert process.exitcode == 0
+    feed = stats['feeds']['achievements']
+    assert feed['runs'] >= 3 and feed['errors'] == 0
+    assert stats['active'] == 0
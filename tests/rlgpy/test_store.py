@@ -0,0 +1,109 @@
+"""Test the SQLite store."""
+
+from types import SimpleNamespace
+
+from scrapy.utils.test import get_crawler
+
+from rlgpy.api import RocketLeagueGarage
+from rlgpy.store import TradeStore
+from rlgpy.scraper.items import RlAchievement, RlItem, RlTrade
+from rlgpy.scraper.pipelines import RlSQLitePipeline
+from rlgpy.scraper.spiders import TradeSpider
+
+
+def trade(data_id, platform, have, want):
+    return {
+        'data_id': data_id,
+        'url': '/trade/%s' % data_id,
+        'platform': platform,
+        'have': [{'data_id': item_id, 'count': 1, 'certification': '', 'paint': paint}
+                 for item_id, paint in have],
+        'want': [{'data_id': item_id, 'count': 1, 'certification': '', 'paint': paint}
+                 for item_id, paint in want]
+    }
+
+
+TRADES = [
+    trade('a', 'STEAM', [(1709, 'Titanium White'), (2, '')], [(3, '')]),
+    trade('b', 'PS4', [(1709, '')], [(1709, 'Titanium White')]),
+    trade('c', 'STEAM', [(3, '')], [(2, 'Crimson')]),
+]
+
+
+def test_upserts_and_queries_trades(tmp_path):
+    with TradeStore(str(tmp_path / 'rlg.db')) as store:
+        assert store.upsert_trades(TRADES[:2], at=100) == 2
+        assert store.upsert_trades(TRADES[1:], at=200) == 2
+        assert len(store.trades()) == 3
+        assert store.trade('a') == TRADES[0]
+        assert [t['data_id'] for t in store.trades(data_id=1709)] == ['b', 'a']
+        assert [t['data_id'] for t in store.trades(data_id=1709, side='have',
+                                                   paint='Titanium White')] == ['a']
+        assert [t['data_id'] for t in store.trades(platform='STEAM', since=150)] == ['c']
+        assert len(store.trades(limit=1)) == 1
+
+        store.upsert_trades([dict(TRADES[0], have=[], platform='XBOX')])
+        assert store.trade('a')['have'] == []
+        assert store.trades(paint='Titanium White', side='have') == []
+        assert store.trade('missing') is None
+
+
+def test_skips_records_without_id(tmp_path):
+    broken = trade('d', 'STEAM', [(None, ''), (4, '')], [])
+    with TradeStore(str(tmp_path / 'rlg.db')) as store:
+        assert store.upsert_trades([TRADES[0], broken, dict(TRADES[1], data_id=None)]) == 2
+        assert store.trade('d')['have'] == [{'data_id': 4, 'count': 1, 'certification': '',
+                                             'paint': ''}]
+        assert store.trade('a') == TRADES[0]
+
+
+def test_catalogs_are_keyed(tmp_path):
+    path = str(tmp_path / 'rlg.db')
+    with TradeStore(path) as store:
+        store.upsert_items([{'data_id': 1, 'name': 'Octane', 'rarity': 'Import'}])
+        store.upsert_items([{'data_id': 1, 'name': 'Octane', 'rarity': 'Premium'}])
+        store.upsert_achievements([{'name': 'Winner', 'gamerscore': 10}])
+    with TradeStore(path) as store:
+        assert store.items() == [{'data_id': 1, 'name': 'Octane', 'rarity': 'Premium'}]
+        assert store.item(1)['rarity'] == 'Premium' and store.item(2) is None
+        assert store.achievements() == [{'name': 'Winner', 'gamerscore': 10}]
+
+
+def test_pipeline_writes_in_batches(tmp_path):
+    path = str(tmp_path / 'rlg.db')
+    crawler = get_crawler(TradeSpider, {'RLG_SQLITE_PATH': path, 'RLG_SQLITE_BATCH_SIZE': 2})
+    pipeline = RlSQLitePipeline.from_crawler(crawler)
+    pipeline.open_spider(None)
+    reader = TradeStore(path)
+    for item in TRADES:
+        pipeline.process_item(RlTrade(item), None)
+    pipeline.process_item(RlItem(data_id=1, name='Octane'), None)
+    pipeline.process_item(RlAchievement(name='Winner'), None)
+    assert len(reader.trades()) == 2
+    pipeline.close_spider(None)
+    assert len(reader.trades()) == 3
+    assert reader.items() == [{'data_id': 1, 'name': 'Octane'}]
+    assert len(reader.achievements()) == 1
+
+
+def test_store_path_setting():
+    settings = RocketLeagueGarage._trade_settings(100, 5, store_path='rlg.db')
+    assert settings['RLG_SQLITE_PATH'] == 'rlg.db'
+    assert 'RLG_SQLITE_PATH' not in RocketLeagueGarage._catalog_settings(True)
+
+
+def test_pipeline_stores_plain_dicts(tmp_path):
+    """Ensure the dictionaries of the fast parsers are stored as well."""
+    path = str(tmp_path / 'rlg.db')
+    pipeline = RlSQLitePipeline(path)
+    pipeline.open_spider(None)
+    for item in TRADES:
+        pipeline.process_item(dict(item), None)
+    pipeline.process_item({'data_id': 1, 'name': 'Octane'}, None)
+    pipeline.process_item({'name': 'Winner', 'gamerscore': 10}, None)
+    pipeline.process_item({'data_id': 2, 'name': 'Dominus'}, SimpleNamespace(name='rl-item'))
+    pipeline.close_spider(None)
+    with TradeStore(path) as store:
+        assert len(store.trades()) == 3
+        assert [item['data_id'] for item in store.items()] == [1, 2]
+        assert store.achievements() == [{'name': 'Winner', 'gamerscore': 10}]
@@ -0,0 +1,92 @@
+"""Test the columnar trade table."""
+
+import copy
+import sys
+
+from rlgpy.catalog import ItemCatalog
+from rlgpy.table import TradeTable
+
+
+ITEMS = [
+    {'data_id': 1, 'name': 'Octane', 'category': 'Bodies', 'platform': 'All', 'rarity': 'Import'},
+    {'data_id': 2, 'name': 'Zomba', 'category': 'Wheels', 'platform': 'All', 'rarity': 'Exotic'}
+]
+
+TRADES = [
+    {
+        'data_id': 'abc', 'url': '/trade/abc', 'platform': 'STEAM', 'rlg_username': 'alice',
+        'have': [{'data_id': 1, 'count': 2, 'paint': 'Titanium White', 'certification': 'Striker'}],
+        'want': [{'data_id': 2}, {'data_id': 3, 'paint': 'Black'}]
+    },
+    {
+        'data_id': 'def', 'url': '/trade/def', 'platform': 'PS4', 'rlg_username': 'bob',
+        'source_url': 'https://rocket-league.com/trading?p=1',
+        'have': [{'data_id': 2, 'paint': 'Titanium White'}]
+    },
+    {'data_id': 'ghi', 'platform': 'STEAM', 'want': [{'data_id': 1, 'paint': 'Titanium White'}]}
+]
+
+
+def catalog():
+    return ItemCatalog(path=None, loader=lambda: [dict(item) for item in ITEMS])
+
+
+def test_table_converts_back_to_enriched_trades():
+    items = catalog()
+    table = TradeTable.from_trades(copy.deepcopy(TRADES), items)
+    expected = copy.deepcopy(TRADES)
+    for trade in expected:
+        items.enrich(trade)
+    assert len(table) == 3
+    assert table.to_dicts() == expected
+    assert table[-1] == expected[-1]
+
+
+def test_table_without_catalog_keeps_scraped_fields():
+    table = TradeTable.from_trades(copy.deepcopy(TRADES))
+    assert list(table) == TRADES
+
+
+def test_table_select():
+    table = TradeTable.from_trades(copy.deepcopy(TRADES), catalog())
+    assert table.select(paint='Titanium White') == [0, 1, 2]
+    assert table.select(paint='Titanium White', side='have') == [0, 1]
+    assert table.select(platform='STEAM', data_id=1, paint='Titanium White') == [0, 2]
+    assert table.select(data_id=1, certification='Striker', side='want') == []
+    assert table.select(rarity='Exotic') == [0, 1]
+    assert table.select(paint='Crimson') == []
+    assert table.select(platform='STEAM') == [0, 2]
+
+
+def test_table_is_smaller_than_trades():
+    trades = [
+        {
+            'data_id': 't%d' % i, 'url': '/trade/t%d' % i, 'platform': 'STEAM',
+            'rlg_username': 'user%d' % (i % 50),
+            'have': [{'data_id': 1, 'count': 1, 'paint': 'Black', 'certification': 'Victor'}] * 4,
+            'want': [dict(ITEMS[1], paint='Crimson')] * 4
+        }
+        for i in range(1000)
+    ]
+    size = sum(
+        sys.getsizeof(trade) + sum(sys.getsizeof(item) for item in trade['have'] + trade['want'])
+        for trade in copy.deepcopy(trades)
+    )
+    table = TradeTable.from_trades(trades, catalog())
+    assert table.nbytes() * 10 < size
+
+
+def test_table_stores_trade_ids_and_urls_compactly():
+    trades = [
+        {'data_id': '123', 'url': '/trade/123'},
+        {'data_id': '124', 'url': '/trade/124'},
+        {'data_id': '0125', 'url': '/trades/x'},
+        {'data_id': '99999999999999999999', 'url': '/trade/99999999999999999999'},
+        {'url': '/trade/'}
+    ]
+    table = TradeTable.from_trades(copy.deepcopy(trades))
+    assert list(table) == trades
+    assert list(table.data_id) == [123, 124, -1, -1, -1]
+    assert table.text_data_id == {2: '0125', 3: '99999999999999999999'}
+    assert table.url[0] == table.url[1] == table.url[3]
+    assert len(table.categories['url']) == 3
@@ -0,0 +1,47 @@
+"""Test the result channel between crawler processes and their parent."""
+
+import pytest
+
+from rlgpy.scraper.channels import ItemBatcher, iter_items, to_dict
+from rlgpy.scraper.items import RlTrade, RlTradeableItem
+
+
+def test_to_dict_converts_nested_items():
+    trade = RlTrade(data_id='abc', have=[RlTradeableItem(data_id=1)], want=[])
+    assert to_dict(trade) == {'data_id': 'abc', 'have': [{'data_id': 1}], 'want': []}
+    assert type(to_dict(trade)['have'][0]) is dict
+
+
+def test_batcher_sends_full_batches_and_flushes_rest():
+    messages = []
+    batcher = ItemBatcher(messages.append, batch_size=2)
+    for data_id in range(5):
+        batcher.add({'data_id': data_id})
+    batcher.flush()
+    assert [len(payload) for _, payload in messages] == [2, 2, 1]
+
+
+def _receive(recv):
+    items = iter_items(recv)
+    received = []
+    while True:
+        try:
+            received.append(next(items))
+        except StopIteration as done:
+            return received, done.value
+
+
+def test_iter_items_until_done():
+    messages = iter([('items', [{'data_id': 1}]), ('items', [{'data_id': 2}]), ('done', 'm')])
+    assert _receive(lambda: next(messages)) == ([{'data_id': 1}, {'data_id': 2}], 'm')
+
+
+def test_iter_items_raises_on_error_and_eof():
+    messages = iter([('error', 'boom')])
+    with pytest.raises(RuntimeError):
+        _receive(lambda: next(messages))
+
+    def closed():
+        raise EOFError
+    with pytest.raises(RuntimeError):
+        _receive(closed)
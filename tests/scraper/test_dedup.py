@@ -0,0 +1,29 @@
+"""Test the bounded memory seen trade filter."""
+
+from rlgpy.scraper.dedup import RotatingBloomFilter
+
+
+def test_bloom_filter_membership():
+    seen = RotatingBloomFilter(capacity=1000, error_rate=0.001)
+    seen.update('trade-%d' % i for i in range(1000))
+    assert all('trade-%d' % i in seen for i in range(1000))
+    false_positives = sum('other-%d' % i in seen for i in range(10000))
+    assert false_positives < 50
+
+
+def test_bloom_filter_forgets_oldest_generation():
+    seen = RotatingBloomFilter(capacity=100, error_rate=0.001, generations=2)
+    seen.update('old-%d' % i for i in range(100))
+    seen.update('new-%d' % i for i in range(200))
+    assert 'new-199' in seen
+    assert sum('old-%d' % i in seen for i in range(100)) < 5
+
+
+def test_bloom_filter_round_trip(tmp_path):
+    path = str(tmp_path / 'seen.bloom')
+    seen = RotatingBloomFilter(capacity=10, generations=3)
+    seen.update('trade-%d' % i for i in range(25))
+    seen.save(path)
+    loaded = RotatingBloomFilter.load(path)
+    assert all('trade-%d' % i in loaded for i in range(25))
+    assert loaded.generations == 3
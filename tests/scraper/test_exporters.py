@@ -0,0 +1,105 @@
+"""Test the compact feed exporters."""
+
+import io
+import json
+
+import pytest
+
+from rlgpy.scraper.exporters import (
+    ROWS,
+    TRADEABLE_ITEMS,
+    TRADE_KEY,
+    ColumnarItemExporter,
+    ColumnarReader,
+    MsgpackItemExporter,
+    feed_settings,
+    read_feed
+)
+from rlgpy.scraper.items import RlTrade, RlTradeableItem
+
+
+def trade(index):
+    return RlTrade(
+        data_id='t%d' % index, url='/trade/t%d' % index, platform='STEAM',
+        have=[RlTradeableItem(data_id=index, count=1, certification='', paint='')],
+        want=[RlTradeableItem(data_id=1709, count=index, certification='Striker',
+                              paint='Titanium White')]
+    )
+
+
+TRADES = [trade(index) for index in range(10)]
+EXPECTED = [json.loads(json.dumps(dict(item, have=[dict(tradeable) for tradeable in item['have']],
+                                       want=[dict(tradeable) for tradeable in item['want']])))
+            for item in TRADES]
+
+
+def _export(exporter_cls, items, file=None, **kwargs):
+    file = file or io.BytesIO()
+    exporter = exporter_cls(file, **kwargs)
+    exporter.start_exporting()
+    for item in items:
+        exporter.export_item(item)
+    exporter.finish_exporting()
+    return file
+
+
+def test_columnar_round_trip(tmp_path):
+    path = tmp_path / 'trades.col'
+    items = TRADES + [dict(TRADES[0], data_id='late', rlg_username='someone')]
+    path.write_bytes(_export(ColumnarItemExporter, items, row_group_size=4).getvalue())
+    with ColumnarReader(str(path)) as reader:
+        assert reader.rows() == 11 and reader.rows(TRADEABLE_ITEMS) == 22
+        assert len(reader.tables[ROWS]) == 3
+        assert reader.columns()[-1] == 'rlg_username'
+        assert reader.trades()[:10] == EXPECTED
+        assert reader.trades()[10]['rlg_username'] == 'someone'
+
+        assert list(reader.read(ROWS, ['data_id'])) == ['data_id']
+        items = reader.read(TRADEABLE_ITEMS, [TRADE_KEY, 'paint'])
+        assert items[TRADE_KEY][:2] == ['t0', 't0']
+        assert items['paint'][:2] == ['', 'Titanium White']
+        assert reader.trades(['platform'], ['paint'])[1] == {
+            'data_id': 't1', 'platform': 'STEAM',
+            'have': [{'paint': ''}], 'want': [{'paint': 'Titanium White'}]
+        }
+
+
+def test_columnar_duplicated_trades(tmp_path):
+    """Ensure each copy of a trade found through two start URLs keeps its tradeable items."""
+    path = tmp_path / 'trades.col'
+    items = [dict(EXPECTED[0], source_url='a'), dict(EXPECTED[0], source_url='b'),
+             {'data_id': 't9', 'platform': 'PS4'}, dict(EXPECTED[1], have=[])]
+    path.write_bytes(_export(ColumnarItemExporter, items, row_group_size=2).getvalue())
+    with ColumnarReader(str(path)) as reader:
+        assert reader.trades() == items
+        assert reader.trades(['source_url'], ['data_id'])[1] == {
+            'data_id': 't0', 'source_url': 'b', 'have': [{'data_id': 0}],
+            'want': [{'data_id': 1709}]
+        }
+
+
+def test_columnar_file_appended_to_another(tmp_path):
+    path = tmp_path / 'trades.col'
+    path.write_bytes(b'previous feed\n')
+    with path.open('ab') as f:
+        _export(ColumnarItemExporter, TRADES, file=f)
+    assert read_feed(str(path), 'columnar') == EXPECTED
+
+    (tmp_path / 'trades.jl').write_text('{"data_id": 1}\n')
+    with pytest.raises(ValueError):
+        ColumnarReader(str(tmp_path / 'trades.jl'))
+
+
+def test_msgpack_round_trip(tmp_path):
+    pytest.importorskip('msgpack')
+    path = tmp_path / 'trades.msgpack'
+    path.write_bytes(_export(MsgpackItemExporter, TRADES).getvalue())
+    assert read_feed(str(path), 'msgpack') == EXPECTED
+
+
+def test_feed_settings_register_formats():
+    settings = feed_settings('trades.col', 'columnar')
+    assert settings['FEED_FORMAT'] == 'columnar'
+    assert settings['FEED_EXPORTERS']['columnar'].endswith('ColumnarItemExporter')
+    with pytest.raises(ValueError):
+        read_feed('trades.csv', 'csv')
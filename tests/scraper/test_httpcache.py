@@ -0,0 +1,126 @@
+"""Test the TTL cache policy, the revalidating middleware and the shared cache storage."""
+
+import os
+import time
+from email.utils import formatdate
+
+from scrapy.http import HtmlResponse, Request, Response
+from scrapy.settings import Settings
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper.httpcache import (
+    TTLCachePolicy,
+    RevalidatingHttpCacheMiddleware,
+    SharedFilesystemCacheStorage,
+    cache_settings
+)
+
+
+URL = 'https://rocket-league.com/items/bodies'
+
+
+class CatalogSpider(Spider):
+    name = 'rl-item'
+
+
+def _response(age: float = 0, status: int = 200, **headers) -> HtmlResponse:
+    headers['Date'] = formatdate(time.time() - age, usegmt=True)
+    return HtmlResponse(URL, status=status, headers=headers, body=b'<html>items</html>')
+
+
+def _policy(**settings) -> TTLCachePolicy:
+    return TTLCachePolicy(Settings(settings))
+
+
+def test_policy_serves_fresh_pages_and_revalidates_old_ones():
+    policy = _policy(RLG_HTTPCACHE_TTL=60)
+    request = Request(URL)
+    assert policy.is_cached_response_fresh(_response(age=10), request)
+    assert b'If-None-Match' not in request.headers
+
+    cached = _response(age=120, ETag='"v1"', **{'Last-Modified': formatdate(usegmt=True)})
+    assert not policy.is_cached_response_fresh(cached, request)
+    assert request.headers[b'If-None-Match'] == b'"v1"'
+    assert b'If-Modified-Since' in request.headers
+    assert policy.is_cached_response_valid(cached, Response(URL, status=304), request)
+    assert not policy.is_cached_response_valid(cached, _response(), request)
+
+
+def test_policy_caps_serving_stale_pages():
+    policy = _policy(RLG_HTTPCACHE_TTL=60, RLG_HTTPCACHE_MAX_STALE=100)
+    request = Request(URL)
+    error = _response(status=503)
+    assert policy.is_cached_response_valid(_response(age=120), error, request)
+    assert not policy.is_cached_response_valid(_response(age=200), error, request)
+
+
+def test_policy_does_not_store_errors_or_no_store_pages():
+    policy = _policy()
+    request = Request(URL)
+    assert policy.should_cache_response(_response(), request)
+    assert not policy.should_cache_response(_response(status=503), request)
+    assert not policy.should_cache_response(_response(**{'Cache-Control': 'no-store'}), request)
+
+
+def test_storage_round_trip(tmp_path):
+    storage = SharedFilesystemCacheStorage(Settings({'HTTPCACHE_DIR': str(tmp_path)}))
+    spider = CatalogSpider()
+    request = Request(URL)
+    assert storage.retrieve_response(spider, request) is None
+    storage.store_response(spider, request, _response(ETag='"v1"'))
+
+    cached = storage.retrieve_response(spider, Request(URL + '?'))
+    assert isinstance(cached, HtmlResponse)
+    assert cached.body == b'<html>items</html>'
+    assert cached.headers[b'ETag'] == b'"v1"'
+    files = [name for _, _, names in os.walk(str(tmp_path)) for name in names]
+    assert len(files) == 1 and files[0].endswith('.gz')
+
+
+def test_storage_dates_responses_without_date(tmp_path):
+    storage = SharedFilesystemCacheStorage(Settings({'HTTPCACHE_DIR': str(tmp_path)}))
+    spider, request, policy = CatalogSpider(), Request(URL), _policy(RLG_HTTPCACHE_TTL=60)
+    storage.store_response(spider, request, HtmlResponse(URL, body=b'<html>items</html>'))
+    cached = storage.retrieve_response(spider, request)
+    assert b'Date' in cached.headers
+    assert policy.is_cached_response_fresh(cached, request)
+    assert policy.age(cached, request, now=time.time() + 120) >= 119
+
+
+def test_storage_expires_and_ignores_corrupt_entries(tmp_path):
+    settings = Settings({'HTTPCACHE_DIR': str(tmp_path), 'HTTPCACHE_EXPIRATION_SECS': 1})
+    storage = SharedFilesystemCacheStorage(settings)
+    spider, request = CatalogSpider(), Request(URL)
+    storage.store_response(spider, request, _response())
+    path = storage._entry_path(spider, request)
+    assert storage.retrieve_response(spider, request) is not None
+    path.write_bytes(b'not gzip')
+    assert storage.retrieve_response(spider, request) is None
+
+    storage.store_response(spider, request, _response())
+    storage.expiration_secs = -1
+    assert storage.retrieve_response(spider, request) is not None
+
+
+def test_middleware_refreshes_revalidated_pages(tmp_path):
+    settings = cache_settings(directory=tmp_path)
+    crawler = get_crawler(CatalogSpider, settings)
+    middleware = RevalidatingHttpCacheMiddleware.from_crawler(crawler)
+    assert middleware.policy.ttl == 24 * 60 * 60
+    spider = crawler.spider = CatalogSpider()
+    middleware.spider_opened(spider)
+
+    request = Request(URL)
+    stale = _response(age=2 * 24 * 60 * 60, ETag='"v1"')
+    middleware.storage.store_response(spider, request, stale)
+    assert middleware.process_request(request, spider) is None
+    assert request.headers[b'If-None-Match'] == b'"v1"'
+
+    result = middleware.process_response(request, Response(URL, status=304), spider)
+    assert result.body == b'<html>items</html>'
+    assert crawler.stats.get_value('httpcache/revalidate') == 1
+
+    cached = middleware.process_request(Request(URL), spider)
+    assert cached is not None and cached.body == b'<html>items</html>'
+    assert crawler.stats.get_value('httpcache/hit') == 1
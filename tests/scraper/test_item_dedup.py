@@ -0,0 +1,54 @@
+"""Test the request and item deduplication of the item spider."""
+
+import pytest
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper.spiders import ItemSpider
+from rlgpy.scraper.spiders.item import CATEGORIES, canonical_url
+from tests.scraper.test_snapshots import item_page
+
+
+INDEX_URL = 'https://rocket-league.com/items'
+
+
+def _spider(**settings) -> ItemSpider:
+    crawler = get_crawler(ItemSpider, settings)
+    crawler.stats.open_spider(None)
+    return ItemSpider.from_crawler(crawler)
+
+
+def test_canonical_url():
+    assert canonical_url('https://Rocket-League.com/items/bodies/') == INDEX_URL + '/bodies'
+    assert canonical_url(INDEX_URL + '/bodies?sort=name#top') == INDEX_URL + '/bodies'
+    assert canonical_url(INDEX_URL + '/bodies?sort=name&p=2') == INDEX_URL + '/bodies?p=2'
+
+
+def test_seeds_categories_and_skips_known_links():
+    spider = _spider()
+    requests = list(spider.start_requests())
+    assert [request.url for request in requests] == [INDEX_URL] + [
+        INDEX_URL + '/' + category for category in CATEGORIES
+    ]
+
+    links = ''.join(
+        '<a href="/items/%s">x</a><a href="/items/%s/#top">x</a>' % (category, category)
+        for category in CATEGORIES + ['paints']
+    )
+    index = HtmlResponse(INDEX_URL, request=requests[0],
+                         body=('<html><body>%s</body></html>' % links).encode('utf-8'))
+    assert [request.url for request in spider._requests_to_follow(index)] == [
+        INDEX_URL + '/paints'
+    ]
+    stats = spider.crawler.stats
+    assert stats.get_value('rlg/dedup/requests_skipped') == 2 * len(CATEGORIES) + 1
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_skips_items_parsed_on_another_page(fast):
+    spider = _spider(RLG_FAST_PARSER=fast)
+    first = item_page((1, 'Octane', 'Common'), (2, 'Dominus', 'Rare'))
+    second = item_page((2, 'Dominus', 'Rare'), (3, 'Breakout', 'Rare'))
+    assert [item['data_id'] for item in spider.parse_items(first)] == [1, 2]
+    assert [item['data_id'] for item in spider.parse_items(second)] == [3]
+    assert spider.crawler.stats.get_value('rlg/dedup/items_skipped') == 1
@@ -0,0 +1,93 @@
+"""Test the crawl metrics collected in the crawling process."""
+
+import datetime
+
+from scrapy.http import HtmlResponse, Request
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper.channels import iter_items
+from rlgpy.scraper.metrics import (
+    CrawlMetrics,
+    CrawlResult,
+    CallbackTimingMiddleware,
+    TimedItemPipelineManager,
+    percentiles
+)
+
+
+class UppercasePipeline:
+
+    # Required argument for pipeline fn... pylint: disable=unused-argument
+    def process_item(self, item, spider):
+        item['name'] = item['name'].upper()
+        return item
+
+
+def test_percentiles():
+    assert percentiles([]) == {}
+    values = [float(value) for value in range(1, 101)]
+    assert percentiles(values) == {'p50': 50.0, 'p90': 90.0, 'p99': 99.0, 'max': 100.0}
+    assert percentiles([3.0]) == {'p50': 3.0, 'p90': 3.0, 'p99': 3.0, 'max': 3.0}
+
+
+def test_metrics_from_stats():
+    start = datetime.datetime(2020, 1, 1)
+    metrics = CrawlMetrics(
+        stats={
+            'downloader/request_count': 4,
+            'downloader/response_count': 3,
+            'item_scraped_count': 50,
+            'start_time': start,
+            'finish_time': start + datetime.timedelta(seconds=10),
+            'rlg/callback_time/parse_trades': 1.5,
+            'rlg/pipeline_time/RlTradePipeline': 0.25
+        },
+        latencies=[0.1, 0.2, 0.3],
+        send_time=0.5,
+        receive_time=0.25
+    )
+    summary = metrics.to_dict()
+    assert summary['requests'] == 4 and summary['responses'] == 3
+    assert summary['items_per_second'] == 5.0
+    assert summary['callback_time'] == {'parse_trades': 1.5}
+    assert summary['pipeline_time'] == {'RlTradePipeline': 0.25}
+    assert summary['latency']['max'] == 0.3
+    assert summary['transfer_time'] == 0.75
+
+
+def test_crawl_result_keeps_returned_metrics():
+    metrics = CrawlMetrics()
+    messages = iter([('items', [{'data_id': 1}]), ('items', [{'data_id': 2}]), ('done', metrics)])
+    result = CrawlResult.collect(iter_items(lambda: next(messages)))
+    assert result == [{'data_id': 1}, {'data_id': 2}]
+    assert result.metrics is metrics
+
+
+def test_callback_timing_middleware():
+    class RuleSpider(Spider):
+        name = 'rules'
+
+    crawler = get_crawler(RuleSpider)
+    middleware = CallbackTimingMiddleware.from_crawler(crawler)
+    spider = RuleSpider()
+
+    def parse_trades(response):
+        yield {'data_id': 'abc'}
+        yield {'data_id': 'def'}
+
+    request = Request('https://rocket-league.com/trading', callback=parse_trades)
+    response = HtmlResponse(request.url, body=b'<html></html>', request=request)
+    output = list(middleware.process_spider_output(response, parse_trades(response), spider))
+    assert len(output) == 2
+    assert crawler.stats.get_value('rlg/callback_time/parse_trades') > 0
+
+
+def test_pipeline_manager_times_pipelines():
+    crawler = get_crawler(Spider, {
+        'ITEM_PIPELINES': {'tests.scraper.test_metrics.UppercasePipeline': 300}
+    })
+    manager = TimedItemPipelineManager.from_crawler(crawler)
+    pipeline = manager.middlewares[0]
+    assert pipeline.process_item({'name': 'octane'}, Spider('s')) == {'name': 'OCTANE'}
+    assert crawler.stats.get_value('rlg/pipeline_time/UppercasePipeline') > 0
@@ -0,0 +1,108 @@
+"""Test the direct pagination of the trade spider."""
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper.spiders import TradeSpider
+from tests.scraper.test_parsers import trade_html
+
+
+START_URL = 'https://rocket-league.com/trading?filterItem=733&filterPlatform=1'
+
+
+def _spider(max_trades: int, **kwargs) -> TradeSpider:
+    crawler = get_crawler(TradeSpider, {
+        'RLG_TRADE_PAGINATION': 'direct',
+        'CLOSESPIDER_ITEMCOUNT': max_trades
+    })
+    return TradeSpider.from_crawler(crawler, start_urls=[START_URL], **kwargs)
+
+
+def _page(request: Request, trades: int) -> HtmlResponse:
+    page = request.meta.get('page', 1)
+    body = ''.join(trade_html('p%dt%d' % (page, index), [], []) for index in range(trades))
+    return HtmlResponse(request.url, request=request,
+                        body=('<html><body>%s</body></html>' % body).encode('utf-8'))
+
+
+def _parse(spider: TradeSpider, request: Request, trades: int):
+    results = list(spider.parse_trades(_page(request, trades)))
+    return ([result for result in results if not isinstance(result, Request)],
+            [result for result in results if isinstance(result, Request)])
+
+
+def test_requests_pages_for_budget_at_once():
+    spider = _spider(max_trades=100)
+    start = next(iter(spider.start_requests()))
+    trades, requests = _parse(spider, start, 20)
+    assert len(trades) == 20
+    assert [request.meta['page'] for request in requests] == [2, 3, 4, 5]
+    assert requests[0].url == START_URL + '&p=2'
+    assert all(request.meta['source_url'] == START_URL for request in requests)
+
+    for request in requests[:-1]:
+        assert _parse(spider, request, 20)[1] == []
+    assert _parse(spider, requests[-1], 20)[1] == []
+
+
+def test_requests_next_batch_when_trades_were_skipped():
+    spider = _spider(max_trades=40, seen_ids=['p2t%d' % index for index in range(20)])
+    start = next(iter(spider.start_requests()))
+    _, requests = _parse(spider, start, 20)
+    assert [request.meta['page'] for request in requests] == [2]
+    trades, requests = _parse(spider, requests[0], 20)
+    assert trades == []
+    assert requests == []  # Caught up with known trades.
+
+    spider = _spider(max_trades=40, seen_ids=['p2t%d' % index for index in range(10)])
+    _, requests = _parse(spider, next(iter(spider.start_requests())), 20)
+    trades, requests = _parse(spider, requests[0], 20)
+    assert len(trades) == 10
+    assert [request.meta['page'] for request in requests] == [3]
+
+
+def test_stops_at_empty_page():
+    spider = _spider(max_trades=200)
+    _, requests = _parse(spider, next(iter(spider.start_requests())), 20)
+    assert len(requests) == 9
+    _parse(spider, requests[0], 20)
+    _parse(spider, requests[1], 0)
+    for request in requests[2:]:
+        assert _parse(spider, request, 0)[1] == []
+    assert spider.last_page[START_URL] == 2
+
+
+def test_unknown_pagination_mode():
+    crawler = get_crawler(TradeSpider, {'RLG_TRADE_PAGINATION': 'sideways'})
+    with pytest.raises(ValueError):
+        TradeSpider.from_crawler(crawler)
+
+
+@pytest.mark.parametrize(argnames='fast', argvalues=[False, True])
+def test_trades_without_bookmark_are_kept(fast):
+    crawler = get_crawler(TradeSpider, {'RLG_FAST_PARSER': fast})
+    spider = TradeSpider.from_crawler(crawler, start_urls=[START_URL], seen_ids=['p1t0'])
+    body = trade_html('p1t0', [], []) + trade_html('p1t1', [], []).replace(
+        '<button name="bookmark" data-alias="p1t1"></button>', ''
+    )
+    request = Request(START_URL)
+    response = HtmlResponse(START_URL, request=request,
+                            body=('<html><body>%s</body></html>' % body).encode('utf-8'))
+    trades = [result for result in spider.parse_trades(response)
+              if not isinstance(result, Request)]
+    assert len(trades) == 1 and not trades[0].get('data_id')
+    spider.trade_scraped(trades[0])
+    spider.trade_scraped({'url': '/trade/p1t2'})
+
+
+@pytest.mark.parametrize(argnames='fast', argvalues=[False, True])
+def test_truncates_page_to_trades_per_url(fast):
+    crawler = get_crawler(TradeSpider, {'RLG_FAST_PARSER': fast})
+    spider = TradeSpider.from_crawler(crawler, start_urls=[START_URL], max_trades_per_url=5)
+    start = next(iter(spider.start_requests()))
+    trades, _ = _parse(spider, start, 20)
+    assert [trade['data_id'] for trade in trades] == ['p1t%d' % index for index in range(5)]
+    assert _parse(spider, Request(START_URL + '&p=2', meta={'source_url': START_URL}), 20) == (
+        [], []
+    )
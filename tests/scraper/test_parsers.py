@@ -0,0 +1,76 @@
+"""Test the fast-path parsers produce the same output as the item loaders."""
+
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper import parsers
+from rlgpy.scraper.channels import to_dict
+from rlgpy.scraper.spiders import ItemSpider, TradeSpider
+
+
+def tradeable_item_html(data_id, amount, certification, paint):
+    return ''.join([
+        '<a href="/trading?filterItem=%d&amp;filterPlatform=1"><div>' % data_id,
+        '<div class="rlg-trade-display-item__amount">%d x</div>' % amount if amount else '',
+        '<div><div><span>%s</span></div></div>' % certification,
+        '<div class="rlg-trade-display-item-paint" data-name="%s"></div>' % paint if paint else '',
+        '</div></a>'
+    ])
+
+
+def trade_html(trade_id, have, want):
+    return ''.join([
+        '<div class="rlg-trade is--user">',
+        '<div><a href="/trade/%s">Trade</a></div>' % trade_id,
+        '<div class="rlg-trade__avatar"><img alt="user-%s"></div>' % trade_id,
+        '<div class="rlg-trade-platform-name"><span>Steam: PC</span></div>',
+        '<button name="bookmark" data-alias="%s"></button>' % trade_id,
+        '<div id="rlg-youritems">%s</div>' % ''.join(tradeable_item_html(*item) for item in have),
+        '<div id="rlg-theiritems">%s</div>' % ''.join(tradeable_item_html(*item) for item in want),
+        '</div>'
+    ])
+
+
+def item_html(data_id, name, category, rarity, dlcpack, img_url):
+    return ''.join([
+        '<div class="rlg-item__container --%s" data-name="%s" data-category="%s" ' % (
+            category.lower(), name, category
+        ),
+        'data-platform="All" data-rarity="%s" data-dlcpack="%s">' % (rarity, dlcpack),
+        '<div class="rlg-item" data-id="%s">' % data_id,
+        '<img src="%s">' % img_url if img_url else '',
+        '</div></div>'
+    ])
+
+
+def test_fast_item_parser_matches_loader():
+    body = '<html><body>%s</body></html>' % ''.join([
+        item_html(1709, 'Octane', 'Bodies', 'Import', '', '/content/media/items/1709.png'),
+        item_html(23, 'Dominus GT', 'Bodies', 'Very Rare', 'Supersonic Fury', ''),
+        item_html(1709, 'Octane', 'Bodies', 'Import', '', '/content/media/items/1709.png'),
+        item_html(733, 'Titanium White &amp; Black', 'Wheels', 'Limited', 'Chaos Run', '/w.png')
+    ])
+    response = HtmlResponse('https://rocket-league.com/items/bodies', body=body.encode('utf-8'))
+    results = {}
+    for fast in (False, True):
+        spider = ItemSpider.from_crawler(get_crawler(ItemSpider, {'RLG_FAST_PARSER': fast}))
+        results[fast] = [to_dict(item) for item in spider.parse_items(response)]
+    loaded, parsed = results[False], results[True]
+    assert len(parsed) == len(loaded) == 3
+    for parsed_item, loaded_item in zip(parsed, loaded):
+        assert sorted(parsed_item) == sorted(loaded_item)
+        for field, value in loaded_item.items():
+            assert parsed_item[field] == value, field
+            assert type(parsed_item[field]) is type(value), field
+
+
+def test_fast_trade_parser_matches_loader():
+    body = '<html><body>%s%s</body></html>' % (
+        trade_html('abc', [(1, 2, 'Striker', 'Titanium White'), (2, 0, '', '')], [(3, 1, '', '')]),
+        trade_html('def', [], [(4, 0, 'Victor', 'Crimson')])
+    )
+    response = HtmlResponse('https://rocket-league.com/trading?p=1', body=body.encode('utf-8'))
+    loaded = [to_dict(TradeSpider.load_trade(trade, 'src')) for trade in response.css('div.is--user')]
+    parsed = [parsers.parse_trade(trade, 'src') for trade in parsers.TRADES(response.selector.root)]
+    assert parsed == loaded
+    assert 'have' not in parsed[1]
@@ -0,0 +1,74 @@
+"""Test skipping unchanged item pages with catalog snapshots."""
+
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from rlgpy.scraper.snapshots import CatalogSnapshot
+from rlgpy.scraper.spiders import ItemSpider
+
+
+URL = 'https://rocket-league.com/items/bodies'
+
+
+def item_page(*items) -> HtmlResponse:
+    body = ''.join(
+        '<div class="rlg-item__container" data-name="%s" data-category="Bodies" '
+        'data-platform="all" data-rarity="%s" data-dlcpack="">'
+        '<div data-id="%d"><img src="/%d.png"></div></div>' % (name, rarity, data_id, data_id)
+        for data_id, name, rarity in items
+    )
+    return HtmlResponse(URL, body=('<html><body>%s</body></html>' % body).encode('utf-8'))
+
+
+def test_snapshot_diff():
+    previous = CatalogSnapshot()
+    previous.set_page(URL, 'a', [{'data_id': 1, 'name': 'Octane'}, {'data_id': 2, 'name': 'Dom'}])
+    snapshot = CatalogSnapshot()
+    snapshot.set_page(URL, 'b', [{'data_id': 1, 'name': 'Octane ZSR'}, {'data_id': 3, 'name': 'X'}])
+    assert snapshot.diff(previous) == {
+        'added': [{'data_id': 3, 'name': 'X'}],
+        'removed': [{'data_id': 2, 'name': 'Dom'}],
+        'changed': [{'data_id': 1, 'name': 'Octane ZSR'}]
+    }
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    assert CatalogSnapshot.load(path).pages == {}
+    snapshot = CatalogSnapshot()
+    snapshot.set_page(URL, 'a', [{'data_id': 1}])
+    snapshot.save(path)
+    loaded = CatalogSnapshot.load(path)
+    assert loaded.unchanged_items(URL, 'a') == [{'data_id': 1}]
+    assert loaded.unchanged_items(URL, 'b') is None
+
+
+def test_spider_skips_unchanged_pages(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    response = item_page((1, 'Octane', 'Common'), (2, 'Dominus', 'Rare'))
+
+    spider = ItemSpider.from_crawler(get_crawler(ItemSpider), snapshot_path=path)
+    items = list(spider.parse_items(response))
+    assert [item['data_id'] for item in items] == [1, 2]
+    for item in items:
+        spider.item_scraped(item, response)
+    spider.closed('finished')
+    assert len(CatalogSnapshot.load(path).delta['added']) == 2
+
+    crawler = get_crawler(ItemSpider)
+    spider = ItemSpider.from_crawler(crawler, snapshot_path=path)
+    assert list(spider.parse_items(response)) == []
+    spider.closed('finished')
+    snapshot = CatalogSnapshot.load(path)
+    assert crawler.stats.get_value('rlg/snapshot/unchanged_pages') == 1
+    assert snapshot.delta == {'added': [], 'removed': [], 'changed': []}
+    assert sorted(snapshot.items()) == [1, 2]
+
+    spider = ItemSpider.from_crawler(get_crawler(ItemSpider), snapshot_path=path)
+    response = item_page((1, 'Octane', 'Common'), (2, 'Dominus', 'Very Rare'))
+    for item in spider.parse_items(response):
+        spider.item_scraped(item, response)
+    spider.closed('finished')
+    delta = CatalogSnapshot.load(path).delta
+    assert [item['rarity'] for item in delta['changed']] == ['Very Rare']
+    assert delta['added'] == delta['removed'] == []
@@ -1,11 +1,14 @@
 """Test spider runners."""
 
+import gc
+import asyncio
 import logging
 
 import pytest
+import scrapy
 
 from tests.config import Config
-from rlgpy.scraper.runners import SafeSpiderRunner
+from rlgpy.scraper.runners import AsyncSpiderRun, SafeSpiderRunner
 
 
 logger = logging.getLogger(__name__)
@@ -21,3 +24,82 @@ def test_runner_single_no_errors(spider, settings):
     """Ensure the custom spider runner will run synchronously without producing any errors."""
     logger.info('Testing spider runner for {}'.format(spider))
     SafeSpiderRunner.run(spider=spider, settings=settings, delete_file=True)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    argnames='spider,settings',
+    argvalues=[test for test in Config.spider_test_info()],
+    scope='module'
+)
+def test_runner_pipe_results(spider, settings):
+    """Ensure results are returned over the pipe when no feed file is configured."""
+    settings = {key: value for key, value in settings.items() if not key.startswith('FEED_')}
+    results = SafeSpiderRunner.run(spider=spider, settings=settings)
+    assert len(results) > 0
+    assert all(isinstance(result, dict) for result in results)
+
+
+@pytest.mark.parametrize(argnames='profile', argvalues=['cprofile', 'sample'])
+def test_runner_returns_metrics(profile):
+    """Ensure the metrics and profile of a crawl come back with its results."""
+    spider, _ = next(Config.spider_test_info())
+    results = SafeSpiderRunner.run(
+        spider=type(spider),
+        settings={'RLG_PROFILE': profile},
+        spider_kwargs={'start_urls': []}
+    )
+    assert results == []
+    metrics = results.metrics
+    assert metrics.requests == 0 and metrics.items == 0
+    assert metrics.spawn_time is not None and metrics.spawn_time >= 0
+    assert metrics.elapsed is not None
+    assert metrics.profile
+    if profile == 'cprofile':
+        assert metrics.profile_stats().total_calls > 0
+
+
+def test_runner_many_in_one_process():
+    """Ensure several crawls run in one process and each returns its own results."""
+    spiders = [type(spider) for spider, _ in Config.spider_test_info()]
+    results = SafeSpiderRunner.run_many({
+        str(index): (spider, {}, {'start_urls': []}) for index, spider in enumerate(spiders)
+    })
+    assert list(results) == ['0', '1', '2']
+    assert all(result == [] and result.metrics.requests == 0 for result in results.values())
+
+
+class EndlessSpider(scrapy.Spider):
+    """Scrapes items from data URIs until it is closed."""
+
+    name = 'endless'
+    start_urls = ['data:,0']
+
+    def parse(self, response):
+        number = int(response.url.split(',')[1])
+        yield {'number': number}
+        yield response.request.replace(url='data:,%d' % (number + 1), dont_filter=True)
+
+
+def test_abandoned_async_run_is_cancelled():
+    """Ensure breaking out of `async for` without `aclose()` still stops the crawl."""
+    async def consume():
+        run = AsyncSpiderRun(EndlessSpider, {'RLG_RESULT_BATCH_SIZE': 1})
+        async for _ in run:
+            break
+        process, conn = run._process, run._conn
+        del run
+        gc.collect()
+        for _ in range(100):
+            if not process.is_alive():
+                break
+            await asyncio.sleep(0.1)
+        return process, conn
+
+    loop = asyncio.new_event_loop()
+    try:
+        process, conn = loop.run_until_complete(consume())
+    finally:
+        loop.close()
+    assert not process.is_alive()
+    assert conn.closed
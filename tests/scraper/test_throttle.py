@@ -0,0 +1,130 @@
+"""Test the adaptive concurrency controller."""
+
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Request, Response
+from scrapy.utils.test import get_crawler
+
+from rlgpy.api import RocketLeagueGarage
+from rlgpy.scraper.metrics import CrawlMetrics
+from rlgpy.scraper.spiders import TradeSpider
+from rlgpy.scraper.throttle import (
+    AdaptiveConcurrencyMiddleware,
+    adaptive_settings,
+    parse_retry_after
+)
+
+
+URL = 'https://rocket-league.com/trading'
+SLOT = 'rocket-league.com'
+
+
+def _middleware(**settings):
+    settings = dict(adaptive_settings(max_concurrency=4), RLG_ADAPTIVE_WINDOW=2, **settings)
+    crawler = get_crawler(TradeSpider, settings)
+    crawler.stats.open_spider(None)
+    slot = SimpleNamespace(concurrency=2, delay=0.0)
+    crawler.engine = SimpleNamespace(
+        downloader=SimpleNamespace(slots={SLOT: slot}, total_concurrency=5)
+    )
+    middleware = AdaptiveConcurrencyMiddleware.from_crawler(crawler)
+    middleware.spider_opened(None)
+    return middleware, slot
+
+
+def _respond(middleware, status: int = 200, latency: float = 0.1, **headers):
+    request = Request(URL, meta={'download_slot': SLOT, 'download_latency': latency})
+    return middleware.process_response(request, Response(URL, status=status, headers=headers), None)
+
+
+def test_disabled_by_default():
+    with pytest.raises(NotConfigured):
+        AdaptiveConcurrencyMiddleware.from_crawler(get_crawler(TradeSpider))
+
+
+def test_parse_retry_after():
+    now = time.time()
+    assert parse_retry_after(b'120') == 120
+    later = formatdate(now + 30, usegmt=True).encode()
+    earlier = formatdate(now - 30, usegmt=True).encode()
+    assert parse_retry_after(later, now) == pytest.approx(30, abs=1)
+    assert parse_retry_after(earlier, now) == 0
+    assert parse_retry_after(b'soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_ramps_up_to_ceiling_while_healthy():
+    middleware, slot = _middleware()
+    assert middleware.crawler.engine.downloader.total_concurrency == 4
+    for _ in range(10):
+        _respond(middleware)
+    assert slot.concurrency == 4
+    stats = middleware.stats
+    assert stats.get_value('rlg/throttle/increase') == 2
+    assert stats.get_value('rlg/throttle/peak_concurrency') == 4
+
+
+def test_backs_off_on_errors_and_latency():
+    middleware, slot = _middleware()
+    _respond(middleware, latency=0.1)
+    _respond(middleware, latency=0.1)
+    assert slot.concurrency == 3
+    _respond(middleware, latency=1.0)
+    _respond(middleware, latency=1.0)
+    assert slot.concurrency == 1
+    _respond(middleware, status=500)
+    _respond(middleware, status=500)
+    assert slot.concurrency == 1 and slot.delay > 0
+    assert [decision['action'] for decision in middleware.decisions] == [
+        'increase', 'decrease', 'decrease'
+    ]
+
+
+def test_retry_after_pauses_the_slot():
+    middleware, slot = _middleware(RLG_ADAPTIVE_TARGET_RATE=1)
+    _respond(middleware, status=429, **{'Retry-After': '30'})
+    assert slot.concurrency == 1
+    assert slot.delay == 30
+    decision = middleware.decisions[-1]
+    assert decision['action'] == 'backoff' and 'HTTP 429' in decision['reason']
+
+    for _ in range(4):
+        _respond(middleware)
+    assert slot.concurrency == 1 and slot.delay == 30
+
+    middleware._states[SLOT].paused_until = time.time() - 1
+    _respond(middleware)
+    assert middleware.decisions[-1]['action'] == 'resume'
+    assert slot.delay < 30
+
+
+def test_target_rate_holds_concurrency():
+    middleware, slot = _middleware(RLG_ADAPTIVE_TARGET_RATE=1)
+    for _ in range(20):
+        middleware.item_scraped({})
+    for _ in range(4):
+        _respond(middleware)
+    assert slot.concurrency == 2
+    assert middleware.stats.get_value('rlg/throttle/hold') == 2
+
+
+def test_decisions_reach_the_metrics():
+    middleware, _ = _middleware()
+    for _ in range(2):
+        _respond(middleware)
+    metrics = CrawlMetrics(middleware.stats.get_stats())
+    assert metrics.throttle['concurrency'] == 3
+    assert metrics.to_dict()['throttle']['decisions'][0]['action'] == 'increase'
+
+
+def test_trade_settings_keep_cache_middleware():
+    settings = RocketLeagueGarage._trade_settings(100, 8, True, adaptive=True, target_rate=20)
+    assert settings['RLG_ADAPTIVE_MAX_CONCURRENCY'] == 8
+    assert settings['RLG_ADAPTIVE_TARGET_RATE'] == 20
+    middlewares = settings['DOWNLOADER_MIDDLEWARES']
+    assert 'rlgpy.scraper.throttle.AdaptiveConcurrencyMiddleware' in middlewares
+    assert 'rlgpy.scraper.httpcache.RevalidatingHttpCacheMiddleware' in middlewares
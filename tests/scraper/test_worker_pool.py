@@ -0,0 +1,84 @@
+"""Test the crawler worker pool."""
+
+import os
+import time
+import signal
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from tests.config import Config
+from tests.scraper.test_spider_runner import EndlessSpider
+from rlgpy.scraper.spiders import AchievementSpider
+from rlgpy.scraper.workers import CrawlerWorkerPool
+
+
+logger = logging.getLogger(__name__)
+
+
+def test_pool_health_and_shutdown():
+    """Ensure workers are reported alive while running and jobs are rejected after shutdown."""
+    pool = CrawlerWorkerPool(size=2)
+    pool.start()
+    health = pool.health()
+    assert health['running']
+    assert len(health['workers']) == 2
+    assert all(worker['alive'] and not worker['busy'] for worker in health['workers'])
+    pool.shutdown()
+    assert not pool.health()['running']
+    with pytest.raises(RuntimeError):
+        pool.submit(*next(Config.spider_test_info()))
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    argnames='spider,settings',
+    argvalues=[test for test in Config.spider_test_info()],
+    scope='module'
+)
+def test_pool_runs_jobs_back_to_back(spider, settings):
+    """Ensure a single warm worker can run the same spider twice."""
+    with CrawlerWorkerPool(size=1) as pool:
+        first = pool.run(type(spider), dict(settings))
+        second = pool.run(type(spider), dict(settings))
+    assert len(first) > 0
+    assert len(second) > 0
+
+
+def test_pool_runs_job_without_requests():
+    """Ensure jobs reach the workers and their (empty) results come back."""
+    spider, settings = next(Config.spider_test_info())
+    with CrawlerWorkerPool(size=1) as pool:
+        results = pool.run(type(spider), {}, spider_kwargs={'start_urls': []})
+    assert results == []
+    assert results.metrics.requests == 0
+    assert results.metrics.spawn_time is None
+
+
+def test_pool_fails_jobs_of_dead_and_stuck_workers():
+    """Ensure a dead worker is noticed while another one is busy, and jobs time out."""
+    settings = {'RLG_RESULT_BATCH_SIZE': 1}
+    with CrawlerWorkerPool(size=2) as pool:
+        busy = pool.submit(EndlessSpider, settings)
+        doomed = pool.submit(EndlessSpider, settings)
+        time.sleep(1.0)
+        victim = next(worker for worker in pool._workers.values()
+                      if worker.job is not None and worker.job.future is doomed)
+        os.kill(victim.process.pid, signal.SIGKILL)
+        with pytest.raises(RuntimeError):
+            doomed.result(timeout=10)
+        assert not busy.done()
+
+        with pytest.raises(FutureTimeoutError):
+            pool.run(EndlessSpider, settings, timeout=1.0)
+        assert pool.run(AchievementSpider, {}, spider_kwargs={'start_urls': []}) == []
+        assert all(worker['alive'] for worker in pool.health()['workers'])
+
+
+def test_pool_fails_jobs_which_can_not_start():
+    """Ensure a crawl failing before it starts fails its job instead of leaving it pending."""
+    with CrawlerWorkerPool(size=1) as pool:
+        with pytest.raises(RuntimeError):
+            pool.run('no-such-spider', {})
+        assert pool.run(AchievementSpider, {}, spider_kwargs={'start_urls': []}) == []